@@ -0,0 +1,250 @@
+"""
+Call Analysis Pipeline Module
+Summarizes a call and measures caller personality with a single LLM request
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Empty, Queue
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from config_loader import get_setting
+from app.summarizer import CallSummarizer, SUMMARY_RUBRIC, is_trivial_call, parse_llm_json
+from app.personality import PersonalityTracker, PERSONALITY_RUBRIC
+from app.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Micro-batching: with analysis_batch_size > 1, analyses arriving within the
+# window are sent as one batched summary request and one batched personality
+# request instead of one request per call. The batcher is shared by every
+# pipeline in the process, since endpoints build a pipeline per request
+ANALYSIS_BATCH_SIZE = int(get_setting("analysis_batch_size", 1))
+ANALYSIS_BATCH_WINDOW_MS = int(get_setting("analysis_batch_window_ms", 200))
+
+# Both rubrics sit in the system prompt, ahead of the per-call transcript
+CALL_ANALYSIS_SYSTEM_PROMPT = f"""You are a conversation analysis and personality analysis expert. Extract structured information and provide objective ratings based on observable communication patterns.
+
+For "summary", extract the following:
+{SUMMARY_RUBRIC}
+
+For "personality", rate the following traits on a scale of 0-100, based only on the User's messages:
+{PERSONALITY_RUBRIC}
+
+Respond ONLY with valid JSON of the form {{"summary": {{...}}, "personality": {{"trait_name": number, ...}}}}, no other text."""
+
+class CallAnalysisPipeline:
+    """
+    Runs summary and personality extraction over the same transcript.
+    
+    Both analyses read the same conversation, so they are fused into one
+    prompt and one LLM round-trip. If the fused call fails (or a draft model
+    is configured for summaries), the two analyses run separately in parallel.
+    """
+    
+    def __init__(self, summarizer: CallSummarizer, personality_tracker: PersonalityTracker):
+        """
+        Args:
+            summarizer: CallSummarizer used for the separate-call path and record building
+            personality_tracker: PersonalityTracker used the same way
+        """
+        self.summarizer = summarizer
+        self.personality_tracker = personality_tracker
+    
+    def analyze(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        call_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Summarize the call and analyze the caller's personality.
+        
+        Args:
+            conversation_history: List of (role, content) tuples
+            user_id: Identifier for the caller
+            call_id: Unique call identifier
+        
+        Returns:
+            Tuple of (summary record, personality record)
+        """
+        has_user_messages = any(role == "user" for role, _ in conversation_history)
+        
+        # The draft/verify summary path, the neutral profile for calls with no
+        # user messages and the heuristics for short calls all live in the
+        # individual analyzers
+        if has_user_messages and not self.summarizer.draft_chat and not is_trivial_call(conversation_history):
+            if _batcher is not None:
+                return _batcher.submit(self, conversation_history, user_id, call_id).result()
+            return self._analyze_fused(conversation_history, user_id, call_id)
+        
+        return self._analyze_separately(conversation_history, user_id, call_id)
+    
+    async def analyze_async(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        call_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        analyze() without blocking the event loop.
+        
+        When the analyses can't be fused, summary and personality run as two
+        concurrent worker-thread calls joined with asyncio.gather.
+        """
+        has_user_messages = any(role == "user" for role, _ in conversation_history)
+        if has_user_messages and not self.summarizer.draft_chat and not is_trivial_call(conversation_history):
+            return await asyncio.to_thread(self.analyze, conversation_history, user_id, call_id)
+        
+        summary, personality = await asyncio.gather(
+            asyncio.to_thread(self.summarizer.summarize_call, conversation_history, user_id, call_id),
+            asyncio.to_thread(self.personality_tracker.analyze_personality, conversation_history, user_id, call_id)
+        )
+        return summary, personality
+    
+    def analyze_batch(self, items: List[Tuple[str, str, List[Tuple[str, str]]]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Analyze several calls with one batched summary and one batched personality request.
+        
+        Args:
+            items: (user_id, call_id, conversation_history) per call
+            
+        Returns:
+            (summary record, personality record) per item, in order
+        """
+        if len(items) == 1:
+            user_id, call_id, conversation_history = items[0]
+            return [self._analyze_fused(conversation_history, user_id, call_id)]
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            summary_future = pool.submit(self.summarizer.summarize_batch, items)
+            personality_future = pool.submit(self.personality_tracker.analyze_batch, items)
+            return list(zip(summary_future.result(), personality_future.result()))
+    
+    def _analyze_fused(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        call_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Fused single-request analysis, falling back to separate calls."""
+        try:
+            summary_data, personality_data = self._extract_with_llm(conversation_history)
+            now = datetime.now()
+            summary = self.summarizer.build_summary_record(summary_data, conversation_history, user_id, call_id, now)
+            personality = self.personality_tracker.build_personality_record(personality_data, user_id, call_id, now)
+            logger.info("✅ Analyzed call %s for user %s in one LLM call", call_id, user_id)
+            return summary, personality
+        except Exception as e:
+            logger.warning("⚠️ Fused call analysis failed for call %s, running analyses separately: %s", call_id, e)
+        
+        return self._analyze_separately(conversation_history, user_id, call_id)
+    
+    def _extract_with_llm(self, conversation_history: List[Tuple[str, str]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Issue the fused prompt and split the response into summary and personality data."""
+        full_transcript, transcript = self.summarizer._build_transcripts(conversation_history)
+        
+        cached = response_cache.get("call_analysis", full_transcript)
+        if cached is not None:
+            return cached["summary"], cached["personality"]
+        
+        messages = [
+            {"role": "system", "content": CALL_ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Analyze this conversation.\n\nCONVERSATION:\n{transcript}"}
+        ]
+        
+        response = self.summarizer.llm_chat(messages, temperature=0.2, max_tokens=900)
+        data = parse_llm_json(CallSummarizer._response_text(response))
+        
+        summary_data = CallSummarizer.validate_summary(data["summary"])
+        personality_data = PersonalityTracker.validate_scores(data["personality"])
+        response_cache.set("call_analysis", full_transcript, {"summary": summary_data, "personality": personality_data})
+        return summary_data, personality_data
+    
+    def _analyze_separately(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        call_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Run summary and personality as two concurrent LLM calls."""
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            summary_future = pool.submit(
+                self.summarizer.summarize_call,
+                conversation_history,
+                user_id,
+                call_id
+            )
+            personality_future = pool.submit(
+                self.personality_tracker.analyze_personality,
+                conversation_history,
+                user_id,
+                call_id
+            )
+            return summary_future.result(), personality_future.result()
+
+_BatchEntry = Tuple[CallAnalysisPipeline, Tuple[str, str, List[Tuple[str, str]]], Future]
+
+class _AnalysisBatcher:
+    """
+    Collects analyze() requests from concurrent callers and flushes them as
+    analyze_batch() calls when max_batch requests are queued or window_seconds
+    after the first one arrived, whichever comes first. Requests from different
+    pipelines in the same window are flushed as one batch per pipeline.
+    """
+    
+    def __init__(self, max_batch: int, window_seconds: float):
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self._queue: "Queue[_BatchEntry]" = Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+    
+    def submit(self, pipeline: CallAnalysisPipeline, conversation_history: List[Tuple[str, str]],
+               user_id: str, call_id: str) -> Future:
+        """Queue a call for pipeline's next batch; the future resolves to (summary, personality)."""
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="analysis-batcher", daemon=True)
+                    self._worker.start()
+        future: Future = Future()
+        self._queue.put((pipeline, (user_id, call_id, conversation_history), future))
+        return future
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+            self._flush(batch)
+    
+    def _flush(self, batch: List[_BatchEntry]):
+        by_pipeline: Dict[CallAnalysisPipeline, List[_BatchEntry]] = {}
+        for entry in batch:
+            by_pipeline.setdefault(entry[0], []).append(entry)
+        
+        for pipeline, entries in by_pipeline.items():
+            try:
+                results = pipeline.analyze_batch([item for _, item, _ in entries])
+            except Exception as e:
+                logger.error("❌ Batched call analysis failed: %s", e, exc_info=True)
+                for _, _, future in entries:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(entries, results):
+                future.set_result(result)
+
+_batcher: Optional[_AnalysisBatcher] = (
+    _AnalysisBatcher(ANALYSIS_BATCH_SIZE, ANALYSIS_BATCH_WINDOW_MS / 1000) if ANALYSIS_BATCH_SIZE > 1 else None
+)
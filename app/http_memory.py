@@ -118,6 +118,16 @@ PATTERNS = {
     "single_name": re.compile(r"\b([A-Z][a-z]{2,})\b")  # ✅ NEW: Single names like "Kelly"
 }
 
+# Single name after a relationship keyword, compiled once per keyword:
+# "wife Kelly", "my wife Kelly", "wife is Kelly", "wife's name is Kelly"
+REL_NAME_PATTERNS = {
+    rel: tuple(
+        re.compile(rf"\b{re.escape(keyword)}(?:'?s?\s+name)?(?:\s+is)?\s+([A-Z][a-z]{{2,}})\b", re.IGNORECASE)
+        for keyword in keywords
+    )
+    for rel, keywords in RELATIONSHIP_KEYWORDS.items()
+}
+
 class HTTPMemoryStore:
     """
     HTTP-based memory store that connects to AI-Memory service instead of direct PostgreSQL.
@@ -512,12 +522,8 @@ class HTTPMemoryStore:
                     # Strategy 2: Try single name after relationship keyword
                     # Patterns: "wife Kelly", "my wife Kelly", "wife is Kelly", "wife's name is Kelly"
                     if not name:
-                        for keyword in keywords:
+                        for single_pattern in REL_NAME_PATTERNS[rel]:
                             # Look for: "keyword NAME" or "keyword is NAME" or "keyword's name is NAME"
-                            single_pattern = re.compile(
-                                rf"\b{re.escape(keyword)}(?:'?s?\s+name)?(?:\s+is)?\s+([A-Z][a-z]{{2,}})\b",
-                                re.IGNORECASE
-                            )
                             single_match = single_pattern.search(value_str)
                             if single_match:
                                 name = single_match.group(1).strip().title()
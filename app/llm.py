@@ -1,12 +1,13 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import json
 import threading
 import time
 from queue import Queue
 from typing import List, Dict, Any, Tuple, Generator, Optional
-from config_loader import get_llm_config
+from config_loader import get_llm_config, get_setting
 try:
     from websocket import WebSocketApp
 except ImportError:
@@ -17,6 +18,13 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session so LLM calls reuse keep-alive connections instead of
+# paying a TCP+TLS handshake per request (summarizer and personality
+# analysis run concurrently, hence the pool size)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+
 def _get_llm_config():
     """Get LLM configuration dynamically for hot reload support"""
     return get_llm_config()
@@ -29,6 +37,22 @@ def _get_headers():
         headers["Authorization"] = f"Bearer {config['api_key']}"
     return headers
 
+def _mark_cacheable_prefix(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mark the leading system message with an ephemeral cache_control breakpoint.
+    
+    For Anthropic-style gateways that only reuse a prompt prefix when asked to
+    (enable with llm_prompt_cache_control). OpenAI and vLLM prefix caching is
+    automatic and only needs the static system prompt to come first.
+    """
+    if not messages or messages[0].get("role") != "system" or not isinstance(messages[0].get("content"), str):
+        return messages
+    system = {
+        "role": "system",
+        "content": [{"type": "text", "text": messages[0]["content"], "cache_control": {"type": "ephemeral"}}]
+    }
+    return [system] + list(messages[1:])
+
 def chat(messages: List[Dict[str, str]], temperature: float = 0.6, top_p: float = 0.9, max_tokens: int = 800) -> Tuple[str, Dict[str, Any]]:
     """
     Call the LLM endpoint with the provided messages and parameters.
@@ -52,6 +76,9 @@ def chat(messages: List[Dict[str, str]], temperature: float = 0.6, top_p: float
     if base_url == "http://localhost:8000":
         return _mock_llm_response(messages, temperature, top_p, max_tokens)
     
+    if str(get_setting("llm_prompt_cache_control", "false")).lower() in ("1", "true", "yes"):
+        messages = _mark_cacheable_prefix(messages)
+    
     payload = {
         "model": model,
         "messages": messages,
@@ -66,7 +93,7 @@ def chat(messages: List[Dict[str, str]], temperature: float = 0.6, top_p: float
         # Handle base_url that may or may not include /v1
         endpoint_url = f"{base_url}/chat/completions" if base_url.endswith('/v1') else f"{base_url}/v1/chat/completions"
         
-        response = requests.post(
+        response = _session.post(
             endpoint_url,
             json=payload,
             headers=headers,
@@ -100,6 +127,225 @@ def chat(messages: List[Dict[str, str]], temperature: float = 0.6, top_p: float
         logger.error(f"Unexpected error calling LLM: {e}")
         raise Exception(f"LLM service error: {str(e)}")
 
+def _json_end(text: str, start: int, depth: int, in_string: bool, escaped: bool) -> Tuple[int, int, bool, bool]:
+    """
+    Scan text[start:] for the end of a top-level JSON object or array.
+    
+    Returns:
+        (index just past the closing bracket or -1, depth, in_string, escaped)
+        so scanning can resume on the next streamed chunk
+    """
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]" and depth > 0:
+            depth -= 1
+            if depth == 0:
+                return i + 1, depth, in_string, escaped
+    return -1, depth, in_string, escaped
+
+def _get_analysis_llm_config():
+    """Get analysis model configuration dynamically for hot reload support"""
+    return {
+        "base_url": get_setting("analysis_llm_base_url", ""),  # e.g. vLLM serving an AWQ/GPTQ int8 model
+        "model": get_setting("analysis_llm_model", ""),
+        "api_key": get_setting("analysis_llm_api_key", "")
+    }
+
+def _stream_json_completion(
+    base_url: str,
+    model: str,
+    headers: Dict[str, str],
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    top_p: float,
+    max_tokens: int,
+    timeout: int
+) -> Tuple[str, Dict[str, Any], bool]:
+    """
+    Stream a completion, hanging up once the top-level JSON value closes.
+    
+    Usage is requested with stream_options, so it arrives in a final chunk
+    after the content. Once the JSON has closed, the stream is read on only
+    until that chunk; if the model keeps generating instead, it is cut off.
+    
+    Returns:
+        (response_content, usage_stats, whether a complete JSON value was seen)
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "top_p": top_p,
+        "max_tokens": max_tokens,
+        "stop": ["\n\n\n"],
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+    endpoint_url = f"{base_url}/chat/completions" if base_url.endswith('/v1') else f"{base_url}/v1/chat/completions"
+    
+    parts = []
+    complete = False
+    usage: Dict[str, Any] = {}
+    depth, in_string, escaped = 0, False, False
+    with _session.post(endpoint_url, json=payload, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            usage = chunk.get("usage") or usage
+            choices = chunk.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if complete:
+                if delta:
+                    # Closing the stream makes the server stop generating
+                    break
+                continue
+            if not delta:
+                continue
+            # Only the new chunk is scanned; the parser state carries over
+            end, depth, in_string, escaped = _json_end(delta, 0, depth, in_string, escaped)
+            if end != -1:
+                parts.append(delta[:end])
+                complete = True
+            else:
+                parts.append(delta)
+    return "".join(parts), usage, complete
+
+def _analysis_model_json(messages: List[Dict[str, Any]], temperature: float, top_p: float, max_tokens: int) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Try the dedicated analysis model; None if it isn't configured or didn't return valid JSON.
+    """
+    config = _get_analysis_llm_config()
+    if not config["base_url"]:
+        return None
+    
+    headers = {"Content-Type": "application/json"}
+    if config["api_key"]:
+        headers["Authorization"] = f"Bearer {config['api_key']}"
+    try:
+        text, usage, complete = _stream_json_completion(
+            config["base_url"], config["model"], headers, messages, temperature, top_p, max_tokens, timeout=30
+        )
+        if complete:
+            start = min(index for index in (text.find("{"), text.find("[")) if index != -1)
+            json.loads(text[start:])
+            return text, usage
+        logger.warning("Analysis model returned no complete JSON, using main LLM")
+    except Exception as e:
+        logger.warning(f"Analysis model failed, using main LLM: {e}")
+    return None
+
+def chat_json(messages: List[Dict[str, str]], temperature: float = 0.2, top_p: float = 0.9, max_tokens: int = 800) -> Tuple[str, Dict[str, Any]]:
+    """
+    chat() for prompts that answer with a single JSON value.
+    
+    Streams the completion and hangs up as soon as the top-level JSON object
+    or array closes, so trailing prose or a runaway generation isn't decoded
+    up to max_tokens. Responses without JSON (e.g. a verifier's "ACCEPT")
+    are read to the end as usual.
+    
+    When analysis_llm_base_url is set, the request first goes to that
+    dedicated (typically small, int8/FP8-quantized) extraction model; the
+    main LLM only runs if it fails or returns invalid JSON.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content' keys
+        temperature: Sampling temperature (0.0 to 2.0)
+        top_p: Top-p sampling parameter (0.0 to 1.0)
+        max_tokens: Upper bound on generated tokens
+        
+    Returns:
+        Tuple of (response_content, usage_stats)
+    """
+    config = _get_llm_config()
+    base_url = config["base_url"]
+    
+    if base_url == "http://localhost:8000":
+        return _mock_llm_response(messages, temperature, top_p, max_tokens)
+    
+    analysis_result = _analysis_model_json(messages, temperature, top_p, max_tokens)
+    if analysis_result is not None:
+        logger.info(f"Analysis model JSON response received: {len(analysis_result[0])} chars")
+        return analysis_result
+    
+    if str(get_setting("llm_prompt_cache_control", "false")).lower() in ("1", "true", "yes"):
+        messages = _mark_cacheable_prefix(messages)
+    
+    try:
+        text, usage, _ = _stream_json_completion(
+            base_url, config["model"], _get_headers(), messages, temperature, top_p, max_tokens, timeout=120
+        )
+    except requests.exceptions.Timeout:
+        logger.error("LLM request timeout")
+        raise Exception("LLM request timed out. Please try again.")
+    except requests.exceptions.ConnectionError:
+        logger.error(f"Failed to connect to LLM at {base_url}")
+        raise Exception("Failed to connect to LLM service. Please check configuration.")
+    except requests.exceptions.HTTPError as e:
+        logger.error(f"LLM HTTP error: {e}")
+        raise Exception(f"LLM service error: {e}")
+    
+    logger.info(f"LLM JSON response received: {len(text)} chars")
+    return text, usage
+
+def _get_draft_llm_config():
+    """Get draft model configuration dynamically for hot reload support"""
+    return {
+        "base_url": get_setting("draft_llm_base_url", ""),  # e.g. llama.cpp server at http://127.0.0.1:8081/v1
+        "model": get_setting("draft_llm_model", "qwen2.5-1.5b-instruct-q4_k_m")
+    }
+
+def draft_llm_enabled() -> bool:
+    """True when a small local draft model is configured."""
+    return bool(_get_draft_llm_config()["base_url"])
+
+def draft_chat(messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 500) -> Tuple[str, Dict[str, Any]]:
+    """
+    Call the small local draft model (any OpenAI-compatible server, e.g. llama.cpp).
+    
+    Used to draft structured outputs that the main LLM then verifies.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content' keys
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate
+        
+    Returns:
+        Tuple of (response_content, usage_stats)
+    """
+    config = _get_draft_llm_config()
+    base_url = config["base_url"]
+    if not base_url:
+        raise Exception("Draft LLM is not configured")
+    
+    endpoint_url = f"{base_url}/chat/completions" if base_url.endswith('/v1') else f"{base_url}/v1/chat/completions"
+    payload = {
+        "model": config["model"],
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    
+    response = _session.post(endpoint_url, json=payload, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+    return data["choices"][0]["message"]["content"], data.get("usage", {})
+
 def _mock_llm_response(messages: List[Dict[str, str]], temperature: float, top_p: float, max_tokens: int) -> Tuple[str, Dict[str, Any]]:
     """
     Generate a mock LLM response for development/testing.
@@ -1,17 +1,23 @@
 import os
 import time
 import logging
+import threading
 from typing import List, Optional, Deque, Tuple, Dict, Any
 from collections import defaultdict, deque
 
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 import json
 import asyncio
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from config_loader import get_secret, get_setting
 import sys
 import os
@@ -24,12 +30,12 @@ except ImportError:
     def get_admin_setting(setting_key, default=None):
         return get_setting(setting_key, default)
 from app.models import ChatRequest, ChatResponse, MemoryObject
-from app.llm import chat as llm_chat, chat_realtime_stream, _get_llm_config, validate_llm_connection
+from app.llm import chat as llm_chat, chat_json as llm_chat_json, chat_realtime_stream, _get_llm_config, validate_llm_connection, draft_chat, draft_llm_enabled
 from app.memory import MemoryStore
 from app.http_memory import HTTPMemoryStore
 from app.packer import pack_prompt, should_remember, extract_carry_kit_items, detect_safety_triggers
 from app.tools import tool_dispatcher, parse_tool_calls, execute_tool_calls
-from app.middleware.auth import validate_jwt  # 🔐 Week 2: JWT authentication
+from app.middleware.auth import security, decode_customer_id  # 🔐 Week 2: JWT authentication
 from app.jwt_utils import generate_memory_token  # 🔐 Week 2: JWT generation (SHARED with ChatStack)
 
 # -----------------------------------------------------------------------------
@@ -44,6 +50,12 @@ logger = logging.getLogger(__name__)
 # -----------------------------------------------------------------------------
 memory_store: Optional[MemoryStore] = None
 
+# Background tasks run in the threadpool, so they write over their own
+# connection: a SET app.current_tenant + INSERT on the shared one could
+# interleave with request handlers setting other tenants
+background_store: Optional[MemoryStore] = None
+_background_store_lock = threading.Lock()
+
 # In-process rolling history per thread (survives across calls in same container)
 # 500 msgs ~= ~250 user/assistant turns. Consolidation triggers at 400.
 THREAD_HISTORY: Dict[str, Deque[Tuple[str, str]]] = defaultdict(lambda: deque(maxlen=500))
@@ -307,6 +319,8 @@ async def lifespan(app: FastAPI):
         try:
             if memory_store:
                 memory_store.close()
+            if background_store:
+                background_store.close()
         except Exception:
             pass
 
@@ -317,7 +331,8 @@ app = FastAPI(
     title="NeuroSphere Orchestrator",
     description="ChatGPT-style conversational AI with long-term memory and tool calling",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if orjson else JSONResponse
 )
 
 # CORS disabled - Nginx proxy provides security
@@ -335,10 +350,30 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 def get_memory_store() -> MemoryStore:
     if memory_store is None:
         raise HTTPException(status_code=503, detail="Memory store not initialized - service degraded")
+    memory_store.ensure_connection()
     if not memory_store.available:
         raise HTTPException(status_code=503, detail="Memory store unavailable - service degraded")
     return memory_store
 
+async def tenant_context(request: Request, mem_store: MemoryStore = Depends(get_memory_store)) -> int:
+    """
+    Validate the JWT and scope the shared connection to its tenant.
+    
+    One dependency in place of validate_jwt plus the SET app.current_tenant
+    each tenant-scoped endpoint used to run itself. The token is read with
+    the same HTTPBearer scheme as validate_jwt, so a missing or malformed
+    Authorization header gets the same error status.
+    
+    Returns:
+        customer_id from the validated token
+    """
+    credentials = await security(request)
+    customer_id = decode_customer_id(credentials.credentials)
+    with mem_store.conn.cursor() as cur:
+        cur.execute("SET app.current_tenant = %s", (customer_id,))
+    logger.debug("✅ Tenant context set to customer_id=%s", customer_id)
+    return customer_id
+
 IMPORTANT_TYPES = {"person", "preference", "project", "rule", "moment"}
 
 def should_store_memory(user_text: str, memory_type: str = "") -> bool:
@@ -393,9 +428,27 @@ async def health_check(mem_store: MemoryStore = Depends(get_memory_store)):
 # -----------------------------------------------------------------------------
 # Chat with persistent thread history + optional recap
 # -----------------------------------------------------------------------------
+def store_carry_kit(carry_kit_items: List[Dict[str, Any]], user_id: Optional[str] = None):
+    """Store extracted carry-kit items in one batch (run as a background task)."""
+    global background_store
+    try:
+        # Serialized, so concurrent tasks don't interleave on background_store either
+        with _background_store_lock:
+            if background_store is None:
+                background_store = MemoryStore()
+            background_store.ensure_connection()
+            if not background_store.available:
+                raise RuntimeError("database unavailable")
+            memory_ids = background_store.write_many(carry_kit_items, user_id=user_id, scope="user")
+        for item, memory_id in zip(carry_kit_items, memory_ids):
+            logger.info(f"🧠 Stored carry-kit for user {user_id}: {item['type']}:{item['key']} -> {memory_id}")
+    except Exception as e:
+        logger.error(f"Carry-kit write failed: {e}")
+
 @app.post("/v1/chat", response_model=ChatResponse)
 async def chat_completion(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     thread_id: str = "default",
     user_id: Optional[str] = None,
     mem_store: MemoryStore = Depends(get_memory_store),
@@ -418,23 +471,19 @@ async def chat_completion(
                 break
         if not user_message:
             raise HTTPException(status_code=400, detail="No user message found")
+        user_message_lower = user_message.lower()
 
         # Safety rails
-        safety_mode = request.safety_mode or detect_safety_triggers(user_message)
+        safety_mode = request.safety_mode or detect_safety_triggers(user_message, content_lower=user_message_lower)
         if safety_mode:
             logger.info("🛡️ Safety mode activated")
 
-        # Opportunistic carry-kit write
-        if should_remember(user_message):
-            for item in extract_carry_kit_items(user_message):
-                try:
-                    memory_id = mem_store.write(
-                        item["type"], item["key"], item["value"],
-                        user_id=user_id, scope="user", ttl_days=item.get("ttl_days", 365)
-                    )
-                    logger.info(f"🧠 Stored carry-kit for user {user_id}: {item['type']}:{item['key']} -> {memory_id}")
-                except Exception as e:
-                    logger.error(f"Carry-kit write failed: {e}")
+        # Opportunistic carry-kit write, after the response is sent; the new
+        # items become searchable from the next turn
+        if should_remember(user_message, content_lower=user_message_lower):
+            carry_kit_items = extract_carry_kit_items(user_message, content_lower=user_message_lower)
+            if carry_kit_items:
+                background_tasks.add_task(store_carry_kit, carry_kit_items, user_id)
 
         # ✅ CRITICAL FIX: First, explicitly fetch the manually saved normalized schema
         # Semantic search won't find it, so we need a direct lookup
@@ -455,7 +504,7 @@ async def chat_completion(
                 logger.error(f"Failed to fetch manual schema: {e}")
         
         # Long-term memory retrieve (user-specific + shared)
-        search_k = 15 if any(w in (user_message.lower()) for w in
+        search_k = 15 if any(w in user_message_lower for w in
                              ["wife","husband","family","friend","name","who is","kelly","job","work","teacher"]) else 6
         retrieved_memories = mem_store.search(user_message, user_id=user_id, k=search_k)
         
@@ -641,6 +690,7 @@ async def chat_completion(
 @app.post("/v1/chat/completions", response_model=ChatResponse)
 async def chat_completions_alias(
     request: Request,
+    background_tasks: BackgroundTasks,
     thread_id: str = "default",
     user_id: Optional[str] = None,
     mem_store: MemoryStore = Depends(get_memory_store)
@@ -649,7 +699,7 @@ async def chat_completions_alias(
         body = await request.json()
         chat_req = ChatRequest(**body)
         return await chat_completion(
-            chat_req, thread_id=thread_id, user_id=user_id, mem_store=mem_store
+            chat_req, background_tasks, thread_id=thread_id, user_id=user_id, mem_store=mem_store
         )
     except Exception as e:
         logger.error(f"Alias /v1/chat/completions failed: {e}")
@@ -663,18 +713,13 @@ async def get_memories(
     limit: int = 50,
     memory_type: Optional[str] = None,
     user_id: Optional[str] = None,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """🔐 Week 2: Now requires JWT authentication"""
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # 🔐 Set tenant context for RLS (psycopg2 style)
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        logger.debug(f"✅ Tenant context set to customer_id={customer_id}")
-        
         if user_id:
             memories = mem_store.get_user_memories(user_id, limit=limit, include_shared=True)
         else:
@@ -687,7 +732,7 @@ async def get_memories(
 @app.post("/v1/memories")
 async def store_memory(
     memory: MemoryObject,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """🔐 Week 2: Now requires JWT authentication"""
@@ -695,18 +740,14 @@ async def store_memory(
     
     import json
     try:
-        # 🔐 Set tenant context for RLS (psycopg2 style)
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        logger.debug(f"✅ Tenant context set to customer_id={customer_id}")
-        
-        if isinstance(memory.value, dict):
+        value = memory.value
+        if isinstance(value, dict):
             # Ensure structured JSON (like prompt_blocks) is stored correctly
-            memory.value = json.dumps(memory.value, ensure_ascii=False)
+            value = json.dumps(value, ensure_ascii=False)
             logger.info(f"🧠 Stored structured JSON for key={memory.key}")    
 
         memory_id = mem_store.write(
-            memory.type, memory.key, memory.value,
+            memory.type, memory.key, value,
             user_id=None, scope="shared",
             ttl_days=memory.ttl_days, source=memory.source
         )
@@ -739,18 +780,13 @@ async def delete_memory(
 async def store_user_memory(
     memory: MemoryObject,
     user_id: str,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """🔐 Week 2: Now requires JWT authentication"""
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # 🔐 Set tenant context for RLS (psycopg2 style)
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        logger.debug(f"✅ Tenant context set to customer_id={customer_id}")
-        
         memory_id = mem_store.write(
             memory.type, memory.key, memory.value,
             user_id=user_id, scope="user",
@@ -785,18 +821,13 @@ async def get_user_memories(
     query: str = "",
     limit: int = 10,
     include_shared: bool = True,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """🔐 Week 2: Now requires JWT authentication"""
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # 🔐 Set tenant context for RLS (psycopg2 style)
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        logger.debug(f"✅ Tenant context set to customer_id={customer_id}")
-        
         if query:
             memories = mem_store.search(query, user_id=user_id, k=limit, include_shared=include_shared)
         else:
@@ -851,30 +882,48 @@ async def execute_tool(tool_name: str, parameters: dict):
 from app.models import ProcessCallRequest, EnrichedContextRequest, SearchSummariesRequest
 from app.memory_integration import MemoryV2Integration
 
+# One integration per worker, so the call analysis pipeline (and its
+# micro-batching queue) is shared across requests
+memory_v2_integration: Optional[MemoryV2Integration] = None
+
+def get_memory_v2(mem_store: MemoryStore = Depends(get_memory_store)) -> MemoryV2Integration:
+    global memory_v2_integration
+    if memory_v2_integration is None or memory_v2_integration.memory_store is not mem_store:
+        memory_v2_integration = MemoryV2Integration(mem_store, llm_chat_json, draft_chat if draft_llm_enabled() else None)
+    return memory_v2_integration
+
 @app.post("/v2/process-call")
 async def process_call_v2(
     request: ProcessCallRequest,
-    customer_id: int = Depends(validate_jwt),
-    mem_store: MemoryStore = Depends(get_memory_store)
+    customer_id: int = Depends(tenant_context),
+    mem_store: MemoryStore = Depends(get_memory_store),
+    memory_v2: MemoryV2Integration = Depends(get_memory_v2)
 ):
     """
     Process completed call - auto-summarize and track personality
     
+    Mid-call checkpoints (call_ended=false) are only summarized once enough
+    has been added since the last one; otherwise the call is skipped.
+    
     🔐 Requires JWT authentication
     🎯 RLS automatically filters by customer_id
     """
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
+    if not memory_v2.should_process_call(
+        len(request.conversation_history),
+        tokens_since_last=request.tokens_since_last,
+        call_ended=request.call_ended,
+        call_id=request.thread_id
+    ):
+        return {"success": True, "skipped": True, "call_id": request.thread_id}
+    
     try:
-        # Set tenant context for RLS
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        
-        memory_v2 = MemoryV2Integration(mem_store, llm_chat)
-        result = memory_v2.process_completed_call(
-            conversation_history=[(msg[0], msg[1]) for msg in request.conversation_history],
+        result = await memory_v2.process_completed_call_async(
+            conversation_history=request.conversation_history,
             user_id=request.user_id,
-            thread_id=request.thread_id
+            thread_id=request.thread_id,
+            customer_id=customer_id
         )
         return {"success": True, **result}
     except Exception as e:
@@ -884,8 +933,9 @@ async def process_call_v2(
 @app.post("/v2/context/enriched")
 async def get_enriched_context_v2(
     request: EnrichedContextRequest,
-    customer_id: int = Depends(validate_jwt),
-    mem_store: MemoryStore = Depends(get_memory_store)
+    customer_id: int = Depends(tenant_context),
+    mem_store: MemoryStore = Depends(get_memory_store),
+    memory_v2: MemoryV2Integration = Depends(get_memory_v2)
 ):
     """
     Get enriched caller context (fast - <1 second)
@@ -896,13 +946,8 @@ async def get_enriched_context_v2(
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # Set tenant context for RLS
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        
-        memory_v2 = MemoryV2Integration(mem_store, llm_chat)
         # Note: num_summaries is currently hardcoded in the method (default: 5)
-        context = memory_v2.get_enriched_context_for_call(user_id=request.user_id)
+        context = memory_v2.get_enriched_context_for_call(user_id=request.user_id, customer_id=customer_id)
         summary_count = len([line for line in context.split("\n") if line.strip().startswith("Call")]) if context else 0
         return {
             "success": True,
@@ -918,12 +963,20 @@ async def get_enriched_context_v2(
 async def get_call_summaries_v2(
     user_id: str,
     limit: int = 10,
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
-    """Get call summaries for a user"""
+    """
+    Get call summaries for a user
+    
+    🔐 Requires JWT authentication
+    🎯 RLS automatically filters by customer_id
+    """
+    logger.info(f"🔐 JWT validated: customer_id={customer_id}")
+    
     try:
         # Use search_call_summaries with empty query to get recent summaries
-        summaries = mem_store.search_call_summaries(user_id, query_text="", limit=limit)
+        summaries = mem_store.search_call_summaries(user_id, query_text="", limit=limit, customer_id=customer_id)
         return {
             "success": True,
             "user_id": user_id,
@@ -937,7 +990,7 @@ async def get_call_summaries_v2(
 @app.get("/v2/profiles")
 async def get_all_caller_profiles_v2(
     limit: int = 100,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """
@@ -949,10 +1002,6 @@ async def get_all_caller_profiles_v2(
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # Set tenant context for RLS
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        
         # Get profiles (RLS filters automatically)
         profiles = mem_store.get_all_caller_profiles(limit=limit)
         
@@ -1036,12 +1085,21 @@ async def get_personality_averages_v2(
 @app.post("/v2/summaries/search")
 async def search_call_summaries_v2(
     request: SearchSummariesRequest,
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
-    """Semantic search on call summaries (not raw data)"""
+    """
+    Semantic search on call summaries (not raw data)
+    
+    🔐 Requires JWT authentication
+    🎯 RLS automatically filters by customer_id
+    """
+    logger.info(f"🔐 JWT validated: customer_id={customer_id}")
+    
     try:
         results = mem_store.search_call_summaries(
             user_id=request.user_id,
+            customer_id=customer_id,
             query_text=request.query,
             limit=request.limit or 5
         )
@@ -1059,7 +1117,7 @@ async def search_call_summaries_v2(
 @app.post("/memory/store")
 async def legacy_memory_store(
     request: Request,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """
@@ -1073,11 +1131,6 @@ async def legacy_memory_store(
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # 🔐 Set tenant context for RLS (psycopg2 style)
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        logger.debug(f"✅ Tenant context set to customer_id={customer_id}")
-        
         payload = await request.json()
         user_id = payload.get("user_id")
         role = payload.get("role", "user")
@@ -1113,7 +1166,7 @@ async def legacy_memory_store(
 @app.post("/memory/retrieve")
 async def legacy_memory_retrieve(
     request: Request,
-    customer_id: int = Depends(validate_jwt),
+    customer_id: int = Depends(tenant_context),
     mem_store: MemoryStore = Depends(get_memory_store)
 ):
     """
@@ -1127,11 +1180,6 @@ async def legacy_memory_retrieve(
     logger.info(f"🔐 JWT validated: customer_id={customer_id}")
     
     try:
-        # 🔐 Set tenant context for RLS (psycopg2 style)
-        with mem_store.conn.cursor() as cur:
-            cur.execute("SET app.current_tenant = %s", (customer_id,))
-        logger.debug(f"✅ Tenant context set to customer_id={customer_id}")
-        
         payload = await request.json()
         user_id = payload.get("user_id")
         limit = payload.get("limit", 500)
@@ -1,38 +1,192 @@
 import os
 import json
+import functools
 import uuid
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 import psycopg2
-from psycopg2.extras import Json, RealDictCursor
+from psycopg2.extras import Json, RealDictCursor, execute_values, register_default_json, register_default_jsonb
 from datetime import datetime, timedelta
+from jinja2 import Environment
 
 # Import centralized configuration
 from config_loader import get_setting, get_database_url
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+except ImportError:
+    ORTModelForFeatureExtraction = None
+    AutoTokenizer = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
 EMBED_DIM = int(get_setting("embed_dim", 768))
+EMBED_MODEL = get_setting("embed_model", "")  # e.g. "BAAI/bge-small-en-v1.5" (requires embed_dim=384)
+EMBED_MODEL_FILE = get_setting("embed_model_file", "model_quantized.onnx")
+EMBED_CACHE_SIZE = int(get_setting("embed_cache_size", 1024))  # texts whose embeddings are kept in memory
 DB_URL = get_database_url()
+DB_RECYCLE_SECONDS = int(get_setting("db_recycle_seconds", 1800))  # reopen connections older than this
+DB_PING_IDLE_SECONDS = int(get_setting("db_ping_idle_seconds", 30))  # ping before use after this much idle time
+DB_RETIRE_GRACE_SECONDS = int(get_setting("db_retire_grace_seconds", 60))  # keep replaced connections open this long for in-flight queries
+HNSW_EF_SEARCH = int(get_setting("hnsw_ef_search", 40))  # HNSW candidate list size; higher = better recall, slower
+SUMMARY_INDEX_MAX_MB = int(get_setting("summary_index_max_mb", 64))  # per-worker budget for cached summary vectors
+RECENT_SUMMARY_TTL_SECONDS = int(get_setting("recent_summary_ttl_seconds", 60))  # max staleness of cached recent summaries; 0 disables
+
+# With halfvec_search=true, memory search ranks half-precision copies of the
+# embeddings so it can use the halfvec HNSW index (half the size of a
+# full-precision one, see init_db.py and migration 005). Opt-in: it requires
+# pgvector >= 0.7 and that index, otherwise searches fail or scan the table
+HALFVEC_SEARCH = str(get_setting("halfvec_search", "false")).lower() in ("1", "true", "yes")
+_MEMORY_VECTOR_TYPE = f"halfvec({EMBED_DIM})" if HALFVEC_SEARCH else "vector"
+_MEMORY_EMBEDDING = f"embedding::{_MEMORY_VECTOR_TYPE}" if HALFVEC_SEARCH else "embedding"
+
+# JSON codec for JSON/JSONB columns: orjson when installed, stdlib otherwise
+if orjson is not None:
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    register_default_json(globally=True, loads=_json_loads)
+    register_default_jsonb(globally=True, loads=_json_loads)
+else:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+# Embeddings are sent as pgvector text literals ('[x,y,...]') rather than Python
+# lists: psycopg2 renders a list as ARRAY[...] of 17-digit floats that the server
+# parses as numeric[] before casting to vector. Nine significant digits round-trip
+# float32 exactly, which is all a vector column stores
+_VECTOR_FORMATS: Dict[int, str] = {}
+
+def _vector_literal(vector: np.ndarray) -> str:
+    """Format an embedding as a pgvector text literal."""
+    values = vector.astype(np.float32).tolist()
+    fmt = _VECTOR_FORMATS.get(len(values))
+    if fmt is None:
+        fmt = _VECTOR_FORMATS[len(values)] = "[" + ",".join(["%.9g"] * len(values)) + "]"
+    return fmt % tuple(values)
+
+class EmbeddingEncoder:
+    """
+    Local sentence encoder running an int8-quantized ONNX model on CPU.
+    
+    Enabled by setting embed_model; requires optimum[onnxruntime]. Uses CLS
+    pooling (BGE-style models) and returns unit-length vectors.
+    """
+    
+    def __init__(self, model_name: str, file_name: str = "model_quantized.onnx"):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_name,
+            provider="CPUExecutionProvider",
+            file_name=file_name
+        )
+    
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts in one forward pass.
+        
+        Returns:
+            float32 array of shape (len(texts), dim), rows normalized
+        """
+        inputs = self.tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="np")
+        outputs = self.model(**inputs)
+        vectors = np.asarray(outputs.last_hidden_state[:, 0], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+_encoder: Optional[EmbeddingEncoder] = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+def get_encoder() -> Optional[EmbeddingEncoder]:
+    """
+    Get the process-wide local encoder, loading it on first use.
+    
+    Returns None (hash placeholder is used) when embed_model is unset,
+    optimum is not installed, loading fails, or the model's output size
+    does not match embed_dim (the vector column width).
+    """
+    global _encoder, _encoder_loaded
+    if _encoder_loaded:
+        return _encoder
+    
+    with _encoder_lock:
+        if _encoder_loaded:
+            return _encoder
+        if EMBED_MODEL:
+            if ORTModelForFeatureExtraction is None:
+                logger.warning("embed_model is set but optimum[onnxruntime] is not installed - using placeholder embeddings")
+            else:
+                try:
+                    encoder = EmbeddingEncoder(EMBED_MODEL, EMBED_MODEL_FILE)
+                    dim = encoder.encode_batch(["dimension probe"]).shape[1]
+                    if dim != EMBED_DIM:
+                        logger.error(f"Embedding model {EMBED_MODEL} outputs {dim} dims but embed_dim={EMBED_DIM} - using placeholder embeddings")
+                    else:
+                        _encoder = encoder
+                        logger.info(f"✅ Loaded local embedding model {EMBED_MODEL} ({EMBED_MODEL_FILE})")
+                except Exception as e:
+                    logger.error(f"Failed to load embedding model {EMBED_MODEL}: {e}")
+        _encoder_loaded = True
+    return _encoder
+
+def embed_batch(texts: List[str]) -> np.ndarray:
+    """
+    Generate embedding vectors for several texts.
+    
+    Uses a single encoder forward pass when a local model is configured.
+    
+    Args:
+        texts: Input texts to embed
+        
+    Returns:
+        Array of shape (len(texts), EMBED_DIM) with normalized rows
+    """
+    encoder = get_encoder()
+    if encoder is not None:
+        return encoder.encode_batch(texts)
+    return np.vstack([embed(text) for text in texts]) if texts else np.empty((0, EMBED_DIM))
 
 def embed(text: str) -> np.ndarray:
     """
     Generate embedding vector for the given text.
     
-    This is currently a placeholder implementation using deterministic hashing.
-    In production, replace with a real embedding service like OpenAI embeddings,
-    Sentence Transformers, or similar.
+    Uses the local int8 ONNX encoder when embed_model is configured (see
+    get_encoder); otherwise falls back to a placeholder implementation using
+    deterministic hashing. Repeated texts (the same user message searched
+    more than once in a turn) are served from an LRU cache.
     
     Args:
         text: Input text to embed
         
     Returns:
-        Normalized embedding vector
+        Normalized float32 embedding vector (read-only view of the cached bytes)
     """
+    return np.frombuffer(_embed_bytes(text), dtype=np.float32)
+
+@functools.lru_cache(maxsize=EMBED_CACHE_SIZE)
+def _embed_bytes(text: str) -> bytes:
+    """Embedding of text as raw float32 bytes, so cache entries are compact and immutable."""
+    encoder = get_encoder()
+    if encoder is not None:
+        return encoder.encode_batch([text])[0].astype(np.float32).tobytes()
+    
     # Deterministic hash-based embedding (placeholder)
     # This ensures consistent embeddings for the same text across runs
     text_hash = abs(hash(text.lower().strip())) % (2**32)
@@ -44,29 +198,245 @@ def embed(text: str) -> np.ndarray:
     if norm > 0:
         vector = vector / norm
     
-    return vector
+    return vector.astype(np.float32).tobytes()
+
+class SummaryIndex:
+    """
+    In-process cache of call summary embeddings for brute-force similarity search.
+    
+    Per caller (customer_id, user_id), summaries are held as a contiguous
+    float32 matrix of unit vectors, so ranking is one matrix-vector product
+    instead of a pgvector scan. Callers are loaded on their first search and
+    evicted least recently used once the cached vectors exceed max_bytes.
+    
+    Each entry keeps a (count, max(created_at)) stamp of the rows it was
+    loaded from. MemoryStore checks it against the database in the same round
+    trip that fetches the ranked rows, so summaries written by other workers
+    are picked up on the next search.
+    """
+    
+    def __init__(self, max_bytes: int = SUMMARY_INDEX_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = 0
+        # (customer_id, user_id) -> (stamp, ids, matrix)
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[Tuple[int, Any], List[str], np.ndarray]]" = OrderedDict()
+    
+    @property
+    def max_rows(self) -> int:
+        """Most summaries one caller can have and still be cached."""
+        return self.max_bytes // (EMBED_DIM * 4)
+    
+    def get(self, customer_id: int, user_id: str) -> Optional[Tuple[Tuple[int, Any], List[str], np.ndarray]]:
+        """Return a caller's (stamp, ids, matrix) entry, or None if not cached."""
+        with self._lock:
+            entry = self._entries.get((customer_id, user_id))
+            if entry is not None:
+                self._entries.move_to_end((customer_id, user_id))
+            return entry
+    
+    def load(self, customer_id: int, user_id: str, rows: List[Tuple[Any, Any, datetime]]) -> Optional[Tuple[Tuple[int, Any], List[str], np.ndarray]]:
+        """
+        Cache a caller's summaries from (id, vector_send(embedding), created_at) rows.
+        
+        Returns:
+            The new entry, or None if the vectors don't fit in max_bytes and
+            the caller should use pgvector
+        """
+        if rows:
+            # vector_send is an int16 dim, an int16 pad, then big-endian float4s,
+            # so each row is one header-sized column plus dim float4 columns
+            raw = np.frombuffer(b"".join(bytes(row[1]) for row in rows), dtype=">f4").reshape(len(rows), -1)
+            matrix = self._normalize(raw[:, 1:].astype(np.float32))
+        else:
+            matrix = np.empty((0, EMBED_DIM), dtype=np.float32)
+        if matrix.nbytes > self.max_bytes:
+            return None
+        
+        stamp = (len(rows), max((row[2] for row in rows), default=None))
+        entry = (stamp, [str(row[0]) for row in rows], matrix)
+        key = (customer_id, user_id)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2].nbytes
+            self._entries[key] = entry
+            self._bytes += matrix.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2].nbytes
+        return entry
+    
+    def invalidate(self, customer_id: int, user_id: str) -> None:
+        """Drop a caller's entry so the next search reloads it."""
+        with self._lock:
+            entry = self._entries.pop((customer_id, user_id), None)
+            if entry is not None:
+                self._bytes -= entry[2].nbytes
+    
+    @classmethod
+    def rank(cls, entry: Tuple[Tuple[int, Any], List[str], np.ndarray], query_vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """
+        Find the k nearest summaries in a caller's entry.
+        
+        Returns:
+            List of (summary_id, l2_distance) sorted nearest first
+        """
+        _, ids, matrix = entry
+        if not ids or k <= 0:
+            return []
+        
+        query = cls._normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+        scores = matrix @ query
+        
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+        top = top[np.argsort(-scores[top])]
+        # Unit vectors: ||a - b|| = sqrt(2 - 2 cos), same ordering as pgvector's <->
+        distances = np.sqrt(np.maximum(0.0, 2.0 - 2.0 * scores[top]))
+        return [(ids[i], float(d)) for i, d in zip(top, distances)]
+    
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+# Process-wide summary index (shared by all MemoryStore instances)
+summary_index = SummaryIndex()
+
+class RecentSummaryCache:
+    """
+    Per-worker LRU of each caller's most recent call summaries.
+    
+    Filled as a side effect of building a caller's context (the bundle query
+    reads a page of PREFETCH_SUMMARIES rows instead of the 3 it renders), so
+    follow-up summary reads during the same call are served from memory.
+    Entries expire after ttl_seconds and are dropped when this worker stores
+    a new summary for the caller. A summary stored by another worker is not
+    seen here until the entry expires, so GET /v2/summaries/{user_id} can lag
+    a write on another worker by up to ttl_seconds
+    (recent_summary_ttl_seconds; 0 turns the cache off).
+    """
+    
+    def __init__(self, max_callers: int = 1000, ttl_seconds: int = RECENT_SUMMARY_TTL_SECONDS):
+        self.max_callers = max_callers
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (customer_id, user_id) -> (cached_at, rows newest first, complete)
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, List[Dict[str, Any]], bool]]" = OrderedDict()
+    
+    def get(self, customer_id: int, user_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Return up to limit recent summaries, or None if the cache can't answer."""
+        key = (customer_id, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_at, rows, complete = entry
+            if time.monotonic() - cached_at >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            if len(rows) < limit and not complete:
+                return None
+            self._entries.move_to_end(key)
+            return [dict(row) for row in rows[:limit]]
+    
+    def put(self, customer_id: int, user_id: str, rows: List[Dict[str, Any]], complete: bool) -> None:
+        """Cache rows (newest first); complete means the caller has no older summaries."""
+        key = (customer_id, user_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), rows, complete)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_callers:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, customer_id: int, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop((customer_id, user_id), None)
+
+PREFETCH_SUMMARIES = 10
+recent_summary_cache = RecentSummaryCache()
+
+# Caller context template, compiled once at import. JSONB fields are rendered
+# from the text Postgres returns; the json filter only covers rows that did
+# not come from get_caller_bundle.
+_template_env = Environment(trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True, autoescape=False)
+_template_env.filters["json"] = json.dumps
+
+CALLER_CONTEXT_TEMPLATE = _template_env.from_string("""\
+{% set ns = namespace(sep=false) %}
+{% if profile %}
+{% set ns.sep = true %}
+=== CALLER PROFILE ===
+{% if profile.preferred_name %}
+Name: {{ profile.preferred_name }}
+{% endif %}
+Total Calls: {{ profile.total_calls|default(0) }}
+First Call: {{ profile.first_call_date|default('Unknown') }}
+Last Call: {{ profile.last_call_date|default('Unknown') }}
+{% if profile.preferences %}
+Preferences: {{ profile.preferences_json or profile.preferences|json }}
+{% endif %}
+{% if profile.context %}
+Context: {{ profile.context_json or profile.context|json }}
+{% endif %}
+{% endif %}
+{% if personality_summary %}
+{% if ns.sep %}
+
+{% endif %}
+{% set ns.sep = true %}
+{{ personality_summary }}
+{% endif %}
+{% if summaries %}
+{% if ns.sep %}
+
+{% endif %}
+=== RECENT CALL SUMMARIES ===
+{% for s in summaries %}
+
+Call {{ loop.index }} ({{ s.call_date|default('Unknown') }}):
+  Summary: {{ s.summary|default('N/A') }}
+{% if s.key_topics %}
+  Topics: {{ s.key_topics|join(', ') }}
+{% endif %}
+{% if s.key_variables %}
+  Key Info: {{ s.key_variables_json or s.key_variables|json }}
+{% endif %}
+  Sentiment: {{ s.sentiment|default('neutral') }}
+{% endfor %}
+{% endif %}
+""")
 
 class MemoryStore:
     """
     PostgreSQL-based memory store with vector similarity search using pgvector.
     """
     
-    def __init__(self):
-        """Initialize connection to PostgreSQL database."""
-        if not DB_URL:
+    def __init__(self, db_url: Optional[str] = None):
+        """
+        Initialize connection to PostgreSQL database.
+        
+        Args:
+            db_url: Connection URL to use instead of DATABASE_URL (e.g. a
+                maintenance role for scripts)
+        """
+        db_url = db_url or DB_URL
+        if not db_url:
             raise ValueError("DATABASE_URL environment variable is required")
             
         # Ensure SSL is enabled for managed databases
-        db_url = DB_URL
         if 'sslmode=' not in db_url:
             db_url += ('&' if '?' in db_url else '?') + 'sslmode=require'
+        self.db_url = db_url
+        self.connected_at = 0.0
+        self.last_used_at = 0.0
+        self._conn_lock = threading.Lock()
+        self._retired: List[Tuple[float, Any]] = []  # (retired_at, connection) replaced by ensure_connection
             
         try:
-            logger.info("Connecting to PostgreSQL database...")
-            self.conn = psycopg2.connect(db_url, connect_timeout=5)
-            self.conn.autocommit = True
-            self.available = True
-            logger.info("✅ Connected to PostgreSQL database")
+            self._connect()
             
             # Verify pgvector extension is available
             self._verify_extension()
@@ -75,8 +445,90 @@ class MemoryStore:
             logger.error(f"❌ Failed to connect to database: {e}")
             self.available = False
             self.conn = None
+            self.last_used_at = time.monotonic()
             # Don't raise - allow app to start in degraded mode
 
+    def _connect(self):
+        """Open a new autocommit connection and warm it with a round trip."""
+        logger.info("Connecting to PostgreSQL database...")
+        conn = psycopg2.connect(self.db_url, connect_timeout=5)
+        conn.autocommit = True
+        
+        # Finish TLS/auth and backend startup now rather than on the first request.
+        # The connection is autocommit, so hnsw.ef_search is set for the session
+        # here instead of with SET LOCAL around each search
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.execute("SET hnsw.ef_search = %s", (HNSW_EF_SEARCH,))
+        
+        # Swapped in only once warm, so other threads never see a half-open connection
+        self.conn = conn
+        self.available = True
+        self.connected_at = self.last_used_at = time.monotonic()
+        logger.info("✅ Connected to PostgreSQL database")
+
+    def ensure_connection(self):
+        """
+        Make sure the connection is usable before handing the store to a request.
+        
+        Reconnects when the connection is closed, older than DB_RECYCLE_SECONDS,
+        or fails a ping after DB_PING_IDLE_SECONDS of idle time, so stale
+        sockets are replaced outside the query path. Never raises; on failure
+        the store is marked unavailable.
+        
+        Queries don't take _conn_lock, so another request may still be running
+        on the connection being replaced. The old connection is retired rather
+        than closed, and closed on a later call once DB_RETIRE_GRACE_SECONDS
+        have passed.
+        """
+        with self._conn_lock:
+            now = time.monotonic()
+            if not self.available and now - self.last_used_at < DB_PING_IDLE_SECONDS:
+                return  # Stay degraded until the retry interval has passed
+            try:
+                if self.conn is None or self.conn.closed:
+                    reconnect = True
+                elif now - self.connected_at > DB_RECYCLE_SECONDS:
+                    logger.info("♻️ Recycling database connection")
+                    reconnect = True
+                elif now - self.last_used_at > DB_PING_IDLE_SECONDS:
+                    try:
+                        with self.conn.cursor() as cur:
+                            cur.execute("SELECT 1")
+                        reconnect = False
+                    except psycopg2.Error as e:
+                        logger.warning(f"⚠️ Database ping failed, reconnecting: {e}")
+                        reconnect = True
+                else:
+                    reconnect = False
+                
+                if reconnect:
+                    old_conn = self.conn
+                    self._connect()
+                    if old_conn is not None and not old_conn.closed:
+                        self._retired.append((now, old_conn))
+                self.last_used_at = now
+                
+            except Exception as e:
+                logger.error(f"❌ Failed to reconnect to database: {e}")
+                self.available = False
+                self.last_used_at = now
+            
+            self._close_retired(now - DB_RETIRE_GRACE_SECONDS)
+    
+    def _close_retired(self, retired_before: float):
+        """Close connections retired before the given monotonic time."""
+        keep = []
+        for retired_at, conn in self._retired:
+            if retired_at <= retired_before:
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to close retired connection: {e}")
+            else:
+                keep.append((retired_at, conn))
+        self._retired = keep
+
     def _check_connection(self):
         """Check if database connection is available."""
         if not self.available or not self.conn:
@@ -116,7 +568,7 @@ class MemoryStore:
         try:
             # Generate embedding for the memory content
             content_text = json.dumps(value, sort_keys=True)
-            embedding = embed(content_text).tolist()
+            embedding = _vector_literal(embed(content_text))
             
             with self.conn.cursor() as cur:
                 # Set tenant context for RLS
@@ -128,7 +580,7 @@ class MemoryStore:
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                     RETURNING id
                     """,
-                    (customer_id, memory_type, key, Json(value), embedding, user_id, scope, ttl_days, source)
+                    (customer_id, memory_type, key, Json(value, dumps=_json_dumps), embedding, user_id, scope, ttl_days, source)
                 )
                 result = cur.fetchone()
                 if result:
@@ -143,6 +595,56 @@ class MemoryStore:
         except Exception as e:
             logger.error(f"Failed to write memory: {e}")
             raise
+    
+    def write_many(self, items: List[Dict[str, Any]], user_id: Optional[str] = None, scope: str = "user", source: str = "orchestrator", customer_id: int = 1) -> List[str]:
+        """
+        Store several memory objects with one embedding batch and one INSERT.
+        
+        Args:
+            items: Memories as dicts with "type", "key", "value" and optional
+                "ttl_days" (the shape returned by extract_carry_kit_items)
+            user_id: User ID for user-scoped memories (None for shared)
+            scope: Memory scope ('user', 'shared', 'global')
+            source: Source of the memories
+            customer_id: Tenant identifier for multi-tenant isolation
+            
+        Returns:
+            UUIDs of the stored memories, in item order
+        """
+        if not items:
+            return []
+        
+        try:
+            embeddings = map(_vector_literal, embed_batch([json.dumps(item["value"], sort_keys=True) for item in items]))
+            rows = [
+                (customer_id, item["type"], item["key"], Json(item["value"], dumps=_json_dumps), embedding,
+                 user_id, scope, item.get("ttl_days", 365), source)
+                for item, embedding in zip(items, embeddings)
+            ]
+            
+            with self.conn.cursor() as cur:
+                # Set tenant context for RLS
+                cur.execute("SET app.current_tenant = %s", (customer_id,))
+                
+                result = execute_values(
+                    cur,
+                    """
+                    INSERT INTO memories (customer_id, type, k, value_json, embedding, user_id, scope, ttl_days, source)
+                    VALUES %s
+                    RETURNING id
+                    """,
+                    rows,
+                    page_size=len(rows),
+                    fetch=True
+                )
+            
+            memory_ids = [str(row[0]) for row in result]
+            logger.info(f"Stored {len(memory_ids)} memories in one batch [{scope}]" + (f" user:{user_id}" if user_id else "") + f" [customer:{customer_id}]")
+            return memory_ids
+            
+        except Exception as e:
+            logger.error(f"Failed to write memories: {e}")
+            raise
 
     def search(self, query_text: str, user_id: Optional[str] = None, k: int = 6, memory_types: Optional[List[str]] = None, include_shared: bool = True) -> List[Dict[str, Any]]:
         """
@@ -160,62 +662,123 @@ class MemoryStore:
         """
         try:
             # Generate query embedding
-            query_embedding = embed(query_text).tolist()
+            query_embedding = _vector_literal(embed(query_text))
             
-            # Build query with filtering
-            filters = ["created_at > NOW() - INTERVAL '1 year'"]
-            params = [query_embedding]
+            where_clause, filter_params = self._search_filters(user_id, memory_types, include_shared)
+            params = [query_embedding, *filter_params, query_embedding, k]
+            query = f"""
+                SELECT id, type, k, value_json, user_id, scope, {_MEMORY_EMBEDDING} <-> %s::{_MEMORY_VECTOR_TYPE} as distance
+                FROM memories
+                WHERE {where_clause}
+                ORDER BY {_MEMORY_EMBEDDING} <-> %s::{_MEMORY_VECTOR_TYPE}
+                LIMIT %s
+            """
             
-            # User and scope filtering
-            if user_id is not None:
-                if include_shared:
-                    filters.append("(user_id = %s OR scope IN ('shared', 'global'))")
-                    params.append(user_id)
-                else:
-                    filters.append("user_id = %s")
-                    params.append(user_id)
-            elif include_shared:
-                filters.append("scope IN ('shared', 'global')")
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+            
+            results = [self._search_result(row) for row in rows]
             
-            # Type filtering
-            if memory_types:
-                filters.append("type = ANY(%s)")
-                params.append(memory_types)
+            logger.info(f"Memory search for '{query_text[:50]}...' returned {len(results)} results")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Failed to search memories: {e}")
+            return []
+    
+    def search_many(self, query_texts: List[str], user_id: Optional[str] = None, k: int = 6, memory_types: Optional[List[str]] = None, include_shared: bool = True) -> List[List[Dict[str, Any]]]:
+        """
+        Run several similarity searches with one embedding batch and one query.
+        
+        Each query gets its own top-k through a LATERAL subquery, so the
+        results match calling search() once per text.
+        
+        Args:
+            query_texts: Texts to search for
+            user_id: User ID to filter personal memories (None for no user filter)
+            k: Number of results per query
+            memory_types: Optional filter by memory types
+            include_shared: Whether to include shared/global memories
+            
+        Returns:
+            One result list per query text, in order
+        """
+        if not query_texts:
+            return []
+        
+        try:
+            query_embeddings = [_vector_literal(vector) for vector in embed_batch(query_texts)]
+            where_clause, filter_params = self._search_filters(user_id, memory_types, include_shared)
+            query_rows = ", ".join([f"(%s, %s::{_MEMORY_VECTOR_TYPE})"] * len(query_embeddings))
             
-            params.append(query_embedding)
+            params = [value for idx, embedding in enumerate(query_embeddings) for value in (idx, embedding)]
+            params.extend(filter_params)
             params.append(k)
             
-            where_clause = " AND ".join(filters)
             query = f"""
-                SELECT id, type, k, value_json, user_id, scope, embedding <-> %s::vector as distance
-                FROM memories
-                WHERE {where_clause}
-                ORDER BY embedding <-> %s::vector
-                LIMIT %s
+                SELECT q.idx, m.*
+                FROM (VALUES {query_rows}) AS q(idx, query_embedding)
+                CROSS JOIN LATERAL (
+                    SELECT id, type, k, value_json, user_id, scope, {_MEMORY_EMBEDDING} <-> q.query_embedding as distance
+                    FROM memories
+                    WHERE {where_clause}
+                    ORDER BY {_MEMORY_EMBEDDING} <-> q.query_embedding
+                    LIMIT %s
+                ) m
+                ORDER BY q.idx, m.distance
             """
             
             with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute(query, params)
                 rows = cur.fetchall()
             
-            results = []
+            results = [[] for _ in query_texts]
             for row in rows:
-                results.append({
-                    "id": str(row["id"]),
-                    "type": row["type"],
-                    "key": row["k"],
-                    "value": row["value_json"],
-                    "user_id": row["user_id"],
-                    "scope": row["scope"],
-                    "distance": float(row["distance"])
-                })
+                results[row["idx"]].append(self._search_result(row))
             
-            logger.info(f"Memory search for '{query_text[:50]}...' returned {len(results)} results")
+            logger.info(f"Batched memory search for {len(query_texts)} queries returned {len(rows)} results")
             return results
             
         except Exception as e:
             logger.error(f"Failed to search memories: {e}")
-            return []
+            return [[] for _ in query_texts]
+    
+    @staticmethod
+    def _search_filters(user_id: Optional[str], memory_types: Optional[List[str]], include_shared: bool) -> Tuple[str, List[Any]]:
+        """WHERE clause and its parameters for search() and search_many()."""
+        filters = ["created_at > NOW() - INTERVAL '1 year'"]
+        params: List[Any] = []
+        
+        # User and scope filtering
+        if user_id is not None:
+            if include_shared:
+                filters.append("(user_id = %s OR scope IN ('shared', 'global'))")
+                params.append(user_id)
+            else:
+                filters.append("user_id = %s")
+                params.append(user_id)
+        elif include_shared:
+            filters.append("scope IN ('shared', 'global')")
+        
+        # Type filtering
+        if memory_types:
+            filters.append("type = ANY(%s)")
+            params.append(memory_types)
+        
+        return " AND ".join(filters), params
+    
+    @staticmethod
+    def _search_result(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": str(row["id"]),
+            "type": row["type"],
+            "key": row["k"],
+            "value": row["value_json"],
+            "user_id": row["user_id"],
+            "scope": row["scope"],
+            "distance": float(row["distance"])
+        }
     
     def get_user_memories(self, user_id: str, limit: int = 10, include_shared: bool = True) -> List[Dict[str, Any]]:
         """
@@ -427,9 +990,10 @@ class MemoryStore:
 
     def close(self):
         """Close the database connection."""
-        if hasattr(self, 'conn'):
+        if getattr(self, 'conn', None) is not None:
             self.conn.close()
             logger.info("Database connection closed")
+        self._close_retired(float("inf"))
     
     # =========================================================================
     # MEMORY V2: Call Summaries, Caller Profiles, Personality Tracking
@@ -450,7 +1014,8 @@ class MemoryStore:
         try:
             # Generate embedding for the summary
             summary_text = summary_data.get("summary", "")
-            embedding = embed(summary_text).tolist() if summary_text else None
+            summary_vector = embed(summary_text) if summary_text else None
+            embedding = _vector_literal(summary_vector) if summary_vector is not None else None
             
             with self.conn.cursor() as cur:
                 # Set tenant context for RLS
@@ -472,8 +1037,8 @@ class MemoryStore:
                         summary_data["user_id"],
                         summary_data.get("call_date", datetime.now()),
                         summary_data.get("summary", ""),
-                        Json(summary_data.get("key_topics", [])),
-                        Json(summary_data.get("key_variables", {})),
+                        Json(summary_data.get("key_topics", []), dumps=_json_dumps),
+                        Json(summary_data.get("key_variables", {}), dumps=_json_dumps),
                         summary_data.get("sentiment", "neutral"),
                         summary_data.get("duration_seconds", 0),
                         summary_data.get("resolution_status", "unknown"),
@@ -483,6 +1048,9 @@ class MemoryStore:
                 result = cur.fetchone()
                 summary_id = result[0] if result else None
             
+            summary_index.invalidate(customer_id, summary_data["user_id"])
+            recent_summary_cache.invalidate(customer_id, summary_data["user_id"])
+            
             logger.info(f"✅ Stored call summary {summary_data['call_id']} for user {summary_data['user_id']} [customer:{customer_id}]")
             return str(summary_id)
             
@@ -547,6 +1115,147 @@ class MemoryStore:
             logger.error(f"❌ Failed to store personality metrics: {e}")
             raise
     
+    def store_call_summaries(self, summaries: List[Dict[str, Any]], customer_id: int = 1) -> List[str]:
+        """
+        Store several call summaries with one embedding batch and one INSERT.
+        
+        Args:
+            summaries: Summary dicts in the shape store_call_summary takes
+            customer_id: Tenant identifier for multi-tenant isolation
+            
+        Returns:
+            UUIDs of the stored summaries, in input order
+        """
+        if not summaries:
+            return []
+        
+        try:
+            texts = [summary_data.get("summary", "") for summary_data in summaries]
+            embedded = [i for i, text in enumerate(texts) if text]
+            vectors: List[Optional[np.ndarray]] = [None] * len(summaries)
+            if embedded:
+                for i, vector in zip(embedded, embed_batch([texts[i] for i in embedded])):
+                    vectors[i] = vector
+            
+            rows = [
+                (
+                    customer_id,
+                    summary_data["call_id"],
+                    summary_data["user_id"],
+                    summary_data.get("call_date", datetime.now()),
+                    summary_data.get("summary", ""),
+                    Json(summary_data.get("key_topics", []), dumps=_json_dumps),
+                    Json(summary_data.get("key_variables", {}), dumps=_json_dumps),
+                    summary_data.get("sentiment", "neutral"),
+                    summary_data.get("duration_seconds", 0),
+                    summary_data.get("resolution_status", "unknown"),
+                    _vector_literal(vector) if vector is not None else None
+                )
+                for summary_data, vector in zip(summaries, vectors)
+            ]
+            
+            with self.conn.cursor() as cur:
+                # Set tenant context for RLS
+                cur.execute("SET app.current_tenant = %s", (customer_id,))
+                
+                result = execute_values(
+                    cur,
+                    """
+                    INSERT INTO call_summaries (
+                        customer_id, call_id, user_id, call_date, summary, key_topics,
+                        key_variables, sentiment, duration_seconds, 
+                        resolution_status, embedding
+                    )
+                    VALUES %s
+                    RETURNING id
+                    """,
+                    rows,
+                    page_size=len(rows),
+                    fetch=True
+                )
+            
+            summary_ids = [str(row[0]) for row in result]
+            for summary_data in summaries:
+                summary_index.invalidate(customer_id, summary_data["user_id"])
+                recent_summary_cache.invalidate(customer_id, summary_data["user_id"])
+            
+            logger.info(f"✅ Stored {len(summary_ids)} call summaries in one batch [customer:{customer_id}]")
+            return summary_ids
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to store call summaries: {e}")
+            raise
+    
+    def store_personality_metrics_many(self, metrics: List[Dict[str, Any]], customer_id: int = 1) -> List[str]:
+        """
+        Store personality metrics for several calls with one INSERT.
+        
+        personality_averages is still maintained by the per-row insert
+        trigger, which is an O(1) running-average upsert (migration 003).
+        
+        Args:
+            metrics: Metrics dicts in the shape store_personality_metrics takes
+            customer_id: Tenant identifier for multi-tenant isolation
+            
+        Returns:
+            UUIDs of the stored metrics, in input order
+        """
+        if not metrics:
+            return []
+        
+        try:
+            rows = [
+                (
+                    customer_id,
+                    metrics_data["user_id"],
+                    metrics_data["call_id"],
+                    metrics_data.get("measured_at", datetime.now()),
+                    metrics_data.get("openness", 50),
+                    metrics_data.get("conscientiousness", 50),
+                    metrics_data.get("extraversion", 50),
+                    metrics_data.get("agreeableness", 50),
+                    metrics_data.get("neuroticism", 50),
+                    metrics_data.get("formality", 50),
+                    metrics_data.get("directness", 50),
+                    metrics_data.get("detail_orientation", 50),
+                    metrics_data.get("patience", 50),
+                    metrics_data.get("technical_comfort", 50),
+                    metrics_data.get("frustration_level", 0),
+                    metrics_data.get("satisfaction_level", 50),
+                    metrics_data.get("urgency_level", 30)
+                )
+                for metrics_data in metrics
+            ]
+            
+            with self.conn.cursor() as cur:
+                # Set tenant context for RLS
+                cur.execute("SET app.current_tenant = %s", (customer_id,))
+                
+                result = execute_values(
+                    cur,
+                    """
+                    INSERT INTO personality_metrics (
+                        customer_id, user_id, call_id, measured_at,
+                        openness, conscientiousness, extraversion, agreeableness, neuroticism,
+                        formality, directness, detail_orientation, patience, technical_comfort,
+                        frustration_level, satisfaction_level, urgency_level
+                    )
+                    VALUES %s
+                    RETURNING id
+                    """,
+                    rows,
+                    page_size=len(rows),
+                    fetch=True
+                )
+            
+            metrics_ids = [str(row[0]) for row in result]
+            logger.info(f"✅ Stored {len(metrics_ids)} personality metrics in one batch [customer:{customer_id}]")
+            return metrics_ids
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to store personality metrics: {e}")
+            raise
+    
     def get_or_create_caller_profile(self, user_id: str) -> Dict[str, Any]:
         """
         Get existing caller profile or create a new one.
@@ -607,7 +1316,7 @@ class MemoryStore:
             for key, value in updates.items():
                 if key in ['preferred_name', 'preferences', 'context']:
                     set_clauses.append(f"{key} = %s")
-                    params.append(Json(value) if isinstance(value, dict) else value)
+                    params.append(Json(value, dumps=_json_dumps) if isinstance(value, dict) else value)
             
             if not set_clauses:
                 return False
@@ -698,12 +1407,18 @@ class MemoryStore:
             logger.error(f"❌ Failed to get personality averages: {e}")
             return None
     
-    def search_call_summaries(self, user_id: str, query_text: str = "", limit: int = 5) -> List[Dict[str, Any]]:
+    def search_call_summaries(self, user_id: str, customer_id: int, query_text: str = "", limit: int = 5) -> List[Dict[str, Any]]:
         """
         Search call summaries for a user (FAST - summaries only, not raw data).
         
+        Similarity searches are ranked with the in-process summary_index when
+        the caller's summaries fit in it, falling back to pgvector otherwise.
+        Either way the matching rows come from Postgres, and summaries written
+        by other workers are visible on the next search.
+        
         Args:
             user_id: Caller identifier
+            customer_id: Tenant identifier for multi-tenant isolation
             query_text: Optional text to search for (uses vector similarity)
             limit: Maximum number of results
             
@@ -712,38 +1427,47 @@ class MemoryStore:
         """
         try:
             if query_text:
-                # Vector similarity search
-                query_embedding = embed(query_text).tolist()
+                query_vector = embed(query_text)
+                rows = self._search_summary_index(customer_id, user_id, query_vector, limit)
                 
-                with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT call_id, call_date, summary, key_topics, key_variables,
-                               sentiment, resolution_status,
-                               embedding <-> %s::vector as distance
-                        FROM call_summaries
-                        WHERE user_id = %s
-                        ORDER BY embedding <-> %s::vector
-                        LIMIT %s
-                        """,
-                        (query_embedding, user_id, query_embedding, limit)
-                    )
-                    rows = cur.fetchall()
+                if rows is None:
+                    # Vector similarity search in pgvector
+                    query_embedding = _vector_literal(query_vector)
+                    
+                    with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                        cur.execute(
+                            """
+                            SELECT call_id, call_date, summary, key_topics, key_variables,
+                                   sentiment, resolution_status,
+                                   embedding <-> %s::vector as distance
+                            FROM call_summaries
+                            WHERE customer_id = %s AND user_id = %s
+                            ORDER BY embedding <-> %s::vector
+                            LIMIT %s
+                            """,
+                            (query_embedding, customer_id, user_id, query_embedding, limit)
+                        )
+                        rows = cur.fetchall()
             else:
-                # Recent calls
-                with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-                    cur.execute(
-                        """
-                        SELECT call_id, call_date, summary, key_topics, key_variables,
-                               sentiment, resolution_status
-                        FROM call_summaries
-                        WHERE user_id = %s
-                        ORDER BY call_date DESC
-                        LIMIT %s
-                        """,
-                        (user_id, limit)
-                    )
-                    rows = cur.fetchall()
+                # Recent calls, from the prefetched page when available
+                rows = recent_summary_cache.get(customer_id, user_id, limit)
+                if rows is None:
+                    page_size = max(limit, PREFETCH_SUMMARIES)
+                    with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                        cur.execute(
+                            """
+                            SELECT call_id, call_date, summary, key_topics, key_variables,
+                                   sentiment, resolution_status
+                            FROM call_summaries
+                            WHERE customer_id = %s AND user_id = %s
+                            ORDER BY call_date DESC
+                            LIMIT %s
+                            """,
+                            (customer_id, user_id, page_size)
+                        )
+                        page = [dict(row) for row in cur.fetchall()]
+                    recent_summary_cache.put(customer_id, user_id, page, complete=len(page) < page_size)
+                    rows = page[:limit]
             
             results = [dict(row) for row in rows]
             logger.info(f"✅ Retrieved {len(results)} call summaries for user {user_id}")
@@ -753,7 +1477,147 @@ class MemoryStore:
             logger.error(f"❌ Failed to search call summaries: {e}")
             return []
     
-    def get_caller_context_for_llm(self, user_id: str) -> str:
+    def _search_summary_index(self, customer_id: int, user_id: str, query_vector: np.ndarray, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Rank a caller's summaries with summary_index and fetch the top rows.
+        
+        Returns:
+            Summary rows nearest first, or None if the caller's summaries
+            can't be cached and the search should use pgvector
+        """
+        entry = summary_index.get(customer_id, user_id) or self._load_summary_vectors(customer_id, user_id)
+        if entry is None:
+            return None
+        
+        rows, stamp = self._fetch_ranked_summaries(customer_id, user_id, SummaryIndex.rank(entry, query_vector, limit))
+        if stamp != entry[0]:
+            # Summaries were written since the entry was loaded (possibly by another worker)
+            entry = self._load_summary_vectors(customer_id, user_id)
+            if entry is None:
+                return None
+            rows, _ = self._fetch_ranked_summaries(customer_id, user_id, SummaryIndex.rank(entry, query_vector, limit))
+        return rows
+    
+    def _load_summary_vectors(self, customer_id: int, user_id: str) -> Optional[Tuple[Tuple[int, Any], List[str], np.ndarray]]:
+        """Load a caller's summary embeddings into summary_index, in pgvector's binary format."""
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT id, vector_send(embedding), created_at
+                    FROM call_summaries
+                    WHERE customer_id = %s AND user_id = %s AND embedding IS NOT NULL
+                    LIMIT %s
+                    """,
+                    (customer_id, user_id, summary_index.max_rows + 1)
+                )
+                rows = cur.fetchall()
+        except Exception as e:
+            logger.warning(f"Summary index load failed for user {user_id}, using pgvector: {e}")
+            return None
+        
+        if len(rows) > summary_index.max_rows:
+            return None
+        return summary_index.load(customer_id, user_id, rows)
+    
+    def _fetch_ranked_summaries(self, customer_id: int, user_id: str, ranked: List[Tuple[str, float]]) -> Tuple[List[Dict[str, Any]], Tuple[int, Any]]:
+        """
+        Fetch full summary rows for (id, distance) pairs, preserving rank order.
+        
+        The same query returns the caller's current (count, max(created_at))
+        stamp, so a stale summary_index entry costs no extra round trip to detect.
+        
+        Returns:
+            (rows, stamp)
+        """
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT s.id, s.call_id, s.call_date, s.summary, s.key_topics, s.key_variables,
+                       s.sentiment, s.resolution_status,
+                       fresh.row_count, fresh.latest_created_at
+                FROM (
+                    SELECT count(*) AS row_count, max(created_at) AS latest_created_at
+                    FROM call_summaries
+                    WHERE customer_id = %s AND user_id = %s AND embedding IS NOT NULL
+                ) fresh
+                LEFT JOIN call_summaries s ON s.id = ANY(%s::uuid[])
+                """,
+                (customer_id, user_id, [summary_id for summary_id, _ in ranked])
+            )
+            result = cur.fetchall()
+        
+        stamp = (result[0]["row_count"], result[0]["latest_created_at"])
+        rows_by_id = {}
+        for row in result:
+            row.pop("row_count")
+            row.pop("latest_created_at")
+            summary_id = row.pop("id")
+            if summary_id is not None:
+                rows_by_id[str(summary_id)] = row
+        
+        rows = []
+        for summary_id, distance in ranked:
+            row = rows_by_id.get(summary_id)
+            if row is not None:
+                row["distance"] = distance
+                rows.append(row)
+        return rows, stamp
+    
+    def get_caller_bundle(self, user_id: str, num_summaries: int = 3) -> Dict[str, Any]:
+        """
+        Fetch caller profile, personality averages and recent call summaries
+        in a single round trip.
+        
+        Args:
+            user_id: Caller identifier
+            num_summaries: Number of most recent call summaries to include
+            
+        Returns:
+            Dictionary with "profile" (dict or None), "personality" (dict or None)
+            and "summaries" (list, most recent first). JSONB columns are also
+            returned as stored text (preferences_json, context_json,
+            key_variables_json) so they can be emitted without re-serializing.
+        """
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    """
+                    SELECT
+                        (SELECT row_to_json(p) FROM (
+                             SELECT *, preferences::text AS preferences_json,
+                                    context::text AS context_json
+                             FROM caller_profiles
+                             WHERE user_id = %(user_id)s
+                         ) p) AS profile,
+                        (SELECT row_to_json(a) FROM personality_averages a
+                         WHERE a.user_id = %(user_id)s) AS personality,
+                        (SELECT COALESCE(json_agg(s ORDER BY s.call_date DESC), '[]'::json)
+                         FROM (
+                             SELECT call_id, call_date, summary, key_topics, key_variables,
+                                    key_variables::text AS key_variables_json,
+                                    sentiment, resolution_status
+                             FROM call_summaries
+                             WHERE user_id = %(user_id)s
+                             ORDER BY call_date DESC
+                             LIMIT %(limit)s
+                         ) s) AS summaries
+                    """,
+                    {"user_id": user_id, "limit": num_summaries}
+                )
+                row = cur.fetchone()
+            
+            return {
+                "profile": row["profile"] if row else None,
+                "personality": row["personality"] if row else None,
+                "summaries": (row["summaries"] if row else None) or []
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get caller bundle: {e}")
+            return {"profile": None, "personality": None, "summaries": []}
+    
+    def get_caller_context_for_llm(self, user_id: str, customer_id: Optional[int] = None) -> str:
         """
         Build optimized context string for LLM (summary-first approach).
         
@@ -761,52 +1625,35 @@ class MemoryStore:
         
         Args:
             user_id: Caller identifier
+            customer_id: Tenant the connection is scoped to; when given, the
+                extra summaries fetched with the bundle are cached for
+                search_call_summaries
             
         Returns:
             Formatted string with caller profile, personality, and recent call summaries
         """
         try:
-            context_parts = []
-            
-            # 1. Get caller profile
-            profile = self.get_or_create_caller_profile(user_id)
-            if profile:
-                context_parts.append("=== CALLER PROFILE ===")
-                if profile.get("preferred_name"):
-                    context_parts.append(f"Name: {profile['preferred_name']}")
-                context_parts.append(f"Total Calls: {profile.get('total_calls', 0)}")
-                context_parts.append(f"First Call: {profile.get('first_call_date', 'Unknown')}")
-                context_parts.append(f"Last Call: {profile.get('last_call_date', 'Unknown')}")
-                
-                if profile.get("preferences"):
-                    context_parts.append(f"Preferences: {json.dumps(profile['preferences'])}")
-                if profile.get("context"):
-                    context_parts.append(f"Context: {json.dumps(profile['context'])}")
-                context_parts.append("")
-            
-            # 2. Get personality averages
-            personality = self.get_personality_averages(user_id)
-            if personality:
+            # Profile, personality and a page of recent summaries in one query
+            bundle = self.get_caller_bundle(user_id, num_summaries=PREFETCH_SUMMARIES)
+            summaries = bundle["summaries"]
+            if customer_id is not None:
+                page = [{k: v for k, v in summary.items() if k != "key_variables_json"} for summary in summaries]
+                recent_summary_cache.put(customer_id, user_id, page, complete=len(page) < PREFETCH_SUMMARIES)
+            
+            # Caller profile is created on first contact
+            profile = bundle["profile"] or self.get_or_create_caller_profile(user_id)
+            
+            personality_summary = None
+            if bundle["personality"]:
                 from app.personality import PersonalityTracker
                 tracker = PersonalityTracker(None)
-                context_parts.append(tracker.format_personality_summary(personality))
-                context_parts.append("")
-            
-            # 3. Get recent call summaries
-            summaries = self.search_call_summaries(user_id, limit=3)
-            if summaries:
-                context_parts.append("=== RECENT CALL SUMMARIES ===")
-                for i, summary in enumerate(summaries, 1):
-                    context_parts.append(f"\nCall {i} ({summary.get('call_date', 'Unknown')}):")
-                    context_parts.append(f"  Summary: {summary.get('summary', 'N/A')}")
-                    if summary.get('key_topics'):
-                        context_parts.append(f"  Topics: {', '.join(summary['key_topics'])}")
-                    if summary.get('key_variables'):
-                        context_parts.append(f"  Key Info: {json.dumps(summary['key_variables'])}")
-                    context_parts.append(f"  Sentiment: {summary.get('sentiment', 'neutral')}")
-                context_parts.append("")
-            
-            return "\n".join(context_parts)
+                personality_summary = tracker.format_personality_summary(bundle["personality"])
+            
+            return CALLER_CONTEXT_TEMPLATE.render(
+                profile=profile,
+                personality_summary=personality_summary,
+                summaries=summaries[:3]
+            )
             
         except Exception as e:
             logger.error(f"❌ Failed to build caller context: {e}")
@@ -4,37 +4,67 @@ Hooks into conversation flow to automatically summarize calls and track personal
 """
 
 import logging
+import os
+import time
 import uuid
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from app.memory import MemoryStore
 from app.summarizer import CallSummarizer
 from app.personality import PersonalityTracker
+from app.call_analysis import CallAnalysisPipeline
 
 logger = logging.getLogger(__name__)
 
+# Adaptive checkpointing: summarize once roughly this many tokens have been
+# added, but never more often than every MIN_BATCH_MESSAGES messages and at
+# least every MAX_BATCH_MESSAGES messages.
+SUMMARY_TOKEN_BUDGET = 2000
+MIN_BATCH_MESSAGES = 10
+MAX_BATCH_MESSAGES = 50
+MAX_TRACKED_CALLS = 1000
+
+# call_id -> message count at the last summary. Module level, since the
+# endpoints and scripts may each build their own MemoryV2Integration
+_last_checkpoint: Dict[str, int] = {}
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUIDv7 (RFC 9562).
+    
+    The first 48 bits are the Unix time in milliseconds, so IDs generated
+    later sort later and index inserts stay on the rightmost B-tree page.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
 class MemoryV2Integration:
     """
     Integrates Memory V2 into the conversation flow.
     Automatically processes calls to extract summaries and personality metrics.
     """
     
-    def __init__(self, memory_store: MemoryStore, llm_chat_function):
+    def __init__(self, memory_store: MemoryStore, llm_chat_function, draft_chat_function=None):
         """
         Initialize the integration.
         
         Args:
             memory_store: MemoryStore instance with V2 methods
             llm_chat_function: LLM chat function for summarization
+            draft_chat_function: Optional small-model chat function for draft summaries
         """
         self.memory_store = memory_store
-        self.summarizer = CallSummarizer(llm_chat_function)
+        self.summarizer = CallSummarizer(llm_chat_function, draft_chat_function)
         self.personality_tracker = PersonalityTracker(llm_chat_function)
+        self.call_analysis = CallAnalysisPipeline(self.summarizer, self.personality_tracker)
     
     def process_completed_call(
         self, 
         conversation_history: List[Tuple[str, str]], 
         user_id: str,
-        thread_id: Optional[str] = None
+        thread_id: Optional[str] = None,
+        customer_id: int = 1
     ) -> dict:
         """
         Process a completed call - extract summary and personality metrics.
@@ -44,88 +74,219 @@ class MemoryV2Integration:
         Args:
             conversation_history: List of (role, content) tuples
             user_id: Caller identifier (phone number, etc)
-            thread_id: Optional thread ID (uses UUID if not provided)
+            thread_id: Optional thread ID (uses a time-ordered UUID if not provided)
+            customer_id: Tenant the results are stored under
             
         Returns:
             Dictionary with processing results
         """
         try:
-            call_id = thread_id or str(uuid.uuid4())
+            call_id = thread_id or str(uuid7())
             
             logger.info(f"🔄 Processing call {call_id} for user {user_id}")
             
-            # Step 1: Generate call summary
-            summary_data = self.summarizer.summarize_call(
-                conversation_history, 
-                user_id, 
+            # Steps 1-2: Summary and personality from one fused LLM call
+            summary_data, personality_data = self.call_analysis.analyze(
+                conversation_history,
+                user_id,
                 call_id
             )
             
-            # Step 2: Analyze personality
-            personality_data = self.personality_tracker.analyze_personality(
+            return self._store_results(call_id, conversation_history, user_id, summary_data, personality_data, customer_id)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to process call: {e}", exc_info=True)
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    async def process_completed_call_async(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        thread_id: Optional[str] = None,
+        customer_id: int = 1
+    ) -> dict:
+        """
+        process_completed_call for async endpoints.
+        
+        The LLM analysis runs in worker threads (summary and personality via
+        asyncio.gather when they can't be fused), so the event loop keeps
+        serving other requests. Database writes stay on the loop, after the
+        await, as they share the store's single connection. Other requests may
+        switch that connection's tenant during the await, so the writes set
+        app.current_tenant to customer_id again before inserting.
+        
+        Args:
+            conversation_history: List of (role, content) tuples
+            user_id: Caller identifier (phone number, etc)
+            thread_id: Optional thread ID (uses a time-ordered UUID if not provided)
+            customer_id: Tenant the results are stored under
+            
+        Returns:
+            Dictionary with processing results
+        """
+        try:
+            call_id = thread_id or str(uuid7())
+            
+            logger.info(f"🔄 Processing call {call_id} for user {user_id}")
+            
+            summary_data, personality_data = await self.call_analysis.analyze_async(
                 conversation_history,
                 user_id,
                 call_id
             )
             
-            # Step 3: Store in database
-            summary_id = self.memory_store.store_call_summary(summary_data)
-            personality_id = self.memory_store.store_personality_metrics(personality_data)
+            return self._store_results(call_id, conversation_history, user_id, summary_data, personality_data, customer_id)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to process call: {e}", exc_info=True)
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def process_completed_call_deferred(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        thread_id: Optional[str] = None
+    ) -> dict:
+        """
+        Run the LLM analysis of process_completed_call without writing it.
+        
+        For bulk jobs such as the backfill, which collect many results and
+        store them with MemoryStore.store_call_summaries and
+        store_personality_metrics_many.
+        
+        Args:
+            conversation_history: List of (role, content) tuples
+            user_id: Caller identifier (phone number, etc)
+            thread_id: Optional thread ID (uses a time-ordered UUID if not provided)
             
-            # Step 4: Update caller profile
-            self.memory_store.update_caller_profile(user_id, {})
+        Returns:
+            Dictionary with processing results, including the summary_data
+            and personality_data records to insert
+        """
+        try:
+            call_id = thread_id or str(uuid7())
             
-            logger.info(f"✅ Processed call {call_id}: summary={summary_id}, personality={personality_id}")
+            summary_data, personality_data = self.call_analysis.analyze(
+                conversation_history,
+                user_id,
+                call_id
+            )
             
             return {
                 "success": True,
                 "call_id": call_id,
-                "summary_id": summary_id,
-                "personality_id": personality_id,
+                "summary_data": summary_data,
+                "personality_data": personality_data,
                 "summary": summary_data.get("summary", ""),
                 "sentiment": summary_data.get("sentiment", "neutral")
             }
             
         except Exception as e:
-            logger.error(f"❌ Failed to process call: {e}", exc_info=True)
+            logger.error(f"❌ Failed to analyze call: {e}", exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    def get_enriched_context_for_call(self, user_id: str) -> str:
+    def _store_results(
+        self,
+        call_id: str,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        summary_data: dict,
+        personality_data: dict,
+        customer_id: int = 1
+    ) -> dict:
+        """Steps 3-5 of call processing: persist the analysis and record the checkpoint."""
+        # Step 3: Store in database (each write sets the tenant context first)
+        summary_id = self.memory_store.store_call_summary(summary_data, customer_id)
+        personality_id = self.memory_store.store_personality_metrics(personality_data, customer_id)
+        
+        # Step 4: Update caller profile
+        self.memory_store.update_caller_profile(user_id, {})
+        
+        # Step 5: Remember the checkpoint for adaptive batching
+        _last_checkpoint.pop(call_id, None)
+        _last_checkpoint[call_id] = len(conversation_history)
+        if len(_last_checkpoint) > MAX_TRACKED_CALLS:
+            _last_checkpoint.pop(next(iter(_last_checkpoint)), None)
+        
+        logger.info(f"✅ Processed call {call_id}: summary={summary_id}, personality={personality_id}")
+        
+        return {
+            "success": True,
+            "call_id": call_id,
+            "summary_id": summary_id,
+            "personality_id": personality_id,
+            "summary": summary_data.get("summary", ""),
+            "sentiment": summary_data.get("sentiment", "neutral")
+        }
+    
+    def get_enriched_context_for_call(self, user_id: str, customer_id: Optional[int] = None) -> str:
         """
         Get enriched context for starting a new call.
         
         This is the FAST retrieval method that uses summaries instead of raw data.
+        It also prefetches the caller's next page of summaries for later reads.
         
         Args:
             user_id: Caller identifier
+            customer_id: Tenant the memory store connection is scoped to
             
         Returns:
             Formatted context string for LLM prompt
         """
         try:
-            context = self.memory_store.get_caller_context_for_llm(user_id)
+            context = self.memory_store.get_caller_context_for_llm(user_id, customer_id)
             return context if context else "No previous call history found."
             
         except Exception as e:
             logger.error(f"❌ Failed to get enriched context: {e}")
             return ""
     
-    def should_process_call(self, message_count: int) -> bool:
+    def should_process_call(
+        self,
+        message_count: int,
+        tokens_since_last: Optional[int] = None,
+        call_ended: bool = False,
+        call_id: Optional[str] = None
+    ) -> bool:
         """
         Determine if we should process the call now.
         
         Triggers:
-        - Every 10 messages (for long calls)
         - At end of call
+        - Once SUMMARY_TOKEN_BUDGET tokens have been added since the last
+          summary, clamped to every 10-50 messages (chatty calls summarize
+          less often, information-dense calls more often)
+        - Every 10 messages when no token count is given
         
         Args:
             message_count: Number of messages in current conversation
+            tokens_since_last: Tokens added since the last summary of this call
+            call_ended: True when the call has finished
+            call_id: Thread ID passed to process_completed_call for this call
             
         Returns:
             True if should process now
         """
-        # Process every 10 messages for long ongoing calls
-        return message_count > 0 and message_count % 10 == 0
+        if call_ended:
+            return message_count > 0
+        
+        if tokens_since_last is None:
+            # Process every 10 messages for long ongoing calls
+            return message_count > 0 and message_count % MIN_BATCH_MESSAGES == 0
+        
+        messages_since_last = message_count - _last_checkpoint.get(call_id, 0)
+        if messages_since_last <= 0:
+            return False
+        
+        avg_tokens_per_message = max(tokens_since_last / messages_since_last, 1.0)
+        batch_size = max(MIN_BATCH_MESSAGES, min(MAX_BATCH_MESSAGES, int(SUMMARY_TOKEN_BUDGET / avg_tokens_per_message)))
+        return messages_since_last >= batch_size
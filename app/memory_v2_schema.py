@@ -62,7 +62,7 @@ NEW DATABASE TABLES:
    
    created_at (TIMESTAMP)
 
-4. personality_averages (materialized view / running calculation)
+4. personality_averages (running calculation, updated by trigger on insert)
    - user_id (VARCHAR, primary key)
    - call_count (INTEGER)
    - last_updated (TIMESTAMP)
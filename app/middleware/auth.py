@@ -7,8 +7,13 @@ This prevents tenant spoofing and ensures secure service-to-service communicatio
 
 import os
 import jwt
+import hmac
+import json
+import time
+import base64
+import hashlib
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
 from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -25,6 +30,56 @@ if not JWT_SECRET_KEY:
     logger.warning("JWT_SECRET_KEY not set! JWT validation will fail.")
     logger.warning("Set JWT_SECRET_KEY in environment variables.")
 
+_JWT_KEY = JWT_SECRET_KEY.encode() if JWT_SECRET_KEY else b""
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _decode_hs256(token: str) -> Dict[str, Any]:
+    """
+    Verify an HS256 JWT and return its claims.
+    
+    Fast path for jwt.decode(token, JWT_SECRET_KEY, algorithms=["HS256"]):
+    one OpenSSL HMAC-SHA256 via hashlib plus a constant-time compare, with
+    the same exp/nbf/iat/aud checks. Raises the matching PyJWT exceptions so
+    callers handle errors exactly as before.
+    """
+    try:
+        signing_input, _, signature_segment = token.rpartition(".")
+        header_segment, _, payload_segment = signing_input.partition(".")
+        header = json.loads(_b64url_decode(header_segment))
+        payload = json.loads(_b64url_decode(payload_segment))
+        signature = _b64url_decode(signature_segment)
+    except (ValueError, TypeError) as e:
+        raise jwt.DecodeError(f"Invalid token encoding: {e}")
+    
+    if not isinstance(header, dict) or header.get("alg") != "HS256":
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    
+    expected = hmac.new(_JWT_KEY, signing_input.encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    if not isinstance(payload, dict):
+        raise jwt.DecodeError("Invalid payload string: must be a json object")
+    
+    now = time.time()
+    for claim in ("exp", "nbf", "iat"):
+        if claim in payload and not isinstance(payload[claim], (int, float)):
+            raise jwt.DecodeError(f"The {claim} claim must be a number")
+    if "exp" in payload and payload["exp"] <= now:
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    if "nbf" in payload and payload["nbf"] > now:
+        raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+    if "iat" in payload and payload["iat"] > now:
+        raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+    if "aud" in payload:
+        raise jwt.InvalidAudienceError("Invalid audience")
+    
+    return payload
+
 
 def validate_jwt(
     credentials: HTTPAuthorizationCredentials = Security(security)
@@ -59,6 +114,25 @@ def validate_jwt(
         - Expired tokens are rejected
         - Missing or malformed tokens are rejected
     """
+    return decode_customer_id(credentials.credentials)
+
+
+def decode_customer_id(token: str) -> int:
+    """
+    Verify a raw JWT string and return its customer_id claim.
+    
+    Shared by validate_jwt() and dependencies that read the Authorization
+    header themselves (see app.main.tenant_context).
+    
+    Args:
+        token: Encoded JWT (without the "Bearer " prefix)
+    
+    Returns:
+        customer_id (int): The validated customer/tenant ID
+    
+    Raises:
+        HTTPException 401: If token is invalid, expired, or missing customer_id
+    """
     if not JWT_SECRET_KEY:
         logger.error("JWT_SECRET_KEY not configured - cannot validate tokens")
         raise HTTPException(
@@ -67,15 +141,8 @@ def validate_jwt(
         )
     
     try:
-        # Extract token from "Bearer <token>"
-        token = credentials.credentials
-        
         # Decode and verify JWT signature
-        payload = jwt.decode(
-            token,
-            JWT_SECRET_KEY,
-            algorithms=["HS256"]
-        )
+        payload = _decode_hs256(token)
         
         # Extract customer_id claim
         customer_id = payload.get("customer_id")
@@ -97,7 +164,7 @@ def validate_jwt(
                 detail="Invalid token: customer_id must be integer"
             )
         
-        logger.debug(f"JWT validated successfully for customer_id={customer_id}")
+        logger.debug("JWT validated successfully for customer_id=%s", customer_id)
         return customer_id
         
     except jwt.ExpiredSignatureError:
@@ -36,6 +36,26 @@ class TenantContextMiddleware:
         await self.app(scope, receive, send)
 
 
+def get_db():
+    """
+    Placeholder for database session dependency.
+    
+    This should be replaced with your actual database session factory.
+    
+    Example implementation:
+        from app.database import SessionLocal
+        
+        def get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+    """
+    # TODO: Import and use actual database session factory
+    raise NotImplementedError("Replace with actual database session factory")
+
+
 def get_tenant_session(
     customer_id: int = Depends(validate_jwt),
     db: Session = Depends(get_db)
@@ -71,7 +91,7 @@ def get_tenant_session(
     try:
         # Set tenant context for this request
         set_tenant_context(db, customer_id)
-        logger.debug(f"Tenant context set for request: customer_id={customer_id}")
+        logger.debug("Tenant context set for request: customer_id=%s", customer_id)
         
         # Yield session for request to use
         yield db
@@ -81,31 +101,11 @@ def get_tenant_session(
         # Critical for connection pooling - prevents tenant leakage
         try:
             clear_tenant_context(db)
-            logger.debug(f"Tenant context cleared after request")
+            logger.debug("Tenant context cleared after request")
         except Exception as e:
             logger.error(f"Error clearing tenant context: {e}")
 
 
-def get_db():
-    """
-    Placeholder for database session dependency.
-    
-    This should be replaced with your actual database session factory.
-    
-    Example implementation:
-        from app.database import SessionLocal
-        
-        def get_db():
-            db = SessionLocal()
-            try:
-                yield db
-            finally:
-                db.close()
-    """
-    # TODO: Import and use actual database session factory
-    raise NotImplementedError("Replace with actual database session factory")
-
-
 # Example usage in FastAPI routes:
 """
 from fastapi import FastAPI, Depends
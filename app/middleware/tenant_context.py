@@ -42,7 +42,7 @@ def set_tenant_context(db_session: Session, customer_id: int) -> None:
             text("SET app.current_tenant = :tenant_id"),
             {"tenant_id": customer_id}
         )
-        logger.debug(f"Tenant context set to customer_id={customer_id}")
+        logger.debug("Tenant context set to customer_id=%s", customer_id)
     except Exception as e:
         logger.error(f"Failed to set tenant context for customer_id={customer_id}: {e}")
         raise
@@ -88,7 +88,7 @@ def get_current_tenant(db_session: Session) -> Optional[int]:
             return int(tenant_id_str)
         return None
     except Exception as e:
-        logger.debug(f"No tenant context set or error retrieving: {e}")
+        logger.debug("No tenant context set or error retrieving: %s", e)
         return None
 
 
@@ -1,17 +1,28 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, List, Optional, Dict, Any, Tuple
 from enum import Enum
 
+# Shared by the request models: immutable, unknown fields dropped
+API_MODEL_CONFIG = ConfigDict(extra='ignore', frozen=True)
+
+# Caller and thread identifiers arrive from telephony webhooks with stray
+# whitespace; message content and memory values are kept verbatim
+Identifier = Annotated[str, StringConstraints(strip_whitespace=True)]
+
 class MessageRole(str, Enum):
     SYSTEM = "system"
     USER = "user"
     ASSISTANT = "assistant"
 
 class Message(BaseModel):
+    model_config = API_MODEL_CONFIG
+
     role: MessageRole
     content: str
 
 class ChatRequest(BaseModel):
+    model_config = API_MODEL_CONFIG
+
     messages: List[Message]
     temperature: float = Field(default=0.4, ge=0.0, le=2.0)
     top_p: float = Field(default=0.9, ge=0.0, le=1.0)
@@ -27,6 +38,8 @@ class ChatResponse(BaseModel):
     memory_count: int = 0
 
 class MemoryObject(BaseModel):
+    model_config = API_MODEL_CONFIG
+
     id: Optional[str] = None
     type: str  # person, preference, project, rule, moment, fact
     key: str
@@ -35,6 +48,8 @@ class MemoryObject(BaseModel):
     source: str = "orchestrator"
 
 class ToolCall(BaseModel):
+    model_config = API_MODEL_CONFIG
+
     name: str
     parameters: Dict[str, Any]
 
@@ -45,15 +60,23 @@ class ToolResponse(BaseModel):
 
 # Memory V2 Models
 class ProcessCallRequest(BaseModel):
-    user_id: str
-    thread_id: str
-    conversation_history: List[List[str]]  # List of [role, content] pairs
+    model_config = API_MODEL_CONFIG
+
+    user_id: Identifier
+    thread_id: Identifier
+    conversation_history: List[Tuple[str, str]]  # List of [role, content] pairs
+    call_ended: bool = True  # False for mid-call checkpoints
+    tokens_since_last: Optional[int] = None  # Tokens added since the last checkpoint of this call
 
 class EnrichedContextRequest(BaseModel):
-    user_id: str
+    model_config = API_MODEL_CONFIG
+
+    user_id: Identifier
     num_summaries: Optional[int] = 5
 
 class SearchSummariesRequest(BaseModel):
-    user_id: str
+    model_config = API_MODEL_CONFIG
+
+    user_id: Identifier
     query: str
     limit: Optional[int] = 5
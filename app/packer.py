@@ -1,49 +1,292 @@
 import os
+import re
+import json
+import time
+import sqlite3
 import logging
-from typing import List, Dict, Any, Optional
+import functools
+import threading
+from hashlib import blake2b
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from config_loader import get_setting
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
+
 # Load system prompts
-def load_system_prompt(filename: str) -> str:
-    """Load system prompt from file."""
+@functools.lru_cache(maxsize=None)
+def load_system_prompt(filename: str) -> Optional[str]:
+    """Load system prompt from file (read once per process); None if the file is missing."""
     try:
-        prompt_path = os.path.join(os.path.dirname(__file__), "prompts", filename)
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
+        prompt_path = os.path.join(_PROMPTS_DIR, filename)
+        # Unbuffered binary read: one read() call for the whole file
+        with open(prompt_path, 'rb', buffering=0) as f:
+            return f.readall().decode('utf-8').strip()
     except FileNotFoundError:
-        logger.warning(f"System prompt file {filename} not found, using fallback")
-        return ""
+        logger.warning("System prompt file %s not found, using fallback", filename)
+        return None
+
+# Fallback system prompts, used when the prompt files are missing
+_FALLBACK_BASE = """You are "Sam"—warm, playful, direct, no-BS. Keep continuity with saved memories and consent frames. Default PG-13. Be concise unless asked. Offer Next Steps for tasks."""
+
+_FALLBACK_SAFETY = """Apply Safety-Tight tone. Avoid explicit content. De-identify PII. Redirect payments to PCI flow."""
 
 # System prompts
-SYSTEM_BASE = load_system_prompt("system_sam.txt") or """You are "Sam"—warm, playful, direct, no-BS. Keep continuity with saved memories and consent frames. Default PG-13. Be concise unless asked. Offer Next Steps for tasks."""
+SYSTEM_BASE = load_system_prompt("system_sam.txt")
+if SYSTEM_BASE is None:
+    SYSTEM_BASE = _FALLBACK_BASE
 
-SYSTEM_SAFETY = load_system_prompt("system_safety.txt") or """Apply Safety-Tight tone. Avoid explicit content. De-identify PII. Redirect payments to PCI flow."""
+SYSTEM_SAFETY = load_system_prompt("system_safety.txt")
+if SYSTEM_SAFETY is None:
+    SYSTEM_SAFETY = _FALLBACK_SAFETY
+
+# Short-term memory holder: hot LRU in process, evicted recaps optionally paged
+# out to SQLite. The cold tier is off unless stm_cold_db names a file
+STM_COLD_DB = get_setting("stm_cold_db", "")
+STM_COLD_TTL_SECONDS = int(get_setting("stm_cold_ttl_seconds", 86400))
+STM_COLD_MAX_ROWS = int(get_setting("stm_cold_max_rows", 10000))
 
-# Simple short-term memory holder (in production, use Redis or similar)
 class STMManager:
     """Short-term memory manager for conversation recaps."""
     
-    def __init__(self):
-        self._recaps = {}  # thread_id -> recap
+    def __init__(self, max_hot: int = 1024, cold_path: Optional[str] = None,
+                 cold_ttl_seconds: int = STM_COLD_TTL_SECONDS, cold_max_rows: int = STM_COLD_MAX_ROWS):
+        """
+        Args:
+            max_hot: Number of thread recaps kept in memory
+            cold_path: SQLite file for evicted recaps (defaults to the
+                stm_cold_db setting); empty drops evicted recaps. The file
+                is created readable by the owner only
+            cold_ttl_seconds: Evicted recaps older than this are not paged back in
+            cold_max_rows: Most recaps kept in the cold store, oldest dropped first
+        """
+        self._recaps: "OrderedDict[str, str]" = OrderedDict()  # thread_id -> recap, LRU order
+        self._max_hot = max_hot
+        self._lock = threading.RLock()
+        self._cold_ttl_seconds = cold_ttl_seconds
+        self._cold_max_rows = cold_max_rows
+        
+        if cold_path is None:
+            cold_path = STM_COLD_DB
+        self._cold = None
+        if cold_path:
+            try:
+                if not os.path.exists(cold_path):
+                    os.close(os.open(cold_path, os.O_CREAT | os.O_WRONLY, 0o600))
+                self._cold = sqlite3.connect(cold_path, check_same_thread=False, isolation_level=None)
+                self._cold.execute(
+                    "CREATE TABLE IF NOT EXISTS stm_recaps (thread_id TEXT PRIMARY KEY, recap TEXT NOT NULL, stored_at REAL NOT NULL)"
+                )
+                self._cold.execute("CREATE INDEX IF NOT EXISTS stm_recaps_stored_at ON stm_recaps (stored_at)")
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("STM cold store unavailable, evicted recaps will be dropped: %s", e)
+                self._cold = None
         
     def get_recap(self, thread_id: str = "default") -> str:
         """Get recap for a conversation thread."""
-        return self._recaps.get(thread_id, "(New conversation)")
+        with self._lock:
+            recap = self._recaps.get(thread_id)
+            if recap is not None:
+                self._recaps.move_to_end(thread_id)
+                return recap
+            
+            # Page the recap back in from the cold store
+            recap = self._read_cold(thread_id)
+            if recap is None:
+                return "(New conversation)"
+            self._put_hot(thread_id, recap)
+            return recap
         
     def update_recap(self, thread_id: str, recap: str):
         """Update recap for a conversation thread."""
-        self._recaps[thread_id] = recap[:2000]  # Limit recap size
+        with self._lock:
+            self._put_hot(thread_id, recap[:2000])  # Limit recap size
         
     def should_update_recap(self, message_count: int) -> bool:
         """Determine if recap should be updated based on message count."""
         return message_count > 0 and message_count % 20 == 0
+    
+    def _put_hot(self, thread_id: str, recap: str):
+        self._recaps[thread_id] = recap
+        self._recaps.move_to_end(thread_id)
+        while len(self._recaps) > self._max_hot:
+            evicted_id, evicted_recap = self._recaps.popitem(last=False)
+            self._write_cold(evicted_id, evicted_recap)
+    
+    def _read_cold(self, thread_id: str) -> Optional[str]:
+        if self._cold is None:
+            return None
+        try:
+            row = self._cold.execute(
+                "SELECT recap FROM stm_recaps WHERE thread_id = ? AND stored_at >= ?",
+                (thread_id, time.time() - self._cold_ttl_seconds)
+            ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.warning("STM cold read failed: %s", e)
+            return None
+    
+    def _write_cold(self, thread_id: str, recap: str):
+        if self._cold is None:
+            return
+        try:
+            now = time.time()
+            self._cold.execute(
+                "INSERT OR REPLACE INTO stm_recaps (thread_id, recap, stored_at) VALUES (?, ?, ?)",
+                (thread_id, recap, now)
+            )
+            # Expire old recaps and keep the newest cold_max_rows
+            self._cold.execute("DELETE FROM stm_recaps WHERE stored_at < ?", (now - self._cold_ttl_seconds,))
+            self._cold.execute(
+                "DELETE FROM stm_recaps WHERE thread_id IN "
+                "(SELECT thread_id FROM stm_recaps ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self._cold_max_rows,)
+            )
+        except sqlite3.Error as e:
+            logger.warning("STM cold write failed: %s", e)
 
 # Global STM manager instance
 stm_manager = STMManager()
 
+class _TTLCache:
+    """Tiny thread-safe TTL cache for rarely-changing lookups."""
+    
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: Dict[Any, Tuple[Any, float]] = {}  # key -> (value, expiry)
+    
+    def get(self, key: Any) -> Tuple[bool, Any]:
+        """Return (hit, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return False, None
+            return True, entry[0]
+    
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Admin panel settings change rarely; re-read them at most once a minute
+_admin_settings_cache = _TTLCache(ttl_seconds=60)
+_ADMIN_SETTINGS_KEY = ("personality_settings", "agent_name", "admin")
+
+def _find_admin_instructions(results: List[Dict[str, Any]]) -> Optional[str]:
+    for result in results:
+        if result.get("key") == "personality_settings" or result.get("setting_key") == "personality_settings":
+            value = result.get("value", {})
+            admin_instructions = value.get("setting_value", {}).get("ai_instructions") or value.get("ai_instructions")
+            if admin_instructions:
+                return admin_instructions
+    return None
+
+def _find_agent_name(results: List[Dict[str, Any]]) -> Optional[str]:
+    for result in results:
+        if result.get("key") == "agent_name" or result.get("setting_key") == "agent_name":
+            value = result.get("value", {})
+            stored_name = value.get("value") or value.get("setting_value") or value.get("agent_name")
+            if stored_name:
+                return stored_name
+    return None
+
+# Shared pool so a cache miss doesn't pay for spinning up threads
+_admin_search_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="admin-settings")
+
+def get_admin_prompt_settings() -> Tuple[Optional[str], Optional[str]]:
+    """
+    Get (ai_instructions, agent_name) from the admin panel settings in AI-Memory.
+    
+    Results are cached for 60 seconds. On a miss both searches run in
+    parallel. Errors propagate and are not cached.
+    
+    Returns:
+        Tuple of admin AI instructions and agent name (None when not set)
+    """
+    hit, settings = _admin_settings_cache.get(_ADMIN_SETTINGS_KEY)
+    if hit:
+        return settings
+    
+    from app.http_memory import HTTPMemoryStore
+    mem_store = HTTPMemoryStore()
+    
+    # Search for personality settings and agent_name from admin panel
+    personality_future = _admin_search_pool.submit(mem_store.search, "personality_settings", user_id="admin", k=5)
+    agent_future = _admin_search_pool.submit(mem_store.search, "agent_name", user_id="admin", k=5)
+    settings = (
+        _find_admin_instructions(personality_future.result()),
+        _find_agent_name(agent_future.result())
+    )
+    
+    _admin_settings_cache.set(_ADMIN_SETTINGS_KEY, settings)
+    return settings
+
+# Relationship labels that get called out in the memory block
+_REL_LABELS = {"wife": "USER'S WIFE", "friend": "USER'S FRIEND"}
+_KELLY_JOB_RE = re.compile(r"teacher|job|profession")
+
+def _normalize_memory_value(key: str, value: Any) -> Dict[str, Any]:
+    """Reduce a memory value to the summary, relationship label and name the prompt line needs."""
+    if not isinstance(value, dict):
+        return {"summary": str(value), "label": None, "name": None}
+    
+    # Extract summary or create one from value
+    summary = value.get("summary") or value.get("content") or value.get("description")
+    if not summary:
+        # Create summary from the first three short string fields (stop scanning there)
+        key_items = []
+        for k, v in value.items():
+            if isinstance(v, str) and len(v) < 100:
+                key_items.append(f"{k}: {v}")
+                if len(key_items) == 3:
+                    break
+        summary = "; ".join(key_items)
+    
+    # Make relationships clearer for the LLM
+    label = _REL_LABELS.get(value.get("relationship"))
+    if label is None and key == "user_info" and "name" in value:
+        label = "USER'S NAME"
+    return {"summary": summary, "label": label, "name": value.get("name", "Unknown")}
+
+def _render_memory_line(mem_type: str, key: str, value: Any) -> Optional[str]:
+    """Render one retrieved memory as a prompt line, or None if it has no summary."""
+    memory = _normalize_memory_value(key, value)
+    summary = memory["summary"]
+    if not summary:
+        return None
+    
+    # Truncate summary if too long
+    summary = summary if len(summary) <= 200 else summary[:197] + "..."
+    relationship_context = f" ({memory['label']}: {memory['name']})" if memory["label"] else ""
+    
+    # Highlight Kelly's job information specially
+    if "kelly" in key.lower() and _KELLY_JOB_RE.search(summary.lower()):
+        return f"*** KELLY'S JOB: {key} → {summary}{relationship_context} ***"
+    return f"- {mem_type}:{key} → {summary}{relationship_context}"
+
+@functools.lru_cache(maxsize=4096)
+def _cached_memory_line(mem_type: str, key: str, value_json: str) -> Optional[str]:
+    return _render_memory_line(mem_type, key, json.loads(value_json))
+
+def _format_memory_line(memory: Dict[str, Any]) -> Optional[str]:
+    """Format a memory for [RELEVANT_MEMORIES], memoized on its serialized content."""
+    value = memory["value"]
+    try:
+        # Key order is kept (no sort_keys) since it decides which fields the summary uses
+        value_json = json.dumps(value)
+    except (TypeError, ValueError):
+        return _render_memory_line(memory["type"], memory["key"], value)
+    return _cached_memory_line(memory["type"], memory["key"], value_json)
+
 def pack_prompt(
     messages: List[Dict[str, str]], 
     memories: List[Dict[str, Any]], 
@@ -69,34 +312,17 @@ def pack_prompt(
     
     if not safety_mode:
         try:
-            from app.http_memory import HTTPMemoryStore
-            mem_store = HTTPMemoryStore()
-            
-            # Search for personality settings from admin panel
-            results = mem_store.search("personality_settings", user_id="admin", k=5)
-            
-            for result in results:
-                if result.get("key") == "personality_settings" or result.get("setting_key") == "personality_settings":
-                    value = result.get("value", {})
-                    admin_instructions = value.get("setting_value", {}).get("ai_instructions") or value.get("ai_instructions")
-                    if admin_instructions:
-                        system_prompt = admin_instructions
-                        logger.info(f"✅ Using AI instructions from admin panel: {admin_instructions[:100]}...")
-                        break
-            
-            # Load agent_name from admin panel
-            agent_results = mem_store.search("agent_name", user_id="admin", k=5)
-            for result in agent_results:
-                if result.get("key") == "agent_name" or result.get("setting_key") == "agent_name":
-                    value = result.get("value", {})
-                    stored_name = value.get("value") or value.get("setting_value") or value.get("agent_name")
-                    if stored_name:
-                        agent_name = stored_name
-                        logger.info(f"✅ Using agent name from admin panel: {agent_name}")
-                        break
+            admin_instructions, stored_name = get_admin_prompt_settings()
+            if admin_instructions:
+                system_prompt = admin_instructions
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("✅ Using AI instructions from admin panel: %s...", admin_instructions[:100])
+            if stored_name:
+                agent_name = stored_name
+                logger.info("✅ Using agent name from admin panel: %s", agent_name)
                         
         except Exception as e:
-            logger.warning(f"Failed to load admin personality settings, using default: {e}")
+            logger.warning("Failed to load admin personality settings, using default: %s", e)
     
     if safety_mode:
         system_prompt = SYSTEM_SAFETY
@@ -108,63 +334,20 @@ def pack_prompt(
     recap = stm_manager.get_recap(thread_id)
     
     # Format memory context
-    memory_lines = []
-    for memory in memories[:8]:  # Limit to top 8 memories
-        value = memory["value"]
-        # Extract summary or create one from value
-        if isinstance(value, dict):
-            summary = value.get("summary") or value.get("content") or value.get("description")
-            if not summary:
-                # Create summary from key-value pairs
-                key_items = []
-                for k, v in value.items():
-                    if isinstance(v, str) and len(v) < 100:
-                        key_items.append(f"{k}: {v}")
-                summary = "; ".join(key_items[:3])
-        else:
-            summary = str(value)
-            
-        # Truncate summary if too long
-        if summary and len(summary) > 200:
-            summary = summary[:197] + "..."
-            
-        if summary:
-            # Make relationships clearer for the LLM
-            relationship_context = ""
-            if isinstance(memory.get("value"), dict):
-                rel = memory["value"].get("relationship")
-                if rel == "wife":
-                    relationship_context = f" (USER'S WIFE: {memory['value'].get('name', 'Unknown')})"
-                elif rel == "friend":
-                    relationship_context = f" (USER'S FRIEND: {memory['value'].get('name', 'Unknown')})"
-                elif memory["key"] == "user_info" and "name" in memory["value"]:
-                    relationship_context = f" (USER'S NAME: {memory['value'].get('name', 'Unknown')})"
-            
-            # Highlight Kelly's job information specially
-            if "kelly" in memory['key'].lower() and any(word in str(value).lower() for word in ['teacher', 'job', 'profession']):
-                memory_lines.append(f"*** KELLY'S JOB: {memory['key']} → {summary}{relationship_context} ***")
-            else:
-                memory_lines.append(f"- {memory['type']}:{memory['key']} → {summary}{relationship_context}")
+    memory_lines = [line for line in map(_format_memory_line, memories[:8]) if line]  # Limit to top 8 memories
     
     memory_block = "\n".join(memory_lines) if memory_lines else "(none)"
     
-    # Build complete prompt
-    prompt_messages = []
-    
-    # System prompt
-    prompt_messages.append({
+    # Build complete prompt: system prompt, thread recap, relevant memories
+    prompt_messages = [{
         "role": "system",
         "content": system_prompt
-    })
-    
-    # Thread recap
+    }]
     if recap and recap != "(New conversation)":
         prompt_messages.append({
             "role": "system", 
             "content": f"[THREAD_RECAP]\n{recap}"
         })
-    
-    # Relevant memories
     prompt_messages.append({
         "role": "system",
         "content": f"[RELEVANT_MEMORIES]\n{memory_block}"
@@ -172,19 +355,13 @@ def pack_prompt(
     
     # Conversation messages (limit to last N to manage context size)
     max_history = 10
-    recent_messages = messages[-max_history:] if len(messages) > max_history else messages
-    prompt_messages.extend(recent_messages)
+    prompt_messages += messages[-max_history:] if len(messages) > max_history else messages
     
-    # Update recap if needed
+    # Update recap if needed (off the request path; the next turn picks it up)
     if stm_manager.should_update_recap(len(messages)):
-        try:
-            recap_content = generate_recap(messages[-20:])  # Use last 20 messages for recap
-            stm_manager.update_recap(thread_id, recap_content)
-            logger.info(f"Updated recap for thread {thread_id}")
-        except Exception as e:
-            logger.error(f"Failed to update recap: {e}")
+        _recap_pool.submit(_background_update_recap, thread_id, messages[-20:])  # Use last 20 messages for recap
     
-    logger.info(f"Packed prompt: {len(prompt_messages)} total messages, {len(memory_lines)} memories")
+    logger.info("Packed prompt: %d total messages, %d memories", len(prompt_messages), len(memory_lines))
     return prompt_messages
 
 def generate_recap(messages: List[Dict[str, str]]) -> str:
@@ -201,46 +378,115 @@ def generate_recap(messages: List[Dict[str, str]]) -> str:
         return "(New conversation)"
     
     # Simple recap generation - in production, use LLM for better summaries
-    user_messages = [msg["content"] for msg in messages if msg["role"] == "user"]
-    assistant_messages = [msg["content"] for msg in messages if msg["role"] == "assistant"]
-    
-    if not user_messages:
+    # Only the first and last user messages are used: scan in from each end
+    first_idx = next((i for i, msg in enumerate(messages) if msg["role"] == "user"), None)
+    if first_idx is None:
         return "(New conversation)"
+    last_idx = next(i for i in range(len(messages) - 1, first_idx - 1, -1) if messages[i]["role"] == "user")
     
     # Create basic recap
-    topics = []
-    recap = "(New conversation)"
-    if len(user_messages) > 0:
-        # Extract key topics (simplified approach)
-        first_msg = user_messages[0][:100]
-        last_msg = user_messages[-1][:100] if len(user_messages) > 1 else ""
-        
-        if len(user_messages) == 1:
-            recap = f"User asked about: {first_msg}"
-        else:
-            recap = f"Conversation started with: {first_msg}... Recent topic: {last_msg}"
+    first_msg = messages[first_idx]["content"][:100]
+    if first_idx == last_idx:
+        recap = f"User asked about: {first_msg}"
+    else:
+        last_msg = messages[last_idx]["content"][:100]
+        recap = f"Conversation started with: {first_msg}... Recent topic: {last_msg}"
     
     return recap[:500]  # Limit recap length
 
-def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
+# Recap updates run here so pack_prompt doesn't wait on them
+_recap_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recap")
+
+def _background_update_recap(thread_id: str, messages: List[Dict[str, str]]):
+    """Generate and store a thread recap; runs on _recap_pool."""
+    try:
+        recap_content = generate_recap(messages)
+        stm_manager.update_recap(thread_id, recap_content)
+        logger.info("Updated recap for thread %s", thread_id)
+    except Exception as e:
+        logger.error("Failed to update recap: %s", e)
+
+def _keyword_re(keywords: List[str], flags: int = 0) -> "re.Pattern[str]":
+    """Compile keywords into one alternation; matches like `any(k in text)` in a single scan."""
+    return re.compile("|".join(map(re.escape, keywords)), flags)
+
+# Carry-kit extraction patterns, compiled once at import
+# Patterns: "my wife Kelly", "my wife's name is Kelly", "her name is Kelly"
+_RELATIONSHIP_PATTERNS = [
+    (re.compile(r"my (wife|husband|partner|spouse)(?:'s name)? (?:is |called )?(\w+)", re.IGNORECASE), "spouse"),
+    (re.compile(r"my (son|daughter|child|kid)(?:'s name)? (?:is |called )?(\w+)", re.IGNORECASE), "child"),
+    (re.compile(r"my (mom|mother|dad|father|parent)(?:'s name)? (?:is |called )?(\w+)", re.IGNORECASE), "parent"),
+    (re.compile(r"my (brother|sister|sibling)(?:'s name)? (?:is |called )?(\w+)", re.IGNORECASE), "sibling"),
+    (re.compile(r"my (friend|buddy|colleague)(?:'s name)? (?:is |called )?(\w+)", re.IGNORECASE), "friend"),
+    (re.compile(r"(?:his|her|their) name (?:is |called )?(\w+)", re.IGNORECASE), "person"),
+]
+
+# Patterns: "birthday is January 3rd", "born on 1/3/1966", "birthday January 3"
+_BIRTHDAY_PATTERNS = [
+    re.compile(r"birthday (?:is |on )?([A-Za-z]+ \d+(?:st|nd|rd|th)?(?:,? \d{4})?)", re.IGNORECASE),
+    re.compile(r"born (?:on |in )?([A-Za-z]+ \d+(?:st|nd|rd|th)?(?:,? \d{4})?)", re.IGNORECASE),
+    re.compile(r"birthday (?:is )?(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)", re.IGNORECASE),
+]
+_NAME_WITH_RELATION_BIRTHDAY = re.compile(r"my (wife|husband|partner|son|daughter|mom|mother|dad|father) (\w+)(?:'s)? birthday")
+_POSSESSIVE_BIRTHDAY = re.compile(r"my (wife|husband|partner|son|daughter|mom|mother|dad|father)(?:'s)? birthday")
+_PRONOUN_BIRTHDAY = re.compile(r"(?:her|his|their) birthday")
+_NAMED_BIRTHDAY = re.compile(r"(\w+)(?:'s)? birthday", re.IGNORECASE)
+
+# Patterns: "drives a Honda", "has a Tesla", "owns a Ford"
+_CAR_PATTERNS = [
+    re.compile(r"(?:drive|drives|driving|has|have|own|owns) (?:a |an )?(\w+)(?: (\w+))?(?:\s+car|\s+truck|\s+vehicle)?", re.IGNORECASE),
+]
+_PRONOUN_VEHICLE_OWNER = re.compile(r"(?:she|he|her|his|their) (?:drives|has|owns)")
+_NAMED_VEHICLE_OWNER = re.compile(r"(\w+) (?:drives|has|owns)", re.IGNORECASE)
+
+_VEHICLE_HINT_RE = _keyword_re([
+    "car", "vehicle", "truck", "drive", "drives", "honda", "toyota", "ford", "tesla", "bmw", "mercedes"
+])
+_PREFERENCE_RE = _keyword_re(["i prefer", "i like", "i don't like", "i hate", "my favorite", "favorite"])
+
+_NAME_PATTERNS = [
+    re.compile(r"my name is (\w+)", re.IGNORECASE),
+    re.compile(r"i'?m (\w+)", re.IGNORECASE),
+    re.compile(r"this is (\w+) (?:calling|speaking)", re.IGNORECASE),
+    re.compile(r"call me (\w+)", re.IGNORECASE),
+]
+
+def extract_carry_kit_items(message_content: str, content_lower: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Extract carry-kit items from a message for long-term storage.
     
     Args:
         message_content: Content to analyze for carry-kit items
+        content_lower: message_content.lower(), if the caller already has it
         
     Returns:
         List of memory objects to store
     """
-    import re
     items = []
-    content_lower = message_content.lower()
+    if content_lower is None:
+        content_lower = message_content.lower()
+    
+    # Cheap prefilter: every extractor below needs one of these literals, so
+    # most small talk bails out before any regex or hashing. The literals
+    # avoid i/s/k, whose IGNORECASE matches include ı, ſ and K.
+    explicit_hint = "remember this" in content_lower or "don't forget" in content_lower
+    has_name = "name" in content_lower
+    relationship_hint = has_name or "my " in content_lower
+    birthday_hint = "rthday" in content_lower or "born" in content_lower
+    vehicle_hint = _VEHICLE_HINT_RE.search(content_lower) is not None
+    preference_hint = _PREFERENCE_RE.search(content_lower) is not None
+    name_hint = has_name or "m " in content_lower or "call" in content_lower or "peak" in content_lower
+    if not (explicit_hint or relationship_hint or birthday_hint or vehicle_hint or preference_hint or name_hint):
+        return items
+    
+    # Stable 64-bit content key (builtin hash() is per-process and was cut to 10k buckets)
+    content_hash = blake2b(message_content.encode('utf-8'), digest_size=8).hexdigest()
     
     # Look for explicit memory markers
-    if "remember this" in content_lower or "don't forget" in content_lower:
+    if explicit_hint:
         items.append({
             "type": "fact",
-            "key": f"explicit_memory_{hash(message_content) % 10000}",
+            "key": f"explicit_memory_{content_hash}",
             "value": {
                 "description": message_content[:500],
                 "content": message_content,
@@ -250,18 +496,8 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
         })
     
     # Extract relationship names (wife, husband, son, daughter, etc.)
-    # Patterns: "my wife Kelly", "my wife's name is Kelly", "her name is Kelly"
-    relationship_patterns = [
-        (r"my (wife|husband|partner|spouse)(?:'s name)? (?:is |called )?(\w+)", "spouse"),
-        (r"my (son|daughter|child|kid)(?:'s name)? (?:is |called )?(\w+)", "child"),
-        (r"my (mom|mother|dad|father|parent)(?:'s name)? (?:is |called )?(\w+)", "parent"),
-        (r"my (brother|sister|sibling)(?:'s name)? (?:is |called )?(\w+)", "sibling"),
-        (r"my (friend|buddy|colleague)(?:'s name)? (?:is |called )?(\w+)", "friend"),
-        (r"(?:his|her|their) name (?:is |called )?(\w+)", "person"),
-    ]
-    
-    for pattern, relationship_type in relationship_patterns:
-        match = re.search(pattern, content_lower, re.IGNORECASE)
+    for pattern, relationship_type in (_RELATIONSHIP_PATTERNS if relationship_hint else ()):
+        match = pattern.search(content_lower)
         if match and match.lastindex:
             # Get the name (last captured group)
             name = match.group(match.lastindex).capitalize()
@@ -280,15 +516,8 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
             break
     
     # Extract birthdays and dates
-    # Patterns: "birthday is January 3rd", "born on 1/3/1966", "birthday January 3"
-    birthday_patterns = [
-        r"birthday (?:is |on )?([A-Za-z]+ \d+(?:st|nd|rd|th)?(?:,? \d{4})?)",
-        r"born (?:on |in )?([A-Za-z]+ \d+(?:st|nd|rd|th)?(?:,? \d{4})?)",
-        r"birthday (?:is )?(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)",
-    ]
-    
-    for pattern in birthday_patterns:
-        match = re.search(pattern, content_lower, re.IGNORECASE)
+    for pattern in (_BIRTHDAY_PATTERNS if birthday_hint else ()):
+        match = pattern.search(content_lower)
         if match:
             date_str = match.group(1)
             # Try to identify whose birthday
@@ -296,18 +525,18 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
             
             # Check for "my wife Kelly's birthday" or "my wife's birthday"
             # Priority: specific name > relationship > generic
-            name_with_relation = re.search(r"my (wife|husband|partner|son|daughter|mom|mother|dad|father) (\w+)(?:'s)? birthday", content_lower)
+            name_with_relation = _NAME_WITH_RELATION_BIRTHDAY.search(content_lower)
             if name_with_relation:
                 # Found "my wife Kelly's birthday" - use the name
                 person_name = name_with_relation.group(2).capitalize()
             else:
                 # Check for possessive patterns: "my wife's birthday", "her birthday", "his birthday"
-                possessive_match = re.search(r"my (wife|husband|partner|son|daughter|mom|mother|dad|father)(?:'s)? birthday", content_lower)
+                possessive_match = _POSSESSIVE_BIRTHDAY.search(content_lower)
                 if possessive_match:
                     person_name = possessive_match.group(1)
-                elif re.search(r"(?:her|his|their) birthday", content_lower):
+                elif _PRONOUN_BIRTHDAY.search(content_lower):
                     # Look for a name mentioned earlier in the message
-                    name_match = re.search(r"(\w+)(?:'s)? birthday", message_content, re.IGNORECASE)
+                    name_match = _NAMED_BIRTHDAY.search(message_content)
                     if name_match:
                         person_name = name_match.group(1)
             
@@ -325,14 +554,9 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
             break
     
     # Extract car/vehicle information
-    # Patterns: "drives a Honda", "has a Tesla", "owns a Ford"
-    car_patterns = [
-        r"(?:drive|drives|driving|has|have|own|owns) (?:a |an )?(\w+)(?: (\w+))?(?:\s+car|\s+truck|\s+vehicle)?",
-    ]
-    
-    if any(word in content_lower for word in ["car", "vehicle", "truck", "drive", "drives", "honda", "toyota", "ford", "tesla", "bmw", "mercedes"]):
-        for pattern in car_patterns:
-            match = re.search(pattern, content_lower, re.IGNORECASE)
+    if vehicle_hint:
+        for pattern in _CAR_PATTERNS:
+            match = pattern.search(content_lower)
             if match:
                 make = match.group(1).capitalize()
                 model = match.group(2).capitalize() if match.group(2) else ""
@@ -340,9 +564,9 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
                 
                 # Determine owner
                 owner = "user"
-                if re.search(r"(?:she|he|her|his|their) (?:drives|has|owns)", content_lower):
+                if _PRONOUN_VEHICLE_OWNER.search(content_lower):
                     # Look for a name
-                    name_match = re.search(r"(\w+) (?:drives|has|owns)", message_content, re.IGNORECASE)
+                    name_match = _NAMED_VEHICLE_OWNER.search(message_content)
                     if name_match:
                         owner = name_match.group(1)
                 
@@ -360,30 +584,20 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
                 break
     
     # Look for preference statements
-    preference_keywords = ["i prefer", "i like", "i don't like", "i hate", "my favorite", "favorite"]
-    for keyword in preference_keywords:
-        if keyword in content_lower:
-            items.append({
-                "type": "preference",
-                "key": f"user_preference_{hash(message_content) % 10000}",
-                "value": {
-                    "description": message_content[:300],
-                    "preference": message_content,
-                },
-                "ttl_days": 365
-            })
-            break
+    if preference_hint:
+        items.append({
+            "type": "preference",
+            "key": f"user_preference_{content_hash}",
+            "value": {
+                "description": message_content[:300],
+                "preference": message_content,
+            },
+            "ttl_days": 365
+        })
     
     # Extract user's own name
-    name_patterns = [
-        r"my name is (\w+)",
-        r"i'?m (\w+)",
-        r"this is (\w+) (?:calling|speaking)",
-        r"call me (\w+)"
-    ]
-    
-    for pattern in name_patterns:
-        match = re.search(pattern, content_lower, re.IGNORECASE)
+    for pattern in (_NAME_PATTERNS if name_hint else ()):
+        match = pattern.search(content_lower)
         if match:
             user_name = match.group(1).capitalize()
             items.append({
@@ -400,67 +614,68 @@ def extract_carry_kit_items(message_content: str) -> List[Dict[str, Any]]:
     
     return items
 
-def should_remember(message_content: str, context: Optional[Dict[str, Any]] = None) -> bool:
+# Keyword sets for should_remember / detect_safety_triggers
+# Explicit memory requests
+_EXPLICIT_RE = _keyword_re(["remember this", "save this", "don't forget", "keep in mind"])
+
+# Important personal information
+_IMPORTANT_RE = _keyword_re([
+    "my name is", "i am", "i work at", "my contact", "my email",
+    "my phone", "my address", "my preference", "i prefer", "i like",
+    "i don't like", "important to me", "my wife", "my husband", "my partner",
+    "my son", "my daughter", "my child", "my friend", "my family"
+])
+
+# Dates and birthdays
+_DATE_RE = _keyword_re(["birthday", "born on", "anniversary", "born in"])
+
+# Vehicles and possessions
+_VEHICLE_RE = _keyword_re(["car", "truck", "vehicle", "drives", "honda", "toyota", "ford", "tesla"])
+
+# Project or task-related information
+_PROJECT_RE = _keyword_re(["project", "task", "deadline", "meeting", "schedule"])
+
+# Safety trigger patterns (case-insensitive, so the raw message can be scanned without lower())
+_SAFETY_RE = _keyword_re([
+    "help me hack", "how to steal", "illegal", "harmful", "dangerous",
+    "violence", "threat", "suicide", "self-harm", "abuse"
+], re.IGNORECASE)
+
+def should_remember(message_content: str, context: Optional[Dict[str, Any]] = None, content_lower: Optional[str] = None) -> bool:
     """
     Determine if a message should be stored in long-term memory.
     
     Args:
         message_content: Message content to evaluate
         context: Additional context for decision making
+        content_lower: message_content.lower(), if the caller already has it
         
     Returns:
         True if message should be remembered
     """
-    content_lower = message_content.lower()
-    
-    # Explicit memory requests
-    explicit_markers = ["remember this", "save this", "don't forget", "keep in mind"]
-    if any(marker in content_lower for marker in explicit_markers):
-        return True
-    
-    # Important personal information
-    important_patterns = [
-        "my name is", "i am", "i work at", "my contact", "my email",
-        "my phone", "my address", "my preference", "i prefer", "i like",
-        "i don't like", "important to me", "my wife", "my husband", "my partner",
-        "my son", "my daughter", "my child", "my friend", "my family"
-    ]
-    if any(pattern in content_lower for pattern in important_patterns):
-        return True
+    if content_lower is None:
+        content_lower = message_content.lower()
     
-    # Dates and birthdays
-    date_patterns = ["birthday", "born on", "anniversary", "born in"]
-    if any(pattern in content_lower for pattern in date_patterns):
+    if (_EXPLICIT_RE.search(content_lower)
+            or _IMPORTANT_RE.search(content_lower)
+            or _DATE_RE.search(content_lower)
+            or _VEHICLE_RE.search(content_lower)):
         return True
     
-    # Vehicles and possessions
-    vehicle_patterns = ["car", "truck", "vehicle", "drives", "honda", "toyota", "ford", "tesla"]
-    if any(pattern in content_lower for pattern in vehicle_patterns):
-        return True
-    
-    # Project or task-related information
-    project_patterns = ["project", "task", "deadline", "meeting", "schedule"]
-    if any(pattern in content_lower for pattern in project_patterns) and len(message_content) > 50:
+    if len(message_content) > 50 and _PROJECT_RE.search(content_lower):
         return True
     
     return False
 
-def detect_safety_triggers(message_content: str) -> bool:
+def detect_safety_triggers(message_content: str, content_lower: Optional[str] = None) -> bool:
     """
     Detect if a message contains content that should trigger safety mode.
     
     Args:
         message_content: Message content to analyze
+        content_lower: message_content.lower(), if the caller already has it
         
     Returns:
         True if safety mode should be activated
     """
-    content_lower = message_content.lower()
-    
-    # Safety trigger patterns
-    trigger_patterns = [
-        "help me hack", "how to steal", "illegal", "harmful", "dangerous",
-        "violence", "threat", "suicide", "self-harm", "abuse"
-    ]
-    
-    return any(pattern in content_lower for pattern in trigger_patterns)
+    return _SAFETY_RE.search(message_content if content_lower is None else content_lower) is not None
@@ -3,14 +3,138 @@ Personality Tracker Module
 Measures and tracks personality traits and communication styles
 """
 
-import json
 import logging
-import re
+import threading
+from bisect import bisect_right
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+import numpy as np
+from app.response_cache import response_cache
+from app.summarizer import CallSummarizer, is_trivial_call, parse_llm_json, truncate_turns
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 logger = logging.getLogger(__name__)
 
+# Every measured trait with its neutral default (0-100 scale); the
+# personality_metrics columns and the LLM's expected keys
+TRAIT_DEFAULTS = {
+    # Big 5
+    "openness": 50,
+    "conscientiousness": 50,
+    "extraversion": 50,
+    "agreeableness": 50,
+    "neuroticism": 50,
+    
+    # Communication style
+    "formality": 50,
+    "directness": 50,
+    "detail_orientation": 50,
+    "patience": 50,
+    "technical_comfort": 50,
+    
+    # Emotional state
+    "frustration_level": 0,
+    "satisfaction_level": 50,
+    "urgency_level": 30
+}
+
+# Profile lines for format_personality_summary: a score below 35, 45, 55, 65
+# or above picks very-low / low / neutral / high / very-high
+_LABEL_THRESHOLDS = (35, 45, 55, 65)
+
+def _scale_labels(low_label: str, high_label: str) -> Tuple[str, ...]:
+    return (f"very {low_label}", low_label, "neutral", high_label, f"very {high_label}")
+
+_PROFILE_SCALES = (
+    ("Communication Style", "avg_formality", _scale_labels("casual", "formal")),
+    ("Directness", "avg_directness", _scale_labels("indirect", "direct")),
+    ("Technical Level", "avg_technical_comfort", _scale_labels("non-technical", "technical")),
+    ("Detail Preference", "avg_detail_orientation", _scale_labels("high-level", "detailed")),
+    ("Patience", "avg_patience", _scale_labels("impatient", "patient")),
+    ("Recent Satisfaction", "recent_satisfaction", _scale_labels("low", "high"))
+)
+
+# Keyword sets for the rule-based fallback metrics
+_FORMAL_WORDS = frozenset(("please", "thank you", "kindly", "appreciate", "sincerely"))
+_CASUAL_WORDS = frozenset(("yeah", "yep", "gonna", "wanna", "hey"))
+_FRUSTRATED_WORDS = frozenset(("frustrated", "angry", "upset", "annoyed", "terrible", "awful", "broken"))
+_SATISFIED_WORDS = frozenset(("great", "perfect", "excellent", "thank", "appreciate", "wonderful"))
+_URGENT_WORDS = frozenset(("urgent", "asap", "immediately", "now", "quickly", "hurry"))
+_TECHNICAL_WORDS = frozenset(("api", "database", "server", "code", "technical", "system", "configure"))
+# Every keyword once, so words shared between sets are only searched for once
+_FALLBACK_WORDS = _FORMAL_WORDS | _CASUAL_WORDS | _FRUSTRATED_WORDS | _SATISFIED_WORDS | _URGENT_WORDS | _TECHNICAL_WORDS
+
+# With hyperscan installed, all keywords are matched in one pass over the
+# text. No keyword can overlap itself, so per-pattern match counts equal
+# str.count. Scans share one scratch space, hence the lock.
+_KEYWORD_LIST = sorted(_FALLBACK_WORDS)
+_keyword_db = None
+_keyword_db_lock = threading.Lock()
+
+def _count_keywords(text: str) -> Dict[str, int]:
+    """Occurrences of each fallback keyword in (casefolded) text."""
+    global _keyword_db
+    if hyperscan is None:
+        return {word: text.count(word) for word in _FALLBACK_WORDS}
+    
+    counts = [0] * len(_KEYWORD_LIST)
+    
+    def on_match(pattern_id, start, end, flags, context):
+        counts[pattern_id] += 1
+    
+    with _keyword_db_lock:
+        if _keyword_db is None:
+            database = hyperscan.Database()
+            database.compile(
+                expressions=[word.encode("utf-8") for word in _KEYWORD_LIST],
+                ids=list(range(len(_KEYWORD_LIST))),
+                elements=len(_KEYWORD_LIST)
+            )
+            _keyword_db = database
+        _keyword_db.scan(text.encode("utf-8"), match_event_handler=on_match)
+    return dict(zip(_KEYWORD_LIST, counts))
+
+# Trait rubric, shared with the fused call-analysis prompt
+PERSONALITY_RUBRIC = """BIG 5 PERSONALITY:
+- openness: How curious, creative, open to new experiences (0=traditional, 100=very open)
+- conscientiousness: How organized, dependable, disciplined (0=spontaneous, 100=very organized)
+- extraversion: How sociable, assertive, energetic (0=introverted, 100=extraverted)
+- agreeableness: How cooperative, empathetic, trusting (0=competitive, 100=very agreeable)
+- neuroticism: Emotional reactivity (0=very stable, 100=highly reactive)
+
+COMMUNICATION STYLE:
+- formality: Communication formality (0=very casual, 100=very formal)
+- directness: How direct they communicate (0=very indirect, 100=very direct)
+- detail_orientation: Level of detail (0=high-level only, 100=very detailed)
+- patience: Patience level (0=very impatient, 100=very patient)
+- technical_comfort: Comfort with technical topics (0=non-technical, 100=very technical)
+
+EMOTIONAL STATE (THIS CALL):
+- frustration_level: Current frustration (0=none, 100=extremely frustrated)
+- satisfaction_level: Current satisfaction (0=very unsatisfied, 100=very satisfied)
+- urgency_level: Urgency/time pressure (0=no rush, 100=extremely urgent)"""
+
+# Instructions and rubric never change, so every request shares this prefix
+PERSONALITY_SYSTEM_PROMPT = f"""You are a personality analysis expert. Provide objective ratings based on observable communication patterns.
+
+Rate the following traits on a scale of 0-100:
+
+{PERSONALITY_RUBRIC}
+
+Respond ONLY with valid JSON mapping trait names to numbers 0-100."""
+
+PERSONALITY_BATCH_SYSTEM_PROMPT = f"""You are a personality analysis expert. Provide objective ratings based on observable communication patterns.
+
+For each of several numbered callers, rate the following traits on a scale of 0-100:
+
+{PERSONALITY_RUBRIC}
+
+Respond ONLY with a JSON array holding one object per caller, each with its "item" number plus trait names mapped to numbers 0-100, no other text."""
+
 class PersonalityTracker:
     """
     Analyzes conversation to extract personality traits and communication style.
@@ -38,47 +162,139 @@ class PersonalityTracker:
         Returns:
             Dictionary with personality metrics (all values 0-100)
         """
+        now = datetime.now()
         try:
             # Extract only user messages for personality analysis
             user_messages = [content for role, content in conversation_history if role == "user"]
             
             if not user_messages:
-                return self._create_neutral_profile(user_id, call_id)
+                return self._create_neutral_profile(user_id, call_id, now)
+            
+            if is_trivial_call(conversation_history):
+                result = self.build_personality_record(self._fallback_personality_analysis(user_messages), user_id, call_id, now)
+                result["extraction_source"] = "heuristic"
+                return result
             
             # Analyze with LLM
             personality_data = self._extract_personality_with_llm(user_messages)
             
-            result = {
-                "user_id": user_id,
-                "call_id": call_id,
-                "measured_at": datetime.now(),
-                
-                # Big 5
-                "openness": personality_data.get("openness", 50),
-                "conscientiousness": personality_data.get("conscientiousness", 50),
-                "extraversion": personality_data.get("extraversion", 50),
-                "agreeableness": personality_data.get("agreeableness", 50),
-                "neuroticism": personality_data.get("neuroticism", 50),
-                
-                # Communication style
-                "formality": personality_data.get("formality", 50),
-                "directness": personality_data.get("directness", 50),
-                "detail_orientation": personality_data.get("detail_orientation", 50),
-                "patience": personality_data.get("patience", 50),
-                "technical_comfort": personality_data.get("technical_comfort", 50),
-                
-                # Emotional state
-                "frustration_level": personality_data.get("frustration_level", 0),
-                "satisfaction_level": personality_data.get("satisfaction_level", 50),
-                "urgency_level": personality_data.get("urgency_level", 30)
-            }
+            result = self.build_personality_record(personality_data, user_id, call_id, now)
             
-            logger.info(f"✅ Analyzed personality for user {user_id}: extraversion={result['extraversion']}, formality={result['formality']}")
+            logger.info("✅ Analyzed personality for user %s: extraversion=%s, formality=%s", user_id, result['extraversion'], result['formality'])
             return result
             
         except Exception as e:
-            logger.error(f"❌ Failed to analyze personality for call {call_id}: {e}", exc_info=True)
-            return self._create_neutral_profile(user_id, call_id)
+            logger.error("❌ Failed to analyze personality for call %s: %s", call_id, e, exc_info=True)
+            return self._create_neutral_profile(user_id, call_id, now)
+    
+    def analyze_batch(self, items: List[Tuple[str, str, List[Tuple[str, str]]]]) -> List[Dict[str, Any]]:
+        """
+        Analyze personality for several calls with one LLM request.
+        
+        Calls with no user messages get the neutral profile; cached calls are
+        served from the response cache; anything the batch response leaves
+        out goes through analyze_personality individually.
+        
+        Args:
+            items: (user_id, call_id, conversation_history) per call
+            
+        Returns:
+            Personality records in the same order as items
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        now = datetime.now()
+        pending = []  # (index, all user messages, prompt text)
+        for index, (user_id, call_id, conversation_history) in enumerate(items):
+            user_messages = [content for role, content in conversation_history if role == "user"]
+            if not user_messages:
+                results[index] = self._create_neutral_profile(user_id, call_id, now)
+                continue
+            if is_trivial_call(conversation_history):
+                results[index] = self.analyze_personality(conversation_history, user_id, call_id)
+                continue
+            cache_text = "\n".join(user_messages)
+            cached = response_cache.get("personality", cache_text)
+            if cached is not None:
+                results[index] = self.build_personality_record(cached, user_id, call_id, now)
+            else:
+                pending.append((index, cache_text, "\n".join(truncate_turns(user_messages))))
+        
+        if len(pending) > 1:
+            try:
+                batch = self._extract_personality_batch_with_llm([text for _, _, text in pending])
+            except Exception as e:
+                logger.warning("⚠️ Batch personality analysis of %d calls failed, analyzing individually: %s", len(pending), e)
+                batch = {}
+            for position, (index, cache_text, _) in enumerate(pending):
+                scores = batch.get(position)
+                if scores is not None:
+                    user_id, call_id, _ = items[index]
+                    response_cache.set("personality", cache_text, scores)
+                    results[index] = self.build_personality_record(scores, user_id, call_id, now)
+        
+        for index, result in enumerate(results):
+            if result is None:
+                user_id, call_id, conversation_history = items[index]
+                results[index] = self.analyze_personality(conversation_history, user_id, call_id)
+        
+        logger.info("✅ Analyzed personality for batch of %d calls (%d sent to LLM)", len(items), len(pending))
+        return results
+    
+    def _extract_personality_batch_with_llm(self, texts: List[str]) -> Dict[int, Dict[str, float]]:
+        """
+        Rate numbered callers' messages in one request.
+        
+        Returns:
+            Position in texts -> validated trait scores, for items the LLM returned
+        """
+        callers = "\n\n".join(f"=== CALLER {item} ===\n{text}" for item, text in enumerate(texts, 1))
+        messages = [
+            {"role": "system", "content": PERSONALITY_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Analyze the personality and communication style of these callers.\n\n{callers}"}
+        ]
+        
+        response = self.llm_chat(messages, temperature=0.2, max_tokens=400 * len(texts))
+        response_text = response[0] if isinstance(response, tuple) else response.get("content", "[]")
+        data = parse_llm_json(response_text or "[]")
+        if not isinstance(data, list):
+            raise ValueError("batch personality response is not a JSON array")
+        
+        scores = {}
+        for entry in data:
+            try:
+                position = int(entry.pop("item")) - 1
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+            if 0 <= position < len(texts):
+                scores[position] = self.validate_scores(entry)
+        return scores
+    
+    def build_personality_record(
+        self,
+        personality_data: Dict[str, float],
+        user_id: str,
+        call_id: str,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the personality_metrics row from validated trait scores.
+        
+        Args:
+            personality_data: Trait name -> score (0-100); missing traits get defaults
+            user_id: Identifier for the caller
+            call_id: Unique call identifier
+            now: Timestamp for measured_at (defaults to the current time)
+            
+        Returns:
+            Dictionary with personality metrics (all values 0-100)
+        """
+        record = {
+            "user_id": user_id,
+            "call_id": call_id,
+            "measured_at": now or datetime.now()
+        }
+        record.update((trait, personality_data.get(trait, default)) for trait, default in TRAIT_DEFAULTS.items())
+        return record
     
     def _extract_personality_with_llm(self, user_messages: List[str]) -> Dict[str, float]:
         """
@@ -86,140 +302,129 @@ class PersonalityTracker:
         
         Returns metrics on 0-100 scale.
         """
-        # Combine messages for analysis
-        combined_text = "\n".join(user_messages)
+        # Combine messages for analysis; the cache is keyed on every message,
+        # not just the ones that survive truncation
+        cache_text = "\n".join(user_messages)
+        combined_text = "\n".join(truncate_turns(user_messages))
+        
+        cached = response_cache.get("personality", cache_text)
+        if cached is not None:
+            return cached
         
         prompt = f"""Analyze the personality and communication style from these messages.
 
 USER MESSAGES:
-{combined_text}
-
-Rate the following traits on a scale of 0-100:
-
-BIG 5 PERSONALITY:
-- openness: How curious, creative, open to new experiences (0=traditional, 100=very open)
-- conscientiousness: How organized, dependable, disciplined (0=spontaneous, 100=very organized)
-- extraversion: How sociable, assertive, energetic (0=introverted, 100=extraverted)
-- agreeableness: How cooperative, empathetic, trusting (0=competitive, 100=very agreeable)
-- neuroticism: Emotional reactivity (0=very stable, 100=highly reactive)
-
-COMMUNICATION STYLE:
-- formality: Communication formality (0=very casual, 100=very formal)
-- directness: How direct they communicate (0=very indirect, 100=very direct)
-- detail_orientation: Level of detail (0=high-level only, 100=very detailed)
-- patience: Patience level (0=very impatient, 100=very patient)
-- technical_comfort: Comfort with technical topics (0=non-technical, 100=very technical)
-
-EMOTIONAL STATE (THIS CALL):
-- frustration_level: Current frustration (0=none, 100=extremely frustrated)
-- satisfaction_level: Current satisfaction (0=very unsatisfied, 100=very satisfied)
-- urgency_level: Urgency/time pressure (0=no rush, 100=extremely urgent)
-
-Respond ONLY with valid JSON mapping trait names to numbers 0-100:"""
-
+{combined_text}"""
+        
         try:
             messages = [
-                {"role": "system", "content": "You are a personality analysis expert. Provide objective ratings based on observable communication patterns."},
+                {"role": "system", "content": PERSONALITY_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ]
             
             response = self.llm_chat(messages, temperature=0.2, max_tokens=400)
             
             # Parse JSON response
-            response_text = response.get("content", "{}")
-            # Remove markdown code blocks if present
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text).strip()
-            
-            data = json.loads(response_text)
-            
-            # Validate all values are 0-100
-            validated_data = {}
-            for key, value in data.items():
-                try:
-                    num_value = float(value)
-                    validated_data[key] = max(0, min(100, num_value))  # Clamp to 0-100
-                except (ValueError, TypeError):
-                    validated_data[key] = 50  # Default to neutral
-            
-            return validated_data
+            response_text = CallSummarizer._response_text(response)
+            scores = self.validate_scores(parse_llm_json(response_text))
+            response_cache.set("personality", cache_text, scores)
+            return scores
             
         except Exception as e:
-            logger.error(f"LLM personality extraction failed: {e}")
+            logger.error("LLM personality extraction failed: %s", e)
             return self._fallback_personality_analysis(user_messages)
     
+    @staticmethod
+    def validate_scores(data: Dict[str, Any]) -> Dict[str, float]:
+        """Keep known traits, clamping scores to 0-100 and defaulting unparseable values to neutral."""
+        validated_data = {}
+        for key in TRAIT_DEFAULTS:
+            if key not in data:
+                continue
+            try:
+                num_value = float(data[key])
+                validated_data[key] = max(0, min(100, num_value))  # Clamp to 0-100
+            except (ValueError, TypeError):
+                validated_data[key] = 50  # Default to neutral
+        return validated_data
+    
     def _fallback_personality_analysis(self, user_messages: List[str]) -> Dict[str, float]:
         """Simple rule-based personality analysis when LLM fails."""
-        combined_text = " ".join(user_messages).lower()
+        combined_text = " ".join(user_messages).casefold()
         
         # Simple heuristics
-        metrics = {
-            "openness": 50,
-            "conscientiousness": 50,
-            "extraversion": 50,
-            "agreeableness": 50,
-            "neuroticism": 50,
-            "formality": 50,
-            "directness": 50,
-            "detail_orientation": 50,
-            "patience": 50,
-            "technical_comfort": 50,
-            "frustration_level": 0,
-            "satisfaction_level": 50,
-            "urgency_level": 30
-        }
+        metrics = dict(TRAIT_DEFAULTS)
+        
+        # Occurrence count per distinct keyword; repeated keywords weigh more
+        counts = _count_keywords(combined_text)
+        
+        def category_count(words: frozenset) -> int:
+            return sum(counts[word] for word in words)
         
         # Detect formality
-        formal_words = ["please", "thank you", "kindly", "appreciate", "sincerely"]
-        casual_words = ["yeah", "yep", "gonna", "wanna", "hey"]
-        formal_count = sum(1 for word in formal_words if word in combined_text)
-        casual_count = sum(1 for word in casual_words if word in combined_text)
+        formal_count = category_count(_FORMAL_WORDS)
+        casual_count = category_count(_CASUAL_WORDS)
         metrics["formality"] = 60 if formal_count > casual_count else 40
         
         # Detect frustration
-        frustrated_words = ["frustrated", "angry", "upset", "annoyed", "terrible", "awful", "broken"]
-        frustration_count = sum(1 for word in frustrated_words if word in combined_text)
+        frustration_count = category_count(_FRUSTRATED_WORDS)
         metrics["frustration_level"] = min(100, frustration_count * 25)
         
         # Detect satisfaction
-        satisfied_words = ["great", "perfect", "excellent", "thank", "appreciate", "wonderful"]
-        satisfaction_count = sum(1 for word in satisfied_words if word in combined_text)
+        satisfaction_count = category_count(_SATISFIED_WORDS)
         metrics["satisfaction_level"] = min(100, 50 + satisfaction_count * 15)
         
         # Detect urgency
-        urgent_words = ["urgent", "asap", "immediately", "now", "quickly", "hurry"]
-        urgency_count = sum(1 for word in urgent_words if word in combined_text)
+        urgency_count = category_count(_URGENT_WORDS)
         metrics["urgency_level"] = min(100, 30 + urgency_count * 20)
         
         # Detect directness
         metrics["directness"] = 70 if len(combined_text) < 200 else 50
         
         # Detect technical comfort
-        technical_words = ["api", "database", "server", "code", "technical", "system", "configure"]
-        technical_count = sum(1 for word in technical_words if word in combined_text)
+        technical_count = category_count(_TECHNICAL_WORDS)
         metrics["technical_comfort"] = min(100, 40 + technical_count * 15)
         
         return metrics
     
-    def _create_neutral_profile(self, user_id: str, call_id: str) -> Dict[str, Any]:
+    def fallback_personality_batch(self, user_messages_per_call: List[List[str]]) -> np.ndarray:
+        """
+        Rule-based personality metrics for many calls at once.
+        
+        Same heuristics as the per-call fallback, but each keyword is counted
+        across all transcripts with one vectorized np.char.count, which makes
+        bulk reprocessing (e.g. during an LLM outage) much cheaper.
+        
+        Args:
+            user_messages_per_call: The user messages of each call
+            
+        Returns:
+            float32 array of shape (calls, traits), columns in TRAIT_DEFAULTS order
+        """
+        texts = [" ".join(user_messages).casefold() for user_messages in user_messages_per_call]
+        metrics = np.tile(np.array(list(TRAIT_DEFAULTS.values()), dtype=np.float32), (len(texts), 1))
+        if not texts:
+            return metrics
+        
+        text_array = np.array(texts, dtype=str)
+        counts = {word: np.char.count(text_array, word) for word in _FALLBACK_WORDS}
+        
+        def category_count(words: frozenset) -> np.ndarray:
+            return sum(counts[word] for word in words)
+        
+        column = {trait: index for index, trait in enumerate(TRAIT_DEFAULTS)}
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        metrics[:, column["formality"]] = np.where(category_count(_FORMAL_WORDS) > category_count(_CASUAL_WORDS), 60, 40)
+        metrics[:, column["frustration_level"]] = np.minimum(100, category_count(_FRUSTRATED_WORDS) * 25)
+        metrics[:, column["satisfaction_level"]] = np.minimum(100, 50 + category_count(_SATISFIED_WORDS) * 15)
+        metrics[:, column["urgency_level"]] = np.minimum(100, 30 + category_count(_URGENT_WORDS) * 20)
+        metrics[:, column["directness"]] = np.where(lengths < 200, 70, 50)
+        metrics[:, column["technical_comfort"]] = np.minimum(100, 40 + category_count(_TECHNICAL_WORDS) * 15)
+        return metrics
+    
+    def _create_neutral_profile(self, user_id: str, call_id: str, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Create neutral personality profile when analysis fails."""
-        return {
-            "user_id": user_id,
-            "call_id": call_id,
-            "measured_at": datetime.now(),
-            "openness": 50,
-            "conscientiousness": 50,
-            "extraversion": 50,
-            "agreeableness": 50,
-            "neuroticism": 50,
-            "formality": 50,
-            "directness": 50,
-            "detail_orientation": 50,
-            "patience": 50,
-            "technical_comfort": 50,
-            "frustration_level": 0,
-            "satisfaction_level": 50,
-            "urgency_level": 30
-        }
+        return self.build_personality_record({}, user_id, call_id, now)
     
     def format_personality_summary(self, averages: Dict[str, Any]) -> str:
         """
@@ -231,27 +436,11 @@ Respond ONLY with valid JSON mapping trait names to numbers 0-100:"""
         Returns:
             Formatted string for LLM prompt
         """
-        def score_to_label(score: float, low_label: str, high_label: str) -> str:
-            if score < 35:
-                return f"very {low_label}"
-            elif score < 45:
-                return low_label
-            elif score < 55:
-                return "neutral"
-            elif score < 65:
-                return high_label
-            else:
-                return f"very {high_label}"
-        
-        lines = [
-            "CALLER PERSONALITY PROFILE:",
-            f"Communication Style: {score_to_label(averages.get('avg_formality', 50), 'casual', 'formal')}",
-            f"Directness: {score_to_label(averages.get('avg_directness', 50), 'indirect', 'direct')}",
-            f"Technical Level: {score_to_label(averages.get('avg_technical_comfort', 50), 'non-technical', 'technical')}",
-            f"Detail Preference: {score_to_label(averages.get('avg_detail_orientation', 50), 'high-level', 'detailed')}",
-            f"Patience: {score_to_label(averages.get('avg_patience', 50), 'impatient', 'patient')}",
-            f"Recent Satisfaction: {score_to_label(averages.get('recent_satisfaction', 50), 'low', 'high')}"
-        ]
+        lines = ["CALLER PERSONALITY PROFILE:"]
+        lines.extend(
+            f"{heading}: {labels[bisect_right(_LABEL_THRESHOLDS, averages.get(column, 50))]}"
+            for heading, column, labels in _PROFILE_SCALES
+        )
         
         if averages.get('satisfaction_trend'):
             lines.append(f"Trend: Satisfaction is {averages['satisfaction_trend']}")
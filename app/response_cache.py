@@ -0,0 +1,143 @@
+"""
+LLM Response Cache Module
+Reuses analysis results for transcripts that were already sent to the LLM
+"""
+
+import json
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from config_loader import get_setting
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL = int(get_setting("response_cache_ttl", 86400))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(get_setting("response_cache_max_entries", 2000))
+RESPONSE_CACHE_SIMILARITY = float(get_setting("response_cache_similarity", 0))  # 0 disables the semantic tier
+
+# Kinds the semantic tier may serve. Summaries carry key_variables (names,
+# account ids, amounts) of the transcript they came from, and the cache is
+# shared by every caller and tenant in the process, so a near-duplicate
+# transcript must never get another call's summary back
+SEMANTIC_KINDS = frozenset({"personality"})
+
+_SPEAKER_TAG_RE = re.compile(r"^(User|Assistant):", re.MULTILINE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalize_transcript(text: str) -> str:
+    """Lower-case speaker tags and collapse whitespace so trivially different replays share a key."""
+    text = _SPEAKER_TAG_RE.sub(lambda m: m.group(1).lower() + ":", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+class ResponseCache:
+    """
+    Two-tier per-worker cache of parsed LLM analysis results.
+    
+    Exact tier: blake2b of (kind, normalized transcript) -> JSON string, LRU
+    with a TTL. Semantic tier: for SEMANTIC_KINDS, when a local embedding model
+    is loaded, a miss falls back to the most similar cached transcript of the
+    same kind if its cosine similarity is at least RESPONSE_CACHE_SIMILARITY.
+    Only successful LLM results are stored, never rule-based fallbacks.
+    """
+    
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: int = RESPONSE_CACHE_TTL,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        # key -> (stored_at, kind, unit vector or None, JSON string)
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[np.ndarray], str]]" = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(kind: str, normalized: str) -> str:
+        return blake2b(f"{kind}\x00{normalized}".encode("utf-8"), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _embed(normalized: str) -> Optional[np.ndarray]:
+        """Embed with the local encoder; None when only placeholder embeddings are available."""
+        from app.memory import get_encoder
+        encoder = get_encoder()
+        if encoder is None:
+            return None
+        try:
+            return encoder.encode_batch([normalized])[0]
+        except Exception as e:
+            logger.warning("⚠️ Response cache embedding failed: %s", e)
+            return None
+    
+    def get(self, kind: str, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result.
+        
+        Args:
+            kind: Analysis type ("summary", "personality", ...); never shared across kinds
+            text: Transcript or prompt input the result was computed from
+        
+        Returns:
+            A fresh copy of the cached result, or None on a miss
+        """
+        normalized = normalize_transcript(text)
+        key = self._key(kind, normalized)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[3])
+        
+        if self.similarity > 0 and kind in SEMANTIC_KINDS:
+            vector = self._embed(normalized)
+            if vector is not None:
+                with self._lock:
+                    candidates = [
+                        (vec, payload) for stored_at, entry_kind, vec, payload in self._entries.values()
+                        if entry_kind == kind and vec is not None and now - stored_at <= self.ttl_seconds
+                    ]
+                if candidates:
+                    scores = np.stack([vec for vec, _ in candidates]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity:
+                        with self._lock:
+                            self.semantic_hits += 1
+                        return json.loads(candidates[best][1])
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def set(self, kind: str, text: str, result: Dict[str, Any]) -> None:
+        """Store a successful LLM result for text."""
+        normalized = normalize_transcript(text)
+        key = self._key(kind, normalized)
+        vector = self._embed(normalized) if self.similarity > 0 and kind in SEMANTIC_KINDS else None
+        payload = json.dumps(result, default=str)
+        
+        with self._lock:
+            self._entries[key] = (time.monotonic(), kind, vector, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses
+            }
+
+response_cache = ResponseCache()
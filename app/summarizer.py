@@ -5,26 +5,150 @@ Extracts summaries, key variables, and sentiment from conversations
 
 import json
 import logging
+from operator import itemgetter
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import re
+from config_loader import get_setting
+from app.response_cache import response_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 logger = logging.getLogger(__name__)
 
+# Process-wide draft acceptance counters (summarizers are created per request)
+draft_stats = {"accepted": 0, "rejected": 0}
+
+# Sentiment keywords for the rule-based fallback
+_FRUSTRATED_WORDS = ("frustrated", "angry", "upset", "annoyed", "problem", "issue", "broken")
+_SATISFIED_WORDS = ("thank", "great", "perfect", "resolved", "fixed", "appreciate")
+
+_FENCE_RE = re.compile(r'```json\s*|\s*```')
+
+# Token budget for the conversation part of analysis prompts; longer calls keep
+# their opening and closing turns and elide the middle
+ANALYSIS_PROMPT_MAX_TOKENS = int(get_setting("analysis_prompt_max_tokens", 2000))
+PROMPT_HEAD_TURNS = 3
+PROMPT_TAIL_TURNS = 10
+
+# Calls below either threshold are analyzed with the rule-based fallbacks
+# only; an LLM adds little over them for a one-line "hi, bye" call
+ANALYSIS_MIN_CHARS = int(get_setting("analysis_min_chars", 200))
+ANALYSIS_MIN_USER_TURNS = int(get_setting("analysis_min_user_turns", 2))
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when installed, else estimate at ~4 chars per token."""
+    global _encoding
+    if tiktoken is None:
+        return len(text) // 4 + 1
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+def truncate_turns(turns: List[str], max_tokens: int = ANALYSIS_PROMPT_MAX_TOKENS) -> List[str]:
+    """
+    Cap the prompt cost of a long conversation.
+    
+    Turns within max_tokens are returned unchanged. Otherwise the first
+    PROMPT_HEAD_TURNS and last PROMPT_TAIL_TURNS are kept around an
+    elision marker, which also keeps the prompt prefix stable as a call grows.
+    
+    Args:
+        turns: Conversation turns in order, one string per turn
+        max_tokens: Token budget for the joined turns
+        
+    Returns:
+        The turns to put in the prompt
+    """
+    keep = PROMPT_HEAD_TURNS + PROMPT_TAIL_TURNS
+    if len(turns) <= keep or count_tokens("\n".join(turns)) <= max_tokens:
+        return turns
+    elided = len(turns) - keep
+    return turns[:PROMPT_HEAD_TURNS] + [f"...[{elided} turns elided]..."] + turns[-PROMPT_TAIL_TURNS:]
+
+def is_trivial_call(conversation_history: List[Tuple[str, str]]) -> bool:
+    """True when a call is too short to be worth an LLM analysis."""
+    user_turns = sum(1 for role, _ in conversation_history if role == "user")
+    if user_turns < ANALYSIS_MIN_USER_TURNS:
+        return True
+    return sum(map(len, map(itemgetter(1), conversation_history))) < ANALYSIS_MIN_CHARS
+
+def strip_code_fences(response_text: str) -> str:
+    """Remove markdown code fences around LLM JSON output."""
+    if "```" in response_text:
+        response_text = _FENCE_RE.sub('', response_text)
+    return response_text.strip()
+
+def parse_llm_json(response_text: str) -> Any:
+    """
+    Parse JSON from LLM output, tolerating markdown code fences.
+    
+    Uses orjson when installed (several times faster than json.loads on the
+    nested key_variables/personality objects); both raise ValueError subclasses.
+    """
+    response_text = strip_code_fences(response_text)
+    if orjson is not None:
+        return orjson.loads(response_text)
+    return json.loads(response_text)
+
+# Summary fields, shared with the fused call-analysis prompt
+SUMMARY_RUBRIC = """1. summary: A brief 2-3 sentence summary of what was discussed
+2. key_topics: List of main topics discussed (e.g., ["billing", "technical_support"])
+3. key_variables: Important details mentioned (e.g., {"account_id": "12345", "issue_type": "billing error"})
+4. sentiment: Overall caller sentiment (positive, neutral, negative, frustrated, satisfied)
+5. resolution_status: Was issue resolved? (resolved, pending, escalated, unknown)"""
+
+# Static system prompts: byte-identical on every call so the LLM server can
+# reuse the cached prefix; only the user message carries the transcript
+SUMMARY_SYSTEM_PROMPT = f"""You are a conversation analysis expert. Extract structured information from conversations.
+
+Extract the following in JSON format:
+{SUMMARY_RUBRIC}
+
+Respond ONLY with valid JSON, no other text."""
+
+VERIFY_SYSTEM_PROMPT = f"""You are a conversation analysis expert. Verify and correct structured information extracted from conversations.
+
+The answer must contain the following in JSON format:
+{SUMMARY_RUBRIC}
+
+If the draft is correct, reply with exactly ACCEPT.
+Otherwise respond ONLY with the corrected JSON, no other text."""
+
+SUMMARY_BATCH_SYSTEM_PROMPT = f"""You are a conversation analysis expert. Extract structured information from each of several numbered conversations.
+
+For each conversation, extract the following:
+{SUMMARY_RUBRIC}
+
+Respond ONLY with a JSON array holding one object per conversation, each with its "item" number plus the fields above, no other text."""
+
 class CallSummarizer:
     """
     Extracts structured summaries from call transcripts.
     Uses LLM to generate concise summaries and extract key information.
     """
     
-    def __init__(self, llm_chat_function):
+    def __init__(self, llm_chat_function, draft_chat_function=None):
         """
         Initialize the summarizer with an LLM chat function.
         
         Args:
             llm_chat_function: Function that takes messages and returns LLM response
+            draft_chat_function: Optional small local model used to draft the
+                summary JSON, which the main LLM then accepts or corrects
         """
         self.llm_chat = llm_chat_function
+        self.draft_chat = draft_chat_function
     
     def summarize_call(self, conversation_history: List[Tuple[str, str]], user_id: str, call_id: str) -> Dict[str, Any]:
         """
@@ -38,47 +162,162 @@ class CallSummarizer:
         Returns:
             Dictionary with summary, key_topics, key_variables, sentiment, etc.
         """
+        now = datetime.now()
         try:
             # Build conversation transcript
-            transcript = self._build_transcript(conversation_history)
+            full_transcript, transcript = self._build_transcripts(conversation_history)
             
-            # Generate summary using LLM
-            summary_data = self._extract_summary_with_llm(transcript)
+            if is_trivial_call(conversation_history):
+                result = self.build_summary_record(self._fallback_extraction(transcript), conversation_history, user_id, call_id, now)
+                result["extraction_source"] = "heuristic"
+                logger.info("⏭️ Summarized short call %s for user %s without the LLM", call_id, user_id)
+                return result
             
-            # Calculate duration (estimate based on message count)
-            duration_seconds = self._estimate_duration(conversation_history)
+            # Generate summary using LLM
+            summary_data = self._extract_summary_with_llm(transcript, full_transcript)
             
-            result = {
-                "call_id": call_id,
-                "user_id": user_id,
-                "call_date": datetime.now(),
-                "summary": summary_data.get("summary", ""),
-                "key_topics": summary_data.get("key_topics", []),
-                "key_variables": summary_data.get("key_variables", {}),
-                "sentiment": summary_data.get("sentiment", "neutral"),
-                "resolution_status": summary_data.get("resolution_status", "unknown"),
-                "duration_seconds": duration_seconds
-            }
+            result = self.build_summary_record(summary_data, conversation_history, user_id, call_id, now)
             
-            logger.info(f"✅ Summarized call {call_id} for user {user_id}: {len(summary_data.get('summary', ''))} chars")
+            logger.info("✅ Summarized call %s for user %s: %d chars", call_id, user_id, len(summary_data.get('summary', '')))
             return result
             
         except Exception as e:
-            logger.error(f"❌ Failed to summarize call {call_id}: {e}", exc_info=True)
-            return self._create_fallback_summary(conversation_history, user_id, call_id)
+            logger.error("❌ Failed to summarize call %s: %s", call_id, e, exc_info=True)
+            return self._create_fallback_summary(conversation_history, user_id, call_id, now)
+    
+    def build_summary_record(
+        self,
+        summary_data: Dict[str, Any],
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        call_id: str,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the call_summaries row from extracted summary fields.
+        
+        Args:
+            summary_data: Parsed summary fields (see _extract_summary_with_llm)
+            conversation_history: List of (role, content) tuples, used for duration
+            user_id: Identifier for the caller
+            call_id: Unique call identifier
+            now: Timestamp for call_date (defaults to the current time)
+            
+        Returns:
+            Dictionary with summary, key_topics, key_variables, sentiment, etc.
+        """
+        return {
+            "call_id": call_id,
+            "user_id": user_id,
+            "call_date": now or datetime.now(),
+            "summary": summary_data.get("summary", ""),
+            "key_topics": summary_data.get("key_topics", []),
+            "key_variables": summary_data.get("key_variables", {}),
+            "sentiment": summary_data.get("sentiment", "neutral"),
+            "resolution_status": summary_data.get("resolution_status", "unknown"),
+            # Calculate duration (estimate based on message count)
+            "duration_seconds": self._estimate_duration(conversation_history)
+        }
+    
+    def summarize_batch(self, items: List[Tuple[str, str, List[Tuple[str, str]]]]) -> List[Dict[str, Any]]:
+        """
+        Summarize several calls with one LLM request.
+        
+        Calls already in the response cache are served from it. Anything the
+        batch response leaves out (or a batch of one) goes through
+        summarize_call individually.
+        
+        Args:
+            items: (user_id, call_id, conversation_history) per call
+            
+        Returns:
+            Summary records in the same order as items
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        now = datetime.now()
+        pending = []  # (index, full transcript, prompt transcript)
+        for index, (user_id, call_id, conversation_history) in enumerate(items):
+            if is_trivial_call(conversation_history):
+                results[index] = self.summarize_call(conversation_history, user_id, call_id)
+                continue
+            full_transcript, transcript = self._build_transcripts(conversation_history)
+            cached = response_cache.get("summary", full_transcript)
+            if cached is not None:
+                results[index] = self.build_summary_record(cached, conversation_history, user_id, call_id, now)
+            else:
+                pending.append((index, full_transcript, transcript))
+        
+        if len(pending) > 1:
+            try:
+                batch = self._extract_summary_batch_with_llm([transcript for _, _, transcript in pending])
+            except Exception as e:
+                logger.warning("⚠️ Batch summary of %d calls failed, summarizing individually: %s", len(pending), e)
+                batch = {}
+            for position, (index, full_transcript, _) in enumerate(pending):
+                summary_data = batch.get(position)
+                if summary_data is not None:
+                    user_id, call_id, conversation_history = items[index]
+                    response_cache.set("summary", full_transcript, summary_data)
+                    results[index] = self.build_summary_record(summary_data, conversation_history, user_id, call_id, now)
+        
+        for index, result in enumerate(results):
+            if result is None:
+                user_id, call_id, conversation_history = items[index]
+                results[index] = self.summarize_call(conversation_history, user_id, call_id)
+        
+        logger.info("✅ Summarized batch of %d calls (%d sent to LLM)", len(items), len(pending))
+        return results
     
-    def _build_transcript(self, conversation_history: List[Tuple[str, str]]) -> str:
-        """Build readable transcript from conversation history."""
-        lines = []
-        for role, content in conversation_history:
-            speaker = "User" if role == "user" else "Assistant"
-            lines.append(f"{speaker}: {content}")
-        return "\n".join(lines)
+    def _extract_summary_batch_with_llm(self, transcripts: List[str]) -> Dict[int, Dict[str, Any]]:
+        """
+        Summarize numbered transcripts in one request.
+        
+        Returns:
+            Position in transcripts -> parsed summary fields, for items the LLM returned
+        """
+        conversations = "\n\n".join(
+            f"=== CONVERSATION {item} ===\n{transcript}" for item, transcript in enumerate(transcripts, 1)
+        )
+        messages = [
+            {"role": "system", "content": SUMMARY_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Analyze these conversations.\n\n{conversations}"}
+        ]
+        
+        response = self.llm_chat(messages, temperature=0.3, max_tokens=500 * len(transcripts))
+        data = parse_llm_json(self._response_text(response))
+        if not isinstance(data, list):
+            raise ValueError("batch summary response is not a JSON array")
+        
+        summaries = {}
+        for entry in data:
+            try:
+                position = int(entry["item"]) - 1
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= position < len(transcripts):
+                summaries[position] = self.validate_summary(entry)
+        return summaries
+    
+    def _build_transcripts(self, conversation_history: List[Tuple[str, str]]) -> Tuple[str, str]:
+        """
+        Build readable transcripts from conversation history.
+        
+        Returns:
+            (full transcript, prompt transcript). The prompt transcript elides
+            the middle of long calls; the full one keys the response cache so
+            calls that differ only in the elided turns don't share a result
+        """
+        lines = [("User: " if role == "user" else "Assistant: ") + content for role, content in conversation_history]
+        return "\n".join(lines), "\n".join(truncate_turns(lines))
     
-    def _extract_summary_with_llm(self, transcript: str) -> Dict[str, Any]:
+    def _extract_summary_with_llm(self, transcript: str, full_transcript: Optional[str] = None) -> Dict[str, Any]:
         """
         Use LLM to extract structured summary from transcript.
         
+        Args:
+            transcript: Transcript to put in the prompt (possibly elided)
+            full_transcript: Untruncated transcript for the cache key (defaults to transcript)
+        
         Returns:
             {
                 "summary": "Brief 2-3 sentence summary",
@@ -88,47 +327,112 @@ class CallSummarizer:
                 "resolution_status": "resolved/pending/escalated"
             }
         """
+        cache_text = full_transcript if full_transcript is not None else transcript
+        cached = response_cache.get("summary", cache_text)
+        if cached is not None:
+            return cached
+        
+        # Only the transcript varies; the instructions live in the static system prompt
         prompt = f"""Analyze this conversation and extract structured information.
 
 CONVERSATION:
-{transcript}
-
-Extract the following in JSON format:
-1. summary: A brief 2-3 sentence summary of what was discussed
-2. key_topics: List of main topics discussed (e.g., ["billing", "technical_support"])
-3. key_variables: Important details mentioned (e.g., {{"account_id": "12345", "issue_type": "billing error"}})
-4. sentiment: Overall caller sentiment (positive, neutral, negative, frustrated, satisfied)
-5. resolution_status: Was issue resolved? (resolved, pending, escalated, unknown)
-
-Respond ONLY with valid JSON, no other text:"""
-
+{transcript}"""
+        
+        try:
+            # Draft with the small model first; the main LLM only has to confirm it
+            draft = self._draft_with_small_model(prompt)
+            if draft is not None:
+                summary_data = self._verify_draft(prompt, draft)
+            else:
+                messages = [
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+                
+                response = self.llm_chat(messages, temperature=0.3, max_tokens=500)
+                summary_data = self._parse_summary_json(self._response_text(response))
+            
+            response_cache.set("summary", cache_text, summary_data)
+            return summary_data
+            
+        except Exception as e:
+            logger.error("LLM summary extraction failed: %s", e)
+            return self._fallback_extraction(transcript)
+    
+    def _draft_with_small_model(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Draft the summary JSON with the small local model.
+        
+        Returns:
+            Parsed draft, or None if no draft model is configured or it failed
+        """
+        if not self.draft_chat:
+            return None
+        
         try:
             messages = [
-                {"role": "system", "content": "You are a conversation analysis expert. Extract structured information from conversations."},
+                {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ]
-            
-            response = self.llm_chat(messages, temperature=0.3, max_tokens=500)
-            
-            # Parse JSON response
-            response_text = response.get("content", "{}")
-            # Remove markdown code blocks if present
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text).strip()
-            
-            data = json.loads(response_text)
-            
-            # Validate and set defaults
-            return {
-                "summary": data.get("summary", "Call summary unavailable"),
-                "key_topics": data.get("key_topics", []),
-                "key_variables": data.get("key_variables", {}),
-                "sentiment": data.get("sentiment", "neutral"),
-                "resolution_status": data.get("resolution_status", "unknown")
-            }
+            response = self.draft_chat(messages, temperature=0.2, max_tokens=500)
+            return self._parse_summary_json(self._response_text(response))
             
         except Exception as e:
-            logger.error(f"LLM summary extraction failed: {e}")
-            return self._fallback_extraction(transcript)
+            logger.warning("⚠️ Draft summary failed, using main LLM only: %s", e)
+            return None
+    
+    def _verify_draft(self, prompt: str, draft: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ask the main LLM to accept the draft or return a corrected version.
+        
+        Accepting costs a single output token, so well-drafted summaries cut
+        the main model's decode time to almost nothing.
+        """
+        verify_prompt = f"""{prompt}
+
+Here is a draft answer:
+{json.dumps(draft)}"""
+        
+        messages = [
+            {"role": "system", "content": VERIFY_SYSTEM_PROMPT},
+            {"role": "user", "content": verify_prompt}
+        ]
+        
+        response_text = self._response_text(self.llm_chat(messages, temperature=0.0, max_tokens=500)).strip()
+        
+        if response_text.upper().startswith("ACCEPT"):
+            draft_stats["accepted"] += 1
+            result = draft
+        else:
+            draft_stats["rejected"] += 1
+            result = self._parse_summary_json(response_text)
+        
+        total = draft_stats["accepted"] + draft_stats["rejected"]
+        logger.info("📝 Draft summary %s (acceptance %d/%d)", 'accepted' if result is draft else 'corrected', draft_stats['accepted'], total)
+        return result
+    
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        """Get the text from an LLM response ((content, usage) tuple or dict)."""
+        if isinstance(response, tuple):
+            return response[0] or "{}"
+        return response.get("content", "{}")
+    
+    @staticmethod
+    def _parse_summary_json(response_text: str) -> Dict[str, Any]:
+        """Parse summary JSON from LLM output and apply defaults."""
+        return CallSummarizer.validate_summary(parse_llm_json(response_text))
+    
+    @staticmethod
+    def validate_summary(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply defaults to parsed summary fields."""
+        return {
+            "summary": data.get("summary", "Call summary unavailable"),
+            "key_topics": data.get("key_topics", []),
+            "key_variables": data.get("key_variables", {}),
+            "sentiment": data.get("sentiment", "neutral"),
+            "resolution_status": data.get("resolution_status", "unknown")
+        }
     
     def _fallback_extraction(self, transcript: str) -> Dict[str, Any]:
         """Simple rule-based extraction when LLM fails."""
@@ -136,13 +440,10 @@ Respond ONLY with valid JSON, no other text:"""
         
         # Detect sentiment from keywords
         sentiment = "neutral"
-        frustrated_words = ["frustrated", "angry", "upset", "annoyed", "problem", "issue", "broken"]
-        satisfied_words = ["thank", "great", "perfect", "resolved", "fixed", "appreciate"]
-        
         lower_transcript = transcript.lower()
-        if any(word in lower_transcript for word in frustrated_words):
+        if any(word in lower_transcript for word in _FRUSTRATED_WORDS):
             sentiment = "frustrated"
-        elif any(word in lower_transcript for word in satisfied_words):
+        elif any(word in lower_transcript for word in _SATISFIED_WORDS):
             sentiment = "satisfied"
         
         return {
@@ -155,18 +456,22 @@ Respond ONLY with valid JSON, no other text:"""
     
     def _estimate_duration(self, conversation_history: List[Tuple[str, str]]) -> int:
         """Estimate call duration based on message count and length."""
-        total_chars = sum(len(content) for _, content in conversation_history)
-        # Rough estimate: 150 words per minute, 5 chars per word
-        words = total_chars / 5
-        minutes = words / 150
-        return int(minutes * 60)
+        total_chars = sum(map(len, map(itemgetter(1), conversation_history)))
+        # Rough estimate: 150 words per minute, 5 chars per word (750 chars per minute)
+        return total_chars * 60 // 750
     
-    def _create_fallback_summary(self, conversation_history: List[Tuple[str, str]], user_id: str, call_id: str) -> Dict[str, Any]:
+    def _create_fallback_summary(
+        self,
+        conversation_history: List[Tuple[str, str]],
+        user_id: str,
+        call_id: str,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """Create basic summary when extraction fails."""
         return {
             "call_id": call_id,
             "user_id": user_id,
-            "call_date": datetime.now(),
+            "call_date": now or datetime.now(),
             "summary": f"Call with {len(conversation_history)} messages",
             "key_topics": [],
             "key_variables": {},
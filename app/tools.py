@@ -1,7 +1,10 @@
 import json
 import logging
-from typing import Dict, Any, List, Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, FrozenSet, List, NamedTuple, Optional, Tuple
 from datetime import datetime
+from hashlib import blake2b
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -107,13 +110,90 @@ TOOL_SCHEMAS = {
     }
 }
 
+def _stable_id(*parts: str) -> int:
+    """Deterministic 0-99999 ID from string parts (hash() is salted per process)."""
+    digest = blake2b("\x00".join(parts).encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % 100000
+
+# JSON Schema type -> Python type for parameter checks
+_SCHEMA_TYPES = {"string": str, "integer": int}
+
+class ToolSpec(NamedTuple):
+    """Validation data pre-extracted from a tool's parameter schema."""
+    required: Tuple[str, ...]  # schema order, for error messages
+    required_set: FrozenSet[str]
+    # param -> (Python type or None, error message for a type mismatch)
+    type_map: Dict[str, Tuple[Optional[type], str]]
+
+def _build_tool_spec(parameters_schema: Dict[str, Any]) -> ToolSpec:
+    required = tuple(parameters_schema.get("required", []))
+    type_map = {
+        param: (_SCHEMA_TYPES.get(spec.get("type")), f"Parameter {param} must be {'an integer' if spec.get('type') == 'integer' else 'a string'}")
+        for param, spec in parameters_schema.get("properties", {}).items()
+    }
+    return ToolSpec(required=required, required_set=frozenset(required), type_map=type_map)
+
+_TOOL_SPECS = {name: _build_tool_spec(schema["parameters"]) for name, schema in TOOL_SCHEMAS.items()}
+
+def _compile_validator(spec: ToolSpec) -> Callable[[Dict[str, Any]], Tuple[bool, str]]:
+    """
+    Precompute the checks for one tool's parameter schema.
+    
+    Args:
+        spec: The tool's pre-extracted ToolSpec
+        
+    Returns:
+        Function mapping a parameters dict to (is_valid, error_message)
+    """
+    required_set = spec.required_set
+    expected = spec.type_map
+    
+    def validate(parameters: Dict[str, Any]) -> Tuple[bool, str]:
+        # Check required parameters (one subset test; the loop only runs to name the first missing one)
+        if not parameters.keys() >= required_set:
+            for param in spec.required:
+                if param not in parameters:
+                    return False, f"Missing required parameter: {param}"
+        
+        # Unknown parameters and basic type validation, in parameter order
+        for param, value in parameters.items():
+            check = expected.get(param)
+            if check is None:
+                return False, f"Unknown parameter: {param}"
+            expected_type, type_error = check
+            if expected_type is not None and not isinstance(value, expected_type):
+                return False, type_error
+        
+        return True, ""
+    
+    return validate
+
 class ToolDispatcher:
     """
     Tool calling dispatcher with validation and execution.
     """
     
+    __slots__ = ("tools", "_validators", "_handlers", "_available_tools")
+    
     def __init__(self):
         self.tools = TOOL_SCHEMAS
+        # One precompiled validator per tool, reused for every call
+        self._validators = {name: _compile_validator(_TOOL_SPECS[name]) for name in self.tools}
+        self._handlers = {
+            "book_meeting": self._book_meeting,
+            "send_message": self._send_message,
+            "search_knowledge": self._search_knowledge,
+            "text_to_speech": self._text_to_speech
+        }
+        # The schemas never change after import, so the advertised list is built once
+        self._available_tools = [
+            {
+                "name": name,
+                "description": schema["description"],
+                "parameters": schema["parameters"]
+            }
+            for name, schema in self.tools.items()
+        ]
         
     def validate_tool_call(self, tool_name: str, parameters: Dict[str, Any]) -> tuple[bool, str]:
         """
@@ -126,30 +206,11 @@ class ToolDispatcher:
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if tool_name not in self.tools:
+        validator = self._validators.get(tool_name)
+        if validator is None:
             return False, f"Unknown tool: {tool_name}"
         
-        schema = self.tools[tool_name]
-        required_params = schema["parameters"].get("required", [])
-        properties = schema["parameters"].get("properties", {})
-        
-        # Check required parameters
-        for param in required_params:
-            if param not in parameters:
-                return False, f"Missing required parameter: {param}"
-        
-        # Basic type validation
-        for param, value in parameters.items():
-            if param not in properties:
-                return False, f"Unknown parameter: {param}"
-            
-            expected_type = properties[param].get("type")
-            if expected_type == "string" and not isinstance(value, str):
-                return False, f"Parameter {param} must be a string"
-            elif expected_type == "integer" and not isinstance(value, int):
-                return False, f"Parameter {param} must be an integer"
-        
-        return True, ""
+        return validator(parameters)
     
     def dispatch(self, tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -171,23 +232,16 @@ class ToolDispatcher:
                 "error": error_msg
             }
         
+        handler = self._handlers.get(tool_name)
+        if handler is None:
+            return {
+                "success": False,
+                "result": None,
+                "error": f"Tool {tool_name} not implemented"
+            }
+        
         try:
-            # Dispatch to appropriate handler
-            if tool_name == "book_meeting":
-                return self._book_meeting(parameters)
-            elif tool_name == "send_message":
-                return self._send_message(parameters)
-            elif tool_name == "search_knowledge":
-                return self._search_knowledge(parameters)
-            elif tool_name == "text_to_speech":
-                return self._text_to_speech(parameters)
-            else:
-                return {
-                    "success": False,
-                    "result": None,
-                    "error": f"Tool {tool_name} not implemented"
-                }
-                
+            return handler(parameters)
         except Exception as e:
             logger.error(f"Tool execution error for {tool_name}: {e}")
             return {
@@ -215,9 +269,9 @@ class ToolDispatcher:
         duration = params.get("duration", "1 hour")
         
         # Simulate booking creation
-        booking_id = f"meeting_{hash(f'{title}{when}{with_whom}') % 100000}"
+        booking_id = f"meeting_{_stable_id(title, when, with_whom)}"
         
-        result = f"✅ Meeting '{title}' scheduled for {when} with {with_whom} (Duration: {duration}). Booking ID: {booking_id}"
+        result = f"[OK] Meeting '{title}' scheduled for {when} with {with_whom} (Duration: {duration}). Booking ID: {booking_id}"
         
         logger.info(f"Meeting booked: {title} at {when}")
         
@@ -245,9 +299,9 @@ class ToolDispatcher:
         service = params.get("service", "sms")
         
         # Simulate message sending
-        message_id = f"msg_{hash(f'{to}{message}') % 100000}"
+        message_id = f"msg_{_stable_id(to, message)}"
         
-        result = f"📱 {service.upper()} sent to {to}: '{message[:50]}...' (Message ID: {message_id})"
+        result = f"[MSG] {service.upper()} sent to {to}: '{message[:50]}...' (Message ID: {message_id})"
         
         logger.info(f"Message sent via {service} to {to}")
         
@@ -282,7 +336,8 @@ class ToolDispatcher:
         ]
         
         results = mock_results[:limit]
-        result_text = f"🔍 Found {len(results)} knowledge items for '{query}':\n" + "\n".join(f"• {item}" for item in results)
+        bullets = "• " + "\n• ".join(results) if results else ""
+        result_text = f"[SEARCH] Found {len(results)} knowledge items for '{query}':\n{bullets}"
         
         logger.info(f"Knowledge search: '{query}' in {category} - {len(results)} results")
         
@@ -310,10 +365,10 @@ class ToolDispatcher:
         format_type = params.get("format", "mp3")
         
         # Simulate TTS generation
-        audio_id = f"audio_{hash(text) % 100000}"
+        audio_id = f"audio_{_stable_id(text)}"
         audio_url = f"https://example.com/audio/{audio_id}.{format_type}"
         
-        result = f"🔊 Generated speech for text ({len(text)} chars) using {voice} voice. Audio: {audio_url}"
+        result = f"[TTS] Generated speech for text ({len(text)} chars) using {voice} voice. Audio: {audio_url}"
         
         logger.info(f"TTS generated: {len(text)} chars with {voice} voice")
         
@@ -330,20 +385,20 @@ class ToolDispatcher:
         Get list of available tools with their schemas.
         
         Returns:
-            List of tool definitions
+            List of tool definitions (shared; callers must not mutate it)
         """
-        return [
-            {
-                "name": name,
-                "description": schema["description"],
-                "parameters": schema["parameters"]
-            }
-            for name, schema in self.tools.items()
-        ]
+        return self._available_tools
 
 # Global tool dispatcher instance
 tool_dispatcher = ToolDispatcher()
 
+# Tool handlers will call external APIs (Cal.com, Twilio, ElevenLabs), so a
+# response with several tool calls runs them concurrently
+_tool_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool-calls")
+
+# Tool call patterns like: TOOL:tool_name(param1=value1, param2=value2)
+_TOOL_CALL_RE = re.compile(r'TOOL:(\w+)\((.*?)\)', re.DOTALL)
+
 def parse_tool_calls(assistant_response: str) -> List[Dict[str, Any]]:
     """
     Parse tool calls from assistant response.
@@ -359,12 +414,7 @@ def parse_tool_calls(assistant_response: str) -> List[Dict[str, Any]]:
     """
     tool_calls = []
     
-    # Look for tool call patterns like: TOOL:tool_name(param1=value1, param2=value2)
-    import re
-    
-    # Pattern to match tool calls
-    pattern = r'TOOL:(\w+)\((.*?)\)'
-    matches = re.findall(pattern, assistant_response, re.DOTALL)
+    matches = _TOOL_CALL_RE.findall(assistant_response)
     
     for tool_name, params_str in matches:
         try:
@@ -398,22 +448,23 @@ def execute_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]
     Returns:
         List of execution results
     """
-    results = []
+    if len(tool_calls) == 1:
+        return [_execute_tool_call(tool_calls[0])]
     
-    for tool_call in tool_calls:
-        try:
-            result = tool_dispatcher.dispatch(
-                tool_call["name"],
-                tool_call["parameters"]
-            )
-            results.append(result)
-            
-        except Exception as e:
-            logger.error(f"Tool execution failed: {e}")
-            results.append({
-                "success": False,
-                "result": None,
-                "error": f"Execution failed: {str(e)}"
-            })
-    
-    return results
+    return list(_tool_pool.map(_execute_tool_call, tool_calls))
+
+def _execute_tool_call(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute one tool call, turning failures into an error result."""
+    try:
+        return tool_dispatcher.dispatch(
+            tool_call["name"],
+            tool_call["parameters"]
+        )
+        
+    except Exception as e:
+        logger.error(f"Tool execution failed: {e}")
+        return {
+            "success": False,
+            "result": None,
+            "error": f"Execution failed: {str(e)}"
+        }
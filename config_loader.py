@@ -4,31 +4,78 @@ Reads from both config.json (GitHub-synced) and environment variables (secure)
 """
 import json
 import os
+import re
+import time
 import logging
-from typing import Dict, Any, Optional
+import functools
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Sensitive key patterns for security masking, matched case-insensitively anywhere in a key
+SENSITIVE_KEY_PATTERNS = ('api_key', 'token', 'secret', 'password', 'auth', 'sid', 'database_url', 'db_', 'connection', 'dsn')
+_SENSITIVE_RE = re.compile('|'.join(map(re.escape, SENSITIVE_KEY_PATTERNS)))
+
+_MISSING = object()
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so either parser's errors are handled alike
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 class ConfigLoader:
-    def __init__(self, config_file: str = "config.json", internal_config_file: str = "config-internal.json"):
+    __slots__ = (
+        "config_file", "internal_config_file",
+        "_config_cache", "_internal_config_cache",
+        "_last_modified", "_internal_last_modified",
+        "_stat_ttl", "_last_stat_check", "_internal_last_stat_check",
+        "_env_snapshot", "_env_snapshot_at"
+    )
+    
+    def __init__(self, config_file: str = "config.json", internal_config_file: str = "config-internal.json", stat_ttl: float = 1.0):
         self.config_file = config_file
         self.internal_config_file = internal_config_file
         self._config_cache = None
         self._internal_config_cache = None
         self._last_modified = 0
         self._internal_last_modified = 0
+        # Hot reload checks each file's mtime at most once per stat_ttl seconds
+        self._stat_ttl = stat_ttl
+        self._last_stat_check = float("-inf")
+        self._internal_last_stat_check = float("-inf")
+        # Copy of os.environ, refreshed on the same TTL (or when variables are added/removed)
+        self._env_snapshot: Dict[str, str] = {}
+        self._env_snapshot_at = float("-inf")
         
+    def _env(self) -> Dict[str, str]:
+        """Environment snapshot; plain dict probes are much cheaper than os.environ lookups"""
+        now = time.monotonic()
+        if now - self._env_snapshot_at >= self._stat_ttl or len(self._env_snapshot) != len(os.environ):
+            self._env_snapshot = dict(os.environ)
+            self._env_snapshot_at = now
+        return self._env_snapshot
+    
     def _load_config_file(self) -> Dict[str, Any]:
         """Load configuration from JSON file with hot reload support"""
+        now = time.monotonic()
+        if now - self._last_stat_check < self._stat_ttl:
+            return self._config_cache or {}
+        self._last_stat_check = now
+        
         try:
-            # Check if file was modified for hot reload
-            if os.path.exists(self.config_file):
-                modified_time = os.path.getmtime(self.config_file)
-                if modified_time > self._last_modified:
-                    with open(self.config_file, 'r') as f:
-                        self._config_cache = json.load(f)
-                        self._last_modified = modified_time
-                        logger.info(f"✅ Configuration reloaded from {self.config_file}")
+            # Check if file was modified for hot reload (one stat call)
+            try:
+                modified_time = os.stat(self.config_file).st_mtime
+            except FileNotFoundError:
+                return self._config_cache or {}
+            if modified_time > self._last_modified:
+                self._config_cache = _json_loads(Path(self.config_file).read_bytes())
+                self._last_modified = modified_time
+                logger.info(f"✅ Configuration reloaded from {self.config_file}")
                         
             return self._config_cache or {}
         except (FileNotFoundError, json.JSONDecodeError) as e:
@@ -37,15 +84,21 @@ class ConfigLoader:
             
     def _load_internal_config_file(self) -> Dict[str, Any]:
         """Load internal configuration from JSON file with hot reload support"""
+        now = time.monotonic()
+        if now - self._internal_last_stat_check < self._stat_ttl:
+            return self._internal_config_cache or {}
+        self._internal_last_stat_check = now
+        
         try:
-            # Check if file was modified for hot reload
-            if os.path.exists(self.internal_config_file):
-                modified_time = os.path.getmtime(self.internal_config_file)
-                if modified_time > self._internal_last_modified:
-                    with open(self.internal_config_file, 'r') as f:
-                        self._internal_config_cache = json.load(f)
-                        self._internal_last_modified = modified_time
-                        logger.info(f"✅ Internal configuration reloaded from {self.internal_config_file}")
+            # Check if file was modified for hot reload (one stat call)
+            try:
+                modified_time = os.stat(self.internal_config_file).st_mtime
+            except FileNotFoundError:
+                return self._internal_config_cache or {}
+            if modified_time > self._internal_last_modified:
+                self._internal_config_cache = _json_loads(Path(self.internal_config_file).read_bytes())
+                self._internal_last_modified = modified_time
+                logger.info(f"✅ Internal configuration reloaded from {self.internal_config_file}")
                         
             return self._internal_config_cache or {}
         except (FileNotFoundError, json.JSONDecodeError) as e:
@@ -61,45 +114,63 @@ class ConfigLoader:
         4. Default value
         """
         # Priority 1: Environment variable (secrets)
-        env_value = os.environ.get(key.upper())
+        env = self._env()
+        env_value = env.get(key.upper())
         if env_value is not None:
             return env_value
             
         # Check fallback environment variable name if provided
         if fallback_env:
-            fallback_value = os.environ.get(fallback_env)
+            fallback_value = env.get(fallback_env)
             if fallback_value is not None:
                 return fallback_value
         
         # Priority 2: config.json file (settings)
+        lower_key = key.lower()
         config = self._load_config_file()
-        if key.lower() in config:
-            return config[key.lower()]
+        if lower_key in config:
+            return config[lower_key]
             
         # Priority 3: config-internal.json file (internal settings)
         internal_config = self._load_internal_config_file()
-        if key.lower() in internal_config:
-            return internal_config[key.lower()]
+        if lower_key in internal_config:
+            return internal_config[lower_key]
             
         # Priority 4: Default value
         return default
     
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several keys with the same priority as get(), loading each config file once.
+        
+        Args:
+            keys: Keys to look up
+            
+        Returns:
+            Key -> value for the keys found in any source; callers apply their own defaults
+        """
+        config = self._load_config_file()
+        internal_config = self._load_internal_config_file()
+        
+        env = self._env()
+        values = {}
+        for key in keys:
+            value = env.get(key.upper(), _MISSING)
+            if value is _MISSING:
+                lower_key = key.lower()
+                value = config[lower_key] if lower_key in config else internal_config.get(lower_key, _MISSING)
+            if value is not _MISSING:
+                values[key] = value
+        return values
+    
     def get_all_config(self) -> Dict[str, Any]:
         """Get complete configuration for debugging/admin interface with proper security masking"""
         config = self._load_config_file()
         internal_config = self._load_internal_config_file()
         
-        # Sensitive key patterns for security masking
-        sensitive_keys = ['api_key', 'token', 'secret', 'password', 'auth', 'sid', 'database_url', 'db_', 'connection', 'dsn']
-        
-        def is_sensitive_key(key: str) -> bool:
-            """Check if a key contains sensitive information"""
-            lower_key = key.lower()
-            return any(sensitive in lower_key for sensitive in sensitive_keys)
-            
-        def mask_if_sensitive(key: str, value: Any) -> Any:
-            """Mask value if key is sensitive"""
-            if is_sensitive_key(key):
+        def mask_if_sensitive(lower_key: str, value: Any) -> Any:
+            """Mask value if the (lowercased) key is sensitive"""
+            if _SENSITIVE_RE.search(lower_key):
                 return "***MASKED***"
             return value
         
@@ -107,15 +178,16 @@ class ConfigLoader:
         
         # Add config.json values with masking
         for key, value in config.items():
-            result[f"config.{key}"] = mask_if_sensitive(key, value)
+            result[f"config.{key}"] = mask_if_sensitive(key.lower(), value)
             
         # Add config-internal.json values with masking
         for key, value in internal_config.items():
-            result[f"internal.{key}"] = mask_if_sensitive(key, value)
+            result[f"internal.{key}"] = mask_if_sensitive(key.lower(), value)
             
         # Add all environment variables with masking
-        for env_key in os.environ:
-            result[f"env.{env_key.lower()}"] = mask_if_sensitive(env_key, os.environ[env_key])
+        for env_key, env_value in os.environ.items():
+            lower_key = env_key.lower()
+            result[f"env.{lower_key}"] = mask_if_sensitive(lower_key, env_value)
                 
         return result
     
@@ -123,6 +195,10 @@ class ConfigLoader:
         """Force reload configuration from both files"""
         self._last_modified = 0
         self._internal_last_modified = 0
+        self._last_stat_check = float("-inf")
+        self._internal_last_stat_check = float("-inf")
+        self._env_snapshot_at = float("-inf")
+        _resolve_admin_pointer.cache_clear()
         config = self._load_config_file()
         internal_config = self._load_internal_config_file()
         return {"config": config, "internal": internal_config}
@@ -135,40 +211,63 @@ def get_secret(key: str, default: Optional[str] = None) -> Optional[str]:
     """Get secret from environment variables with fallback"""
     return config.get(key, default)
 
+# admin: pointer values are cached for up to this many seconds; config.reload() clears them
+ADMIN_SETTING_TTL_SECONDS = 30
+
+_admin_memory_store = None
+
+def _get_admin_memory_store():
+    """Shared HTTPMemoryStore for admin pointer lookups, created on first use."""
+    global _admin_memory_store
+    if _admin_memory_store is None:
+        # ✅ Use HTTPMemoryStore instead of direct requests to avoid localhost hardcoding
+        from app.http_memory import HTTPMemoryStore
+        _admin_memory_store = HTTPMemoryStore()
+    return _admin_memory_store
+
+@functools.lru_cache(maxsize=128)
+def _resolve_admin_pointer(admin_key: str, ttl_bucket: int) -> Any:
+    """
+    Fetch an admin setting from AI-Memory.
+    
+    ttl_bucket only partitions the cache by time window so values refresh;
+    lookup failures raise and are therefore not cached.
+    
+    Returns:
+        The stored value, or _MISSING if no setting matches admin_key
+    """
+    # Search for admin setting by key using the proper memory store
+    results = _get_admin_memory_store().search(
+        query_text=f"admin_setting {admin_key}",
+        user_id="admin",
+        k=5,
+        memory_types=["admin_setting"],
+        include_shared=True
+    )
+    
+    # Look for exact key match in results
+    for result in results:
+        if result.get("key") == admin_key or result.get("k") == admin_key:
+            # Extract value from the stored admin setting
+            stored_value = result.get("value_json", {})
+            if isinstance(stored_value, dict):
+                return stored_value.get("value", _MISSING)
+            return stored_value
+    return _MISSING
+
 def get_setting(key: str, default: Any = None) -> Any:
     """Get setting from config.json, with support for admin: pointers resolved via AI-Memory"""
-    import logging
-
     value = config.get(key, default)
 
-    # If this is an admin pointer, fetch the live value from AI-Memory using HTTPMemoryStore
-    if isinstance(value, str) and value.startswith("admin:"):
-        admin_key = value.split(":", 1)[1]
+    # If this is an admin pointer, fetch the live value from AI-Memory
+    if type(value) is str and value[:6] == "admin:":
+        admin_key = value[6:]
         try:
-            # ✅ Use HTTPMemoryStore instead of direct requests to avoid localhost hardcoding
-            from app.http_memory import HTTPMemoryStore
-            memory_store = HTTPMemoryStore()
-            
-            # Search for admin setting by key using the proper memory store
-            results = memory_store.search(
-                query_text=f"admin_setting {admin_key}",
-                user_id="admin",
-                k=5,
-                memory_types=["admin_setting"],
-                include_shared=True
-            )
-            
-            # Look for exact key match in results
-            for result in results:
-                if result.get("key") == admin_key or result.get("k") == admin_key:
-                    # Extract value from the stored admin setting
-                    stored_value = result.get("value_json", {})
-                    if isinstance(stored_value, dict):
-                        return stored_value.get("value", default)
-                    return stored_value
-
+            stored_value = _resolve_admin_pointer(admin_key, int(time.monotonic() // ADMIN_SETTING_TTL_SECONDS))
+            if stored_value is not _MISSING:
+                return stored_value
         except Exception as e:
-            logging.warning(f"⚠️ Could not fetch {admin_key} from AI-Memory: {e}")
+            logger.warning(f"⚠️ Could not fetch {admin_key} from AI-Memory: {e}")
         return default
 
     return value
@@ -179,18 +278,21 @@ def get_database_url() -> str:
 
 def get_llm_config() -> Dict[str, str]:
     """Get LLM configuration"""
+    # Env lookups are upper-case and file lookups lower-case, so LLM_MODEL also covers llm_model
+    values = config.get_many(("LLM_BASE_URL", "LLM_MODEL", "OPENAI_API_KEY", "LLM_API_KEY"))
     return {
-        "base_url": config.get("LLM_BASE_URL", default=config.get("llm_base_url", "https://api.openai.com/v1")),
-        "model": config.get("LLM_MODEL", default=config.get("llm_model", "gpt-4o-mini")),
-        "api_key": config.get("OPENAI_API_KEY", default=config.get("LLM_API_KEY", default=config.get("llm_api_key", "")))
+        "base_url": values.get("LLM_BASE_URL", "https://api.openai.com/v1"),
+        "model": values.get("LLM_MODEL", "gpt-4o-mini"),
+        "api_key": values.get("OPENAI_API_KEY", values.get("LLM_API_KEY", ""))
     }
 
 def get_twilio_config() -> Dict[str, str]:
     """Get Twilio configuration"""
+    values = config.get_many(("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER"))
     return {
-        "account_sid": config.get("TWILIO_ACCOUNT_SID", default=""),
-        "auth_token": config.get("TWILIO_AUTH_TOKEN", default=""),
-        "phone_number": config.get("TWILIO_PHONE_NUMBER", default=config.get("twilio_phone_number", "+19497071290"))
+        "account_sid": values.get("TWILIO_ACCOUNT_SID", ""),
+        "auth_token": values.get("TWILIO_AUTH_TOKEN", ""),
+        "phone_number": values.get("TWILIO_PHONE_NUMBER", "+19497071290")
     }
 
 def get_elevenlabs_config() -> Dict[str, str]:
@@ -26,20 +26,13 @@ async def test_memory_system():
         memory = MemoryStore()
         print("✅ Memory store connected")
         
-        # Test writing memories
-        memory_id = memory.write(
-            "preference", 
-            "user_style", 
-            {"summary": "User prefers concise responses", "style": "direct"}
-        )
-        print(f"✅ Stored preference memory: {memory_id}")
-        
-        memory_id = memory.write(
-            "person", 
-            "user_info", 
-            {"name": "Test User", "role": "Developer"}
-        )
-        print(f"✅ Stored person memory: {memory_id}")
+        # Test writing memories (both in one embedding batch and one INSERT)
+        preference_id, person_id = memory.write_many([
+            {"type": "preference", "key": "user_style", "value": {"summary": "User prefers concise responses", "style": "direct"}},
+            {"type": "person", "key": "user_info", "value": {"name": "Test User", "role": "Developer"}}
+        ])
+        print(f"✅ Stored preference memory: {preference_id}")
+        print(f"✅ Stored person memory: {person_id}")
         
         # Test searching memories
         results = memory.search("user preferences style", k=5)
@@ -97,12 +90,15 @@ async def test_packer_system():
         # Initialize memory store
         memory = MemoryStore()
         
-        # Store some test memories
-        memory.write("rule", "test_rule", {"summary": "Always be helpful"})
-        memory.write("preference", "user_pref", {"summary": "Likes technical details"})
+        # Store some test memories (one embedding batch, one INSERT)
+        memory.write_many([
+            {"type": "rule", "key": "test_rule", "value": {"summary": "Always be helpful"}},
+            {"type": "preference", "key": "user_pref", "value": {"summary": "Likes technical details"}}
+        ])
         
-        # Search for memories
-        memories = memory.search("helpful technical", k=3)
+        # Search for memories; several queries share one embedding batch and one query
+        memories, technical_memories = memory.search_many(["helpful technical", "technical details"], k=3)
+        print(f"✅ Batched search returned {len(memories)} and {len(technical_memories)} results")
         
         # Test message packing
         messages = [
@@ -196,13 +192,11 @@ async def test_full_chat_flow():
         
         user_message = request.messages[-1].content
         
-        # Process carry-kit items
+        # Process carry-kit items: collect them all, then store in one batch
         if should_remember(user_message):
             carry_kit_items = extract_carry_kit_items(user_message)
+            memory_store.write_many(carry_kit_items)
             for item in carry_kit_items:
-                memory_id = memory_store.write(
-                    item["type"], item["key"], item["value"], item.get("ttl_days", 365)
-                )
                 print(f"✅ Stored carry-kit item: {item['type']}:{item['key']}")
         
         # Retrieve memories
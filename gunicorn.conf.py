@@ -1,6 +1,7 @@
 # Gunicorn configuration file for FastAPI/ASGI applications
 # This ensures gunicorn uses the proper ASGI worker
 
+import os
 import multiprocessing
 
 # Server socket
@@ -8,16 +9,25 @@ bind = "0.0.0.0:5000"
 backlog = 2048
 
 # Worker processes
-workers = 1  # Single worker for development
-worker_class = "uvicorn.workers.UvicornWorker"  # ASGI worker for FastAPI
+# Conversation history (THREAD_HISTORY) and the memory caches live in-process, so
+# the default stays at one worker. Once that state is shared (e.g. Redis), set
+# WEB_CONCURRENCY, typically to multiprocessing.cpu_count()
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+# ASGI worker for FastAPI; its "auto" loop/http settings pick uvloop and
+# httptools whenever they are installed (pip install "uvicorn[standard]")
+worker_class = "uvicorn.workers.UvicornWorker"
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
-# Restart workers when code changes (for development)
-reload = True
+# Restart workers when code changes (single-worker development only)
+reload = workers == 1
 reload_engine = 'auto'
 
+# With several workers, import the app once in the master and fork it. Database
+# connections are opened in the app's lifespan handler, so none are inherited
+preload_app = workers > 1
+
 # Logging
 accesslog = '-'
 errorlog = '-'
@@ -8,25 +8,40 @@ import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
 # Import centralized configuration
-from config_loader import get_database_url
+from config_loader import get_database_url, get_setting
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def init_database():
-    """Initialize PostgreSQL database with required extensions and tables."""
-    
+def connect_database():
+    """Open an autocommit connection to DATABASE_URL, or return None if it is not configured."""
     db_url = get_database_url()
     if not db_url:
         logger.error("DATABASE_URL environment variable is required")
-        return False
+        return None
+    
+    logger.info("Connecting to PostgreSQL database...")
+    conn = psycopg2.connect(db_url)
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    return conn
+
+def init_database(conn=None):
+    """
+    Initialize PostgreSQL database with required extensions and tables.
+    
+    Args:
+        conn: Open autocommit connection to reuse; a new one is opened (and
+            closed again) when omitted
+    """
+    own_conn = conn is None
     
     try:
         # Connect to database
-        logger.info("Connecting to PostgreSQL database...")
-        conn = psycopg2.connect(db_url)
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        if own_conn:
+            conn = connect_database()
+            if conn is None:
+                return False
         
         with conn.cursor() as cur:
             # Create vector extension
@@ -61,15 +76,33 @@ def init_database():
             cur.execute("CREATE INDEX IF NOT EXISTS idx_memories_k ON memories (k);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_memories_type ON memories (type);")
             cur.execute("CREATE INDEX IF NOT EXISTS idx_memories_created_at ON memories (created_at);")
-            
-            # Create vector index (using ivfflat for efficient similarity search)
-            logger.info("Creating vector similarity index...")
+            # Oldest-first scan of conversation memories for scripts/backfill_memories.py
             cur.execute("""
-                CREATE INDEX IF NOT EXISTS idx_memories_embedding 
-                ON memories USING ivfflat (embedding vector_l2_ops)
-                WITH (lists = 100);
+                CREATE INDEX IF NOT EXISTS idx_memories_conversation_created_at 
+                ON memories (created_at, id) 
+                WHERE type IN ('moment', 'thread_history');
             """)
             
+            # Create vector index (HNSW: no training step, so it is accurate on an
+            # empty or growing table, unlike ivfflat lists built from early rows).
+            # The table keeps full-precision embeddings; the index holds halfvec
+            # copies at half the size and must match MemoryStore.search's
+            # expression, so it follows the same halfvec_search setting
+            logger.info("Creating vector similarity index...")
+            if str(get_setting("halfvec_search", "false")).lower() in ("1", "true", "yes"):
+                embed_dim = int(get_setting("embed_dim", 768))
+                cur.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_memories_embedding 
+                    ON memories USING hnsw ((embedding::halfvec({embed_dim})) halfvec_l2_ops)
+                    WITH (m = 16, ef_construction = 64);
+                """)
+            else:
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_memories_embedding 
+                    ON memories USING hnsw (embedding vector_l2_ops)
+                    WITH (m = 16, ef_construction = 64);
+                """)
+            
             # Verify table structure
             logger.info("Verifying table structure...")
             cur.execute("""
@@ -88,7 +121,8 @@ def init_database():
             record_count = result[0] if result else 0
             logger.info(f"Current memories count: {record_count}")
             
-        conn.close()
+        if own_conn:
+            conn.close()
         logger.info("Database initialization completed successfully!")
         return True
         
@@ -99,16 +133,21 @@ def init_database():
         logger.error(f"Unexpected error: {e}")
         return False
 
-def verify_database():
-    """Verify database setup and connectivity."""
+def verify_database(conn=None):
+    """
+    Verify database setup and connectivity.
     
-    db_url = get_database_url()
-    if not db_url:
-        logger.error("DATABASE_URL environment variable is required")
-        return False
+    Args:
+        conn: Open connection to reuse; a new one is opened (and closed again)
+            when omitted
+    """
+    own_conn = conn is None
     
     try:
-        conn = psycopg2.connect(db_url)
+        if own_conn:
+            conn = connect_database()
+            if conn is None:
+                return False
         
         with conn.cursor() as cur:
             # Check for vector extension
@@ -132,7 +171,19 @@ def verify_database():
                 logger.error("Vector operations not working")
                 return False
             
-        conn.close()
+            # Check the embedding index is HNSW (databases created before the
+            # switch still carry the ivfflat index under the same name)
+            cur.execute("""
+                SELECT 1 FROM pg_indexes
+                WHERE tablename = 'memories'
+                AND indexname = 'idx_memories_embedding'
+                AND indexdef ILIKE '%using hnsw%';
+            """)
+            if not cur.fetchone():
+                logger.warning("idx_memories_embedding is not an HNSW index - drop it and rerun init_db.py to rebuild")
+            
+        if own_conn:
+            conn.close()
         logger.info("Database verification passed!")
         return True
         
@@ -144,16 +195,29 @@ if __name__ == "__main__":
     print("NeuroSphere Orchestrator - Database Initialization")
     print("=" * 50)
     
-    # Initialize database
-    if init_database():
-        print("✅ Database initialization successful!")
-        
-        # Verify setup
-        if verify_database():
-            print("✅ Database verification successful!")
-            print("\nDatabase is ready for NeuroSphere Orchestrator!")
-        else:
-            print("❌ Database verification failed!")
-    else:
+    # One connection serves both steps
+    try:
+        conn = connect_database()
+    except psycopg2.Error as e:
+        logger.error(f"Database error: {e}")
+        conn = None
+    if conn is None:
         print("❌ Database initialization failed!")
         exit(1)
+    
+    try:
+        # Initialize database
+        if init_database(conn):
+            print("✅ Database initialization successful!")
+            
+            # Verify setup
+            if verify_database(conn):
+                print("✅ Database verification successful!")
+                print("\nDatabase is ready for NeuroSphere Orchestrator!")
+            else:
+                print("❌ Database verification failed!")
+        else:
+            print("❌ Database initialization failed!")
+            exit(1)
+    finally:
+        conn.close()
@@ -2,68 +2,86 @@
 # Comprehensive memory normalization for ai-memory service
 import re
 import json
-import copy
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so either parser's errors are handled alike
+if orjson is not None:
+    _json_loads = orjson.loads
+    
+    def _json_text(value: Any) -> str:
+        return orjson.dumps(value).decode()
+else:
+    _json_loads = json.loads
+    _json_text = json.dumps
 
 # ============================================================================
 # COMPREHENSIVE MEMORY SCHEMA - Fill-in-the-blanks template
 # ============================================================================
 
-MEMORY_TEMPLATE = {
-    "identity": {
-        "caller_name": None,
-        "caller_phone": None,
-        "caller_email": None,
-        "caller_address": None,
-        "date_of_birth": None,
-        "notes": []
-    },
-    "contacts": {
-        "spouse": {
-            "name": None,
-            "nickname": None,
-            "relationship": "spouse",
-            "birthday": None,
-            "phone": None,
-            "email": None,
+def _fresh_template() -> Dict[str, Any]:
+    """Build a new, unshared copy of the memory template (cheaper than deepcopy)."""
+    return {
+        "identity": {
+            "caller_name": None,
+            "caller_phone": None,
+            "caller_email": None,
+            "caller_address": None,
+            "date_of_birth": None,
             "notes": []
         },
-        "father": {
-            "name": None,
-            "nickname": None,
-            "relationship": "father",
-            "birthday": None,
-            "phone": None,
-            "notes": []
+        "contacts": {
+            "spouse": {
+                "name": None,
+                "nickname": None,
+                "relationship": "spouse",
+                "birthday": None,
+                "phone": None,
+                "email": None,
+                "notes": []
+            },
+            "father": {
+                "name": None,
+                "nickname": None,
+                "relationship": "father",
+                "birthday": None,
+                "phone": None,
+                "notes": []
+            },
+            "mother": {
+                "name": None,
+                "nickname": None,
+                "relationship": "mother",
+                "birthday": None,
+                "phone": None,
+                "notes": []
+            },
+            "children": [],  # List of child dicts
+            "siblings": [],
+            "friends": [],
+            "business": []
         },
-        "mother": {
-            "name": None,
-            "nickname": None,
-            "relationship": "mother",
-            "birthday": None,
-            "phone": None,
+        "vehicles": [],  # List of vehicle dicts
+        "policies": [],  # List of policy dicts
+        "claims": [],    # List of claim dicts
+        "properties": [], # List of property dicts
+        "preferences": {
+            "communication_method": None,
+            "language": None,
+            "timezone": None,
+            "interests": [],
             "notes": []
         },
-        "children": [],  # List of child dicts
-        "siblings": [],
-        "friends": [],
-        "business": []
-    },
-    "vehicles": [],  # List of vehicle dicts
-    "policies": [],  # List of policy dicts
-    "claims": [],    # List of claim dicts
-    "properties": [], # List of property dicts
-    "preferences": {
-        "communication_method": None,
-        "language": None,
-        "timezone": None,
-        "interests": [],
-        "notes": []
-    },
-    "commitments": [],  # Promises, follow-ups, reminders
-    "facts": [],        # General important facts
-    "recent_conversations": []  # Last 5 conversation snippets
-}
+        "commitments": [],  # Promises, follow-ups, reminders
+        "facts": [],        # General important facts
+        "recent_conversations": []  # Last 5 conversation snippets
+    }
+
+MEMORY_TEMPLATE = _fresh_template()
 
 # ============================================================================
 # KEYWORD MAPS for Classification
@@ -91,6 +109,9 @@ POLICY_KEYWORDS = {
 
 VEHICLE_KEYWORDS = ["bmw", "toyota", "honda", "ford", "chevrolet", "car", "truck", "suv", "sedan"]
 
+# Contacts with a single slot in the template; other relationships are detected but not stored
+NAMED_RELATIONSHIPS = ("spouse", "father", "mother")
+
 # ============================================================================
 # REGEX PATTERNS for Extraction
 # ============================================================================
@@ -103,6 +124,53 @@ PATTERNS = {
     "single_name": re.compile(r"\b([A-Z][a-z]{2,})\b")
 }
 
+# Conversational lines that are not worth keeping as facts
+_CHATTER_RE = re.compile("|".join(map(re.escape, ["assistant:", "user:", "hey", "how's it going"])))
+
+# Single name after a keyword ("wife Kelly", "wife is Kelly"), one pattern per
+# keyword so the first keyword in list order wins as before
+_REL_NAME_PATTERNS = {
+    rel: tuple(
+        re.compile(rf"\b{re.escape(keyword)}(?:'?s?\s+name)?(?:\s+is)?\s+([A-Z][a-z]{{2,}})\b", re.IGNORECASE)
+        for keyword in RELATIONSHIP_KEYWORDS[rel]
+    )
+    for rel in NAMED_RELATIONSHIPS
+}
+
+def _keyword_hits(value_lower: str, relationships: Tuple[str, ...]) -> Tuple[List[str], Optional[str]]:
+    """
+    Find the relationships and the vehicle keyword mentioned in value_lower.
+    
+    Args:
+        value_lower: Lower-cased memory text
+        relationships: Relationships to look for, in order
+        
+    Returns:
+        (matching relationships in order, first VEHICLE_KEYWORDS entry present or None)
+    """
+    rels = []
+    for rel in relationships:
+        for kw in RELATIONSHIP_KEYWORDS[rel]:
+            if kw in value_lower:
+                rels.append(rel)
+                break
+    for kw in VEHICLE_KEYWORDS:
+        if kw in value_lower:
+            return rels, kw
+    return rels, None
+
+def _extract_contact_name(value: Any, value_str: str, rel: str, full_name_match) -> Any:
+    """Structured name, else a full name anywhere in the line, else a single name after a keyword."""
+    if isinstance(value, dict) and value.get("name"):
+        return value["name"]
+    if full_name_match:
+        return full_name_match.group(1)
+    for pattern in _REL_NAME_PATTERNS[rel]:
+        match = pattern.search(value_str)
+        if match:
+            return match.group(1).strip().title()
+    return None
+
 def normalize_memories(raw_memory_text: str) -> Dict[str, Any]:
     """
     Transform raw memory text into comprehensive structured schema.
@@ -113,31 +181,33 @@ def normalize_memories(raw_memory_text: str) -> Dict[str, Any]:
     Returns:
         Complete MEMORY_TEMPLATE dict with populated fields
     """
-    result = copy.deepcopy(MEMORY_TEMPLATE)
+    result = _fresh_template()
     
-    # Parse raw text into list of memory objects
-    memories = []
+    # Parse and process each line in one pass; no intermediate list of memory dicts
     for line in raw_memory_text.split('\n'):
         line = line.strip()
         if not line:
             continue
-        try:
-            mem = json.loads(line)
-            memories.append(mem)
-        except json.JSONDecodeError:
-            # Plain text memory - wrap it
-            memories.append({"value": line})
-    
-    # Track contacts found
-    seen_contacts = {}
-    
-    # Process each memory
-    for idx, mem in enumerate(memories):
-        value = mem.get("value", mem)  # Handle both {"value": ...} and direct values
-        mem_key = str(mem.get("key", "")).lower()
+        
+        # Only JSON objects are memory entries; skipping the parse for plain
+        # text avoids building a JSONDecodeError per line
+        mem = None
+        if line[0] == "{":
+            try:
+                mem = _json_loads(line)
+            except json.JSONDecodeError:
+                pass
+        
+        if mem is None:
+            # Plain text memory
+            value = line
+            mem_key = ""
+        else:
+            value = mem.get("value", mem)  # Handle both {"value": ...} and direct values
+            mem_key = str(mem.get("key", "")).lower()
         
         # Convert to string for text mining
-        value_str = json.dumps(value) if isinstance(value, dict) else str(value)
+        value_str = _json_text(value) if isinstance(value, dict) else str(value)
         value_lower = value_str.lower()
         
         # IDENTITY (Caller info)
@@ -145,61 +215,35 @@ def normalize_memories(raw_memory_text: str) -> Dict[str, Any]:
             if isinstance(value, dict) and value.get("phone_number"):
                 result["identity"]["caller_phone"] = value["phone_number"]
         
+        unnamed = tuple(rel for rel in NAMED_RELATIONSHIPS if not result["contacts"][rel].get("name"))
+        open_rels, veh_keyword = _keyword_hits(value_lower, unnamed)
+        
         # CONTACTS - Extract from both structured and unstructured data
-        for rel, keywords in RELATIONSHIP_KEYWORDS.items():
-            if any(kw in value_lower for kw in keywords):
-                name = None
-                
-                # Strategy 1: Structured data
-                if isinstance(value, dict) and value.get("name"):
-                    name = value["name"]
-                
-                # Strategy 2: Full name pattern
-                if not name:
-                    name_match = PATTERNS["names"].search(value_str)
-                    if name_match:
-                        name = name_match.group(1)
-                
-                # Strategy 3: Single name after keyword ("wife Kelly", "wife is Kelly")
-                if not name:
-                    for keyword in keywords:
-                        single_pattern = re.compile(
-                            rf"\b{re.escape(keyword)}(?:'?s?\s+name)?(?:\s+is)?\s+([A-Z][a-z]{{2,}})\b",
-                            re.IGNORECASE
-                        )
-                        match = single_pattern.search(value_str)
-                        if match:
-                            name = match.group(1).strip().title()
-                            break
-                
-                if name and rel in ["spouse", "father", "mother"]:
-                    if not result["contacts"][rel].get("name"):
-                        result["contacts"][rel]["name"] = name
-                        
-                        # Extract birthday
-                        bday_match = PATTERNS["birthday"].search(value_str)
-                        if bday_match:
-                            result["contacts"][rel]["birthday"] = bday_match.group(1)
-                        
-                        # Extract phone
-                        phone_match = PATTERNS["phone"].search(value_str)
-                        if phone_match:
-                            result["contacts"][rel]["phone"] = phone_match.group(1)
-                        
-                        seen_contacts[rel] = True
+        if open_rels:
+            # Line-level matches are shared by every relationship on the line
+            full_name_match = PATTERNS["names"].search(value_str)
+            bday_match = PATTERNS["birthday"].search(value_str)
+            phone_match = PATTERNS["phone"].search(value_str)
+            
+            for rel in open_rels:
+                name = _extract_contact_name(value, value_str, rel, full_name_match)
+                if name:
+                    result["contacts"][rel]["name"] = name
+                    if bday_match:
+                        result["contacts"][rel]["birthday"] = bday_match.group(1)
+                    if phone_match:
+                        result["contacts"][rel]["phone"] = phone_match.group(1)
         
         # VEHICLES
-        for veh_keyword in VEHICLE_KEYWORDS:
-            if veh_keyword in value_lower and len(result["vehicles"]) < 5:
-                vehicle_dict = {"make": veh_keyword.upper()}
-                if isinstance(value, dict):
-                    if value.get("year"):
-                        vehicle_dict["year"] = value["year"]
-                    if value.get("model"):
-                        vehicle_dict["model"] = value["model"]
-                if not any(v.get("make") == vehicle_dict["make"] for v in result["vehicles"]):
-                    result["vehicles"].append(vehicle_dict)
-                break
+        if veh_keyword is not None and len(result["vehicles"]) < 5:
+            vehicle_dict = {"make": veh_keyword.upper()}
+            if isinstance(value, dict):
+                if value.get("year"):
+                    vehicle_dict["year"] = value["year"]
+                if value.get("model"):
+                    vehicle_dict["model"] = value["model"]
+            if not any(v.get("make") == vehicle_dict["make"] for v in result["vehicles"]):
+                result["vehicles"].append(vehicle_dict)
         
         # PREFERENCES
         if "preference" in mem_key or "preference" in value_lower:
@@ -215,10 +259,9 @@ def normalize_memories(raw_memory_text: str) -> Dict[str, Any]:
                 result["recent_conversations"].append(value["summary"])
         
         # GENERAL FACTS
-        elif isinstance(value, str) and len(value) > 10 and len(value) < 300:
+        elif isinstance(value, str) and 10 < len(value) < 300 and len(result["facts"]) < 20:
             # Filter out conversational responses
-            if not any(x in value_lower for x in ["assistant:", "user:", "hey", "how's it going"]):
-                if len(result["facts"]) < 20:
-                    result["facts"].append(value[:150])
+            if not _CHATTER_RE.search(value_lower):
+                result["facts"].append(value[:150])
     
     return result
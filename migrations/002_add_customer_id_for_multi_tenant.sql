@@ -5,48 +5,46 @@
 -- Date: October 28, 2025
 
 -- =============================================================================
--- STEP 1: Add customer_id columns with DEFAULT 1 (safe transition)
+-- STEP 1: Add customer_id columns as NOT NULL DEFAULT 1
 -- =============================================================================
--- IMPORTANT: Using DEFAULT 1 allows existing write code to continue working
--- This prevents breaking production during the migration window
--- DEFAULT will be removed in Step 3 after all code is updated
+-- On PostgreSQL 11+ adding a column with a constant default is metadata-only:
+-- existing rows read customer_id = 1 without the table being rewritten or
+-- backfilled, so this is O(1) regardless of table size and also assigns all
+-- existing data to Peterson Insurance (Test Client #1). run_migration.py
+-- refuses to run on older servers.
+-- DEFAULT 1 keeps existing write code working; it is removed in Step 3.
 
 -- memories table (V1)
 ALTER TABLE memories 
-ADD COLUMN IF NOT EXISTS customer_id INTEGER DEFAULT 1;
+ADD COLUMN IF NOT EXISTS customer_id INTEGER NOT NULL DEFAULT 1;
 
 -- call_summaries table (V2)
 ALTER TABLE call_summaries 
-ADD COLUMN IF NOT EXISTS customer_id INTEGER DEFAULT 1;
+ADD COLUMN IF NOT EXISTS customer_id INTEGER NOT NULL DEFAULT 1;
 
 -- caller_profiles table (V2)
 ALTER TABLE caller_profiles 
-ADD COLUMN IF NOT EXISTS customer_id INTEGER DEFAULT 1;
+ADD COLUMN IF NOT EXISTS customer_id INTEGER NOT NULL DEFAULT 1;
 
 -- personality_metrics table (V2)
 ALTER TABLE personality_metrics 
-ADD COLUMN IF NOT EXISTS customer_id INTEGER DEFAULT 1;
+ADD COLUMN IF NOT EXISTS customer_id INTEGER NOT NULL DEFAULT 1;
 
 -- personality_averages table (V2)
 ALTER TABLE personality_averages 
-ADD COLUMN IF NOT EXISTS customer_id INTEGER DEFAULT 1;
+ADD COLUMN IF NOT EXISTS customer_id INTEGER NOT NULL DEFAULT 1;
 
 -- =============================================================================
--- STEP 2: Migrate existing data to customer_id=1 (Peterson Insurance)
+-- STEP 2: (folded into Step 1) Existing rows get customer_id=1 from the default
 -- =============================================================================
 
--- All existing data belongs to Peterson Insurance (Test Client #1)
-UPDATE memories SET customer_id = 1 WHERE customer_id IS NULL;
-UPDATE call_summaries SET customer_id = 1 WHERE customer_id IS NULL;
-UPDATE caller_profiles SET customer_id = 1 WHERE customer_id IS NULL;
-UPDATE personality_metrics SET customer_id = 1 WHERE customer_id IS NULL;
-UPDATE personality_averages SET customer_id = 1 WHERE customer_id IS NULL;
-
 -- =============================================================================
 -- STEP 3: Make customer_id NOT NULL + Remove DEFAULT (after code deployed)
 -- =============================================================================
 -- NOTE: Step 3 should ONLY be run AFTER Week 2 API changes are deployed
 -- This ensures backward compatibility during the transition period
+-- SET NOT NULL is a no-op for columns added in Step 1; it only checks
+-- columns that already existed (e.g. from 002a)
 
 ALTER TABLE memories 
 ALTER COLUMN customer_id SET NOT NULL,
@@ -69,31 +67,9 @@ ALTER COLUMN customer_id SET NOT NULL,
 ALTER COLUMN customer_id DROP DEFAULT;
 
 -- =============================================================================
--- STEP 4: Add composite indexes for performance (customer_id + user_id)
+-- STEP 4: Composite indexes - see the end of this file
 -- =============================================================================
-
--- memories: Fast lookup by tenant + user
-CREATE INDEX IF NOT EXISTS idx_memories_customer_user 
-ON memories(customer_id, user_id);
-
--- call_summaries: Fast lookup by tenant + user + date
-CREATE INDEX IF NOT EXISTS idx_call_summaries_customer_user 
-ON call_summaries(customer_id, user_id);
-
-CREATE INDEX IF NOT EXISTS idx_call_summaries_customer_date 
-ON call_summaries(customer_id, call_date DESC);
-
--- caller_profiles: Fast lookup by tenant + user (unique per tenant)
-CREATE INDEX IF NOT EXISTS idx_caller_profiles_customer_user 
-ON caller_profiles(customer_id, user_id);
-
--- personality_metrics: Fast lookup by tenant + user
-CREATE INDEX IF NOT EXISTS idx_personality_metrics_customer_user 
-ON personality_metrics(customer_id, user_id);
-
--- personality_averages: Fast lookup by tenant + user
-CREATE INDEX IF NOT EXISTS idx_personality_averages_customer_user 
-ON personality_averages(customer_id, user_id);
+-- Built with CREATE INDEX CONCURRENTLY after everything above has committed
 
 -- =============================================================================
 -- STEP 5: Update UNIQUE constraints for multi-tenancy
@@ -101,19 +77,16 @@ ON personality_averages(customer_id, user_id);
 
 -- caller_profiles: user_id must be unique PER TENANT (not globally)
 -- Drop old constraint, create new composite unique constraint
+-- (one ALTER TABLE, so the table is locked and scanned once)
 ALTER TABLE caller_profiles 
-DROP CONSTRAINT IF EXISTS caller_profiles_user_id_key;
-
-ALTER TABLE caller_profiles 
+DROP CONSTRAINT IF EXISTS caller_profiles_user_id_key,
 ADD CONSTRAINT caller_profiles_customer_user_unique 
 UNIQUE (customer_id, user_id);
 
 -- personality_averages: user_id must be unique PER TENANT
 -- Drop old primary key, create new composite primary key
 ALTER TABLE personality_averages 
-DROP CONSTRAINT IF EXISTS personality_averages_pkey;
-
-ALTER TABLE personality_averages 
+DROP CONSTRAINT IF EXISTS personality_averages_pkey,
 ADD CONSTRAINT personality_averages_pkey 
 PRIMARY KEY (customer_id, user_id);
 
@@ -298,6 +271,40 @@ COMMENT ON COLUMN caller_profiles.customer_id IS 'Tenant isolation: Links caller
 COMMENT ON COLUMN personality_metrics.customer_id IS 'Tenant isolation: Links personality data to specific customer account';
 COMMENT ON COLUMN personality_averages.customer_id IS 'Tenant isolation: Links personality averages to specific customer account';
 
+-- @CONCURRENT
+-- =============================================================================
+-- STEP 4: Add composite indexes for performance (customer_id + user_id)
+-- =============================================================================
+-- CONCURRENTLY builds without the SHARE lock that would block writes for the
+-- whole build, but it cannot run inside a transaction block. run_migration.py
+-- runs everything above the @CONCURRENT marker in one transaction, then each
+-- statement after it on its own in autocommit mode. A failed concurrent build
+-- leaves an INVALID index that IF NOT EXISTS would skip, so drop it before
+-- re-running.
+
+-- memories: Fast lookup by tenant + user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_customer_user 
+ON memories(customer_id, user_id);
+
+-- call_summaries: Fast lookup by tenant + user + date
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_call_summaries_customer_user 
+ON call_summaries(customer_id, user_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_call_summaries_customer_date 
+ON call_summaries(customer_id, call_date DESC);
+
+-- caller_profiles: Fast lookup by tenant + user (unique per tenant)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_caller_profiles_customer_user 
+ON caller_profiles(customer_id, user_id);
+
+-- personality_metrics: Fast lookup by tenant + user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personality_metrics_customer_user 
+ON personality_metrics(customer_id, user_id);
+
+-- personality_averages: Fast lookup by tenant + user
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personality_averages_customer_user 
+ON personality_averages(customer_id, user_id);
+
 -- =============================================================================
 -- MIGRATION COMPLETE
 -- =============================================================================
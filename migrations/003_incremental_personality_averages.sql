@@ -0,0 +1,121 @@
+-- Migration 003: Incremental personality averages
+-- Replaces the full-recompute trigger on personality_metrics with an O(1)
+-- running-average upsert, so each insert no longer re-aggregates every
+-- metrics row for the caller and context reads stay a single-row lookup.
+--
+-- update_personality_averages(customer_id, user_id) is kept as a full
+-- recompute for repairs/backfills; it is no longer called per insert.
+
+-- =============================================================================
+-- STEP 1: Index for the "last 3 calls" lookups
+-- =============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_personality_metrics_customer_user_measured
+ON personality_metrics(customer_id, user_id, measured_at DESC);
+
+-- =============================================================================
+-- STEP 2: Running-average trigger function
+-- =============================================================================
+-- avg_new = (avg_old * call_count + NEW.x) / (call_count + 1)
+-- A NULL score leaves that average unchanged; recent_* stay a bounded
+-- average over the caller's last 3 measurements.
+
+CREATE OR REPLACE FUNCTION trigger_update_personality_averages()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_recent_frustration FLOAT;
+    v_recent_satisfaction FLOAT;
+    v_recent_urgency FLOAT;
+BEGIN
+    SELECT AVG(frustration_level), AVG(satisfaction_level), AVG(urgency_level)
+    INTO v_recent_frustration, v_recent_satisfaction, v_recent_urgency
+    FROM (
+        SELECT frustration_level, satisfaction_level, urgency_level
+        FROM personality_metrics
+        WHERE customer_id = NEW.customer_id AND user_id = NEW.user_id
+        ORDER BY measured_at DESC LIMIT 3
+    ) sub;
+
+    INSERT INTO personality_averages AS pa (
+        customer_id,
+        user_id,
+        call_count,
+        last_updated,
+        avg_openness,
+        avg_conscientiousness,
+        avg_extraversion,
+        avg_agreeableness,
+        avg_neuroticism,
+        avg_formality,
+        avg_directness,
+        avg_detail_orientation,
+        avg_patience,
+        avg_technical_comfort,
+        recent_frustration,
+        recent_satisfaction,
+        recent_urgency
+    )
+    VALUES (
+        NEW.customer_id,
+        NEW.user_id,
+        1,
+        NOW(),
+        NEW.openness,
+        NEW.conscientiousness,
+        NEW.extraversion,
+        NEW.agreeableness,
+        NEW.neuroticism,
+        NEW.formality,
+        NEW.directness,
+        NEW.detail_orientation,
+        NEW.patience,
+        NEW.technical_comfort,
+        v_recent_frustration,
+        v_recent_satisfaction,
+        v_recent_urgency
+    )
+    ON CONFLICT (customer_id, user_id) DO UPDATE SET
+        call_count = pa.call_count + 1,
+        last_updated = NOW(),
+        avg_openness = COALESCE((pa.avg_openness * pa.call_count + NEW.openness) / (pa.call_count + 1), pa.avg_openness, NEW.openness),
+        avg_conscientiousness = COALESCE((pa.avg_conscientiousness * pa.call_count + NEW.conscientiousness) / (pa.call_count + 1), pa.avg_conscientiousness, NEW.conscientiousness),
+        avg_extraversion = COALESCE((pa.avg_extraversion * pa.call_count + NEW.extraversion) / (pa.call_count + 1), pa.avg_extraversion, NEW.extraversion),
+        avg_agreeableness = COALESCE((pa.avg_agreeableness * pa.call_count + NEW.agreeableness) / (pa.call_count + 1), pa.avg_agreeableness, NEW.agreeableness),
+        avg_neuroticism = COALESCE((pa.avg_neuroticism * pa.call_count + NEW.neuroticism) / (pa.call_count + 1), pa.avg_neuroticism, NEW.neuroticism),
+        avg_formality = COALESCE((pa.avg_formality * pa.call_count + NEW.formality) / (pa.call_count + 1), pa.avg_formality, NEW.formality),
+        avg_directness = COALESCE((pa.avg_directness * pa.call_count + NEW.directness) / (pa.call_count + 1), pa.avg_directness, NEW.directness),
+        avg_detail_orientation = COALESCE((pa.avg_detail_orientation * pa.call_count + NEW.detail_orientation) / (pa.call_count + 1), pa.avg_detail_orientation, NEW.detail_orientation),
+        avg_patience = COALESCE((pa.avg_patience * pa.call_count + NEW.patience) / (pa.call_count + 1), pa.avg_patience, NEW.patience),
+        avg_technical_comfort = COALESCE((pa.avg_technical_comfort * pa.call_count + NEW.technical_comfort) / (pa.call_count + 1), pa.avg_technical_comfort, NEW.technical_comfort),
+        recent_frustration = EXCLUDED.recent_frustration,
+        recent_satisfaction = EXCLUDED.recent_satisfaction,
+        recent_urgency = EXCLUDED.recent_urgency;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS personality_metrics_insert_trigger ON personality_metrics;
+
+CREATE TRIGGER personality_metrics_insert_trigger
+AFTER INSERT ON personality_metrics
+FOR EACH ROW
+EXECUTE FUNCTION trigger_update_personality_averages();
+
+-- =============================================================================
+-- STEP 3: Make existing rows consistent with the running averages
+-- =============================================================================
+
+UPDATE personality_averages SET call_count = 0 WHERE call_count IS NULL;
+
+ALTER TABLE personality_averages
+ALTER COLUMN call_count SET NOT NULL;
+
+-- =============================================================================
+-- MIGRATION 003 COMPLETE
+-- =============================================================================
+-- ✅ personality_averages maintained incrementally on insert
+-- ✅ update_personality_averages() still available for a full recompute:
+--    SELECT update_personality_averages(customer_id, user_id)
+--    FROM (SELECT DISTINCT customer_id, user_id FROM personality_metrics) m;
+-- =============================================================================
@@ -0,0 +1,42 @@
+-- Migration 004: Time-ordered UUIDv7 primary keys
+-- Random v4 keys scatter inserts across the whole primary-key B-tree.
+-- UUIDv7 starts with a millisecond timestamp, so new rows land on the
+-- rightmost leaf page. Column types are unchanged (still UUID); existing
+-- rows keep their v4 ids.
+
+-- =============================================================================
+-- STEP 1: UUIDv7 generator (RFC 9562)
+-- =============================================================================
+-- Overlays the 48-bit Unix millisecond timestamp on a random v4 UUID and
+-- sets the version bits to 0111.
+
+CREATE OR REPLACE FUNCTION uuid_generate_v7()
+RETURNS UUID AS $$
+BEGIN
+    RETURN encode(
+        set_bit(
+            set_bit(
+                overlay(uuid_send(gen_random_uuid())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::BIGINT) FROM 3)
+                        FROM 1 FOR 6),
+                52, 1),
+            53, 1),
+        'hex')::UUID;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+-- =============================================================================
+-- STEP 2: Use it for the append-heavy V2 tables
+-- =============================================================================
+
+ALTER TABLE call_summaries
+ALTER COLUMN id SET DEFAULT uuid_generate_v7();
+
+ALTER TABLE personality_metrics
+ALTER COLUMN id SET DEFAULT uuid_generate_v7();
+
+-- =============================================================================
+-- MIGRATION 004 COMPLETE
+-- =============================================================================
+-- ✅ New call_summaries / personality_metrics rows get time-ordered ids
+-- =============================================================================
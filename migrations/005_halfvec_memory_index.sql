@@ -0,0 +1,28 @@
+-- Migration 005: Half-precision HNSW index for memory search
+-- The memories table keeps its full-precision vector(embed_dim) column. Only
+-- the index changes: it stores halfvec copies (2 bytes per dimension instead
+-- of 4), so the graph is half the size and each distance computation reads
+-- half the memory. With halfvec_search=true, MemoryStore.search orders by the
+-- same expression (embedding::halfvec(embed_dim) <-> query) so the planner
+-- can use it. The halfvec width is read from the embedding column, whose
+-- width is the embed_dim setting.
+-- Requires pgvector >= 0.7. Run this migration before enabling
+-- halfvec_search; to stay on the full-precision index, skip both.
+
+DROP INDEX IF EXISTS idx_memories_embedding;
+
+DO $$
+DECLARE
+    embed_dim integer;
+BEGIN
+    SELECT atttypmod INTO embed_dim
+    FROM pg_attribute
+    WHERE attrelid = 'memories'::regclass AND attname = 'embedding';
+    
+    EXECUTE format(
+        'CREATE INDEX idx_memories_embedding
+         ON memories USING hnsw ((embedding::halfvec(%s)) halfvec_l2_ops)
+         WITH (m = 16, ef_construction = 64)',
+        embed_dim
+    );
+END $$;
@@ -0,0 +1,11 @@
+-- Migration 006: Partial index for conversation memories
+-- scripts/backfill_memories.py reads only 'moment' and 'thread_history'
+-- memories, oldest first by (created_at, id). This index covers exactly those rows, so the
+-- backfill walks it in order instead of scanning and sorting the whole table.
+-- Built CONCURRENTLY so writes to memories continue meanwhile; run it outside
+-- a transaction block (e.g. psql -f). If the build fails, drop the INVALID
+-- index before re-running.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_conversation_created_at
+ON memories (created_at, id)
+WHERE type IN ('moment', 'thread_history');
@@ -9,14 +9,17 @@ import sys
 import socket
 
 def check_port(port, timeout=30):
-    """Wait for a port to become available"""
-    for _ in range(timeout):
+    """Wait for a port to become available, polling quickly at first and backing off to 200 ms"""
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    while time.monotonic() < deadline:
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         result = sock.connect_ex(('127.0.0.1', port))
         sock.close()
         if result == 0:
             return True
-        time.sleep(1)
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.2)
     return False
 
 def main():
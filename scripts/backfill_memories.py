@@ -4,19 +4,24 @@ Processes historical memories (5,755+ records) to generate summaries and persona
 
 Usage:
     python scripts/backfill_memories.py --limit 100 --batch-size 10
+
+Once row-level security is enabled (migration 002), set BACKFILL_DATABASE_URL
+to a BYPASSRLS role so the backfill can read every tenant's memories.
 """
 
 import sys
 import os
 import argparse
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.memory import MemoryStore
-from app.llm import chat as llm_chat
+from app.llm import chat_json as llm_chat
 from app.memory_integration import MemoryV2Integration
 
 logging.basicConfig(
@@ -25,102 +30,213 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def extract_conversation_from_memory(memory_value: dict) -> list:
+# Conversation memories whose message list has the two messages a call
+# analysis needs; single-message memories never qualify. CASE keeps
+# jsonb_array_length off values that are not arrays
+CONVERSATION_FILTER = (
+    "type IN ('moment', 'thread_history') "
+    "AND CASE WHEN jsonb_typeof(value_json->'messages') = 'array' "
+    "THEN jsonb_array_length(value_json->'messages') >= 2 ELSE false END"
+)
+
+# [[role, content], ...] built by PostgreSQL's JSON functions, so only those
+# two fields of each message are sent and Python does no per-message lookups
+CONVERSATION_PAIRS = (
+    "(SELECT jsonb_agg(jsonb_build_array(m->>'role', m->>'content') ORDER BY n) "
+    "FROM jsonb_array_elements(value_json->'messages') WITH ORDINALITY AS e(m, n))"
+)
+
+def _check_rls_bypass(memory_store: MemoryStore) -> bool:
+    """
+    Check that the backfill can read every tenant's memories.
+    
+    Once migration 002 has forced row-level security on memories, only a
+    BYPASSRLS role sees all tenants (and skips per-row policy checks);
+    any other role would see one tenant at most.
+    """
+    with memory_store.conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                (SELECT rolbypassrls FROM pg_roles WHERE rolname = current_user),
+                (SELECT relrowsecurity FROM pg_class WHERE oid = 'memories'::regclass)
+        """)
+        bypass_rls, rls_enabled = cur.fetchone()
+    if rls_enabled and not bypass_rls:
+        logger.error("❌ memories has row-level security enabled and the backfill role lacks BYPASSRLS")
+        logger.error("   Create one with: CREATE ROLE backfill_runner BYPASSRLS NOINHERIT LOGIN PASSWORD '...';")
+        logger.error("   and point BACKFILL_DATABASE_URL at it")
+        return False
+    return True
+
+def _store_batch(memory_store: MemoryStore, results: list):
     """
-    Extract conversation history from a memory record.
+    Insert the summaries and personality metrics of analyzed calls and commit.
     
     Args:
-        memory_value: The value_json field from memories table
-        
-    Returns:
-        List of (role, content) tuples
+        memory_store: Store whose connection has autocommit disabled
+        results: process_completed_call_deferred results that succeeded
     """
-    # Handle different memory formats
-    if isinstance(memory_value, dict):
-        if "messages" in memory_value:
-            # Thread history format
-            messages = memory_value["messages"]
-            return [(msg["role"], msg["content"]) for msg in messages]
-        elif "content" in memory_value:
-            # Single message format
-            return [("user", memory_value.get("content", ""))]
+    by_customer = {}
+    for result in results:
+        by_customer.setdefault(result["customer_id"], []).append(result)
     
-    return []
+    try:
+        for customer_id, customer_results in by_customer.items():
+            memory_store.store_call_summaries([result["summary_data"] for result in customer_results], customer_id)
+            memory_store.store_personality_metrics_many([result["personality_data"] for result in customer_results], customer_id)
+        memory_store.conn.commit()
+    except Exception:
+        memory_store.conn.rollback()
+        raise
 
-def backfill_memories(limit: int = None, batch_size: int = 10, skip: int = 0):
+def backfill_memories(limit: int = None, batch_size: int = 10, skip: int = 0, commit_every: int = 20, workers: int = 8, dry_run: bool = False):
     """
     Backfill historical memories with summaries and personality data.
     
     Args:
         limit: Maximum number of memories to process (None = all)
-        batch_size: Number of memories to process before committing
+        batch_size: Number of memories between progress reports
         skip: Number of memories to skip (for resuming)
+        commit_every: Number of memories written per transaction
+        workers: Number of conversations analyzed by the LLM concurrently
+        dry_run: Analyze memories but write nothing to the database
     """
     logger.info("🚀 Starting Memory V2 backfill process")
-    logger.info(f"Parameters: limit={limit}, batch_size={batch_size}, skip={skip}")
+    logger.info(f"Parameters: limit={limit}, batch_size={batch_size}, skip={skip}, commit_every={commit_every}, workers={workers}, dry_run={dry_run}")
     
-    # Initialize
-    memory_store = MemoryStore()
+    # Initialize; BACKFILL_DATABASE_URL lets the backfill connect as a
+    # BYPASSRLS role while the application keeps RLS enforced
+    memory_store = MemoryStore(os.environ.get("BACKFILL_DATABASE_URL"))
     integration = MemoryV2Integration(memory_store, llm_chat)
     
-    # Get all memories
+    if not memory_store.available or not _check_rls_bypass(memory_store):
+        memory_store.close()
+        return
+    
+    # Stream memories through a server-side cursor so rows (and their
+    # value_json blobs) are not all held in memory at once. The store's
+    # connection is autocommit, which needs a WITH HOLD cursor; writes from
+    # _store_batch go through their own unnamed cursors.
     try:
         with memory_store.conn.cursor() as cur:
-            query = "SELECT id, type, k, value_json, user_id, created_at FROM memories ORDER BY created_at DESC"
-            if limit:
-                query += f" LIMIT {limit} OFFSET {skip}"
-            
-            cur.execute(query)
-            all_memories = cur.fetchall()
-        
-        total = len(all_memories)
+            cur.execute(
+                "SELECT LEAST(GREATEST(COUNT(*) - %s, 0), COALESCE(%s, COUNT(*))) FROM memories "
+                f"WHERE {CONVERSATION_FILTER}",
+                (skip, limit)
+            )
+            total = cur.fetchone()[0]
         logger.info(f"📊 Found {total} memories to process")
         
         processed = 0
         skipped = 0
         failed = 0
         
-        for i, memory_row in enumerate(all_memories, 1):
-            memory_id, memory_type, key, value, user_id, created_at = memory_row
+        conn = memory_store.conn
+        with conn.cursor(name="backfill_cur", withhold=True) as cur, ThreadPoolExecutor(max_workers=workers) as pool:
+            cur.itersize = batch_size * 5
+            # Only conversation memories are read, and only the role/content
+            # pairs of their messages, so value_json never leaves the server.
+            # Oldest first with id as the tiebreak: memories written while the
+            # backfill runs sort after every existing row, so a --skip offset
+            # still points at the same memory on the next run. Served by the
+            # partial idx_memories_conversation_created_at index
+            cur.execute(
+                f"SELECT id, {CONVERSATION_PAIRS}, user_id, customer_id FROM memories "
+                f"WHERE {CONVERSATION_FILTER} "
+                "ORDER BY created_at, id LIMIT %s OFFSET %s",
+                (limit, skip)
+            )
             
-            try:
-                # Skip if not a conversation memory
-                if memory_type not in ["moment", "thread_history"]:
-                    skipped += 1
-                    continue
-                
-                # Extract conversation
-                conversation = extract_conversation_from_memory(value)
-                if not conversation or len(conversation) < 2:
-                    skipped += 1
-                    continue
-                
-                # Generate call_id from memory
-                call_id = f"backfill_{memory_id}"
-                
-                # Process the conversation
-                logger.info(f"Processing {i}/{total}: memory_id={memory_id}, user={user_id}, messages={len(conversation)}")
-                
-                result = integration.process_completed_call(
-                    conversation,
-                    user_id or "unknown",
-                    call_id
-                )
-                
-                if result.get("success"):
-                    processed += 1
-                    logger.info(f"✅ {i}/{total} - Processed: {result.get('summary', '')[:100]}...")
-                else:
+            # Analyzed calls are written commit_every at a time: one multi-row
+            # INSERT per table and one commit per batch. The cursor was
+            # declared WITH HOLD while still in autocommit, so it survives
+            # these commits and rollbacks.
+            conn.autocommit = False
+            batch_start = 1
+            pending = []
+            # Offset of the first memory in the first batch that failed to
+            # store; batches after it may have committed, so resuming from
+            # any later offset would lose it
+            resume_skip = None
+            
+            # LLM analysis runs on the pool; this thread alone reads the
+            # cursor and writes, as the connection is not safe to share.
+            # Results are collected in row order so --skip offsets stay exact,
+            # and the number of analyses in flight is capped to bound memory.
+            in_flight = deque()
+            max_in_flight = max(2 * commit_every, workers)
+            
+            def flush(end: int):
+                nonlocal processed, failed, batch_start, pending, resume_skip
+                if pending and dry_run:
+                    processed += len(pending)
+                elif pending:
+                    try:
+                        _store_batch(memory_store, pending)
+                        processed += len(pending)
+                    except Exception as e:
+                        failed += len(pending)
+                        logger.error(f"❌ Failed to store memories {batch_start}-{end}: {e}")
+                        if resume_skip is None:
+                            resume_skip = skip + batch_start - 1
+                batch_start = end + 1
+                pending = []
+            
+            def collect():
+                nonlocal failed
+                i, memory_id, customer_id, future = in_flight.popleft()
+                try:
+                    result = future.result()
+                    if result.get("success"):
+                        result["customer_id"] = customer_id
+                        pending.append(result)
+                        logger.debug("✅ %s/%s - Analyzed: %.100s...", i, total, result.get("summary", ""))
+                    else:
+                        failed += 1
+                        logger.error(f"❌ {i}/{total} - Failed: {result.get('error')}")
+                except Exception as e:
                     failed += 1
-                    logger.error(f"❌ {i}/{total} - Failed: {result.get('error')}")
+                    logger.error(f"❌ Error processing memory {memory_id}: {e}", exc_info=True)
+                if len(pending) >= commit_every:
+                    flush(i)
+            
+            i = 0
+            for i, memory_row in enumerate(cur, 1):
+                memory_id, pairs, user_id, customer_id = memory_row
                 
-                # Progress report every batch
-                if i % batch_size == 0:
-                    logger.info(f"📈 Progress: {i}/{total} | ✅ {processed} | ⏭️ {skipped} | ❌ {failed}")
+                try:
+                    conversation = [(role, content) for role, content in pairs]
+                    if any(role is None or content is None for role, content in conversation):
+                        skipped += 1
+                        continue
+                    
+                    # Generate call_id from memory
+                    call_id = f"backfill_{memory_id}"
+                    
+                    # Process the conversation
+                    logger.debug("Processing %s/%s: memory_id=%s, user=%s, messages=%s", i, total, memory_id, user_id, len(conversation))
+                    
+                    in_flight.append((i, memory_id, customer_id, pool.submit(
+                        integration.process_completed_call_deferred,
+                        conversation,
+                        user_id or "unknown",
+                        call_id
+                    )))
+                    if len(in_flight) >= max_in_flight:
+                        collect()
+                    
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"❌ Error processing memory {memory_id}: {e}", exc_info=True)
                 
-            except Exception as e:
-                failed += 1
-                logger.error(f"❌ Error processing memory {memory_id}: {e}", exc_info=True)
+                finally:
+                    # Progress report every batch
+                    if i % batch_size == 0:
+                        logger.info(f"📈 Progress: {i}/{total} | ✅ {processed} | ⏭️ {skipped} | ❌ {failed}")
+            
+            while in_flight:
+                collect()
+            flush(i)
         
         # Final report
         logger.info("=" * 80)
@@ -129,6 +245,8 @@ def backfill_memories(limit: int = None, batch_size: int = 10, skip: int = 0):
         logger.info(f"✅ Processed: {processed}")
         logger.info(f"⏭️ Skipped: {skipped}")
         logger.info(f"❌ Failed: {failed}")
+        if resume_skip is not None:
+            logger.info(f"↩️ Everything before offset {resume_skip} is stored; resume with --skip {resume_skip}")
         logger.info("=" * 80)
         
     except Exception as e:
@@ -140,18 +258,27 @@ def main():
     parser = argparse.ArgumentParser(description="Backfill Memory V2 summaries and personality data")
     parser.add_argument("--limit", type=int, default=None, help="Maximum number of memories to process")
     parser.add_argument("--batch-size", type=int, default=10, help="Batch size for processing")
+    parser.add_argument("--commit-every", type=int, default=20, help="Memories written per database transaction")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent LLM analysis requests")
     parser.add_argument("--skip", type=int, default=0, help="Number of memories to skip (for resuming)")
     parser.add_argument("--dry-run", action="store_true", help="Preview without writing to database")
+    parser.add_argument("--verbose", action="store_true", help="Log every memory, not just progress every --batch-size")
     
     args = parser.parse_args()
     
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    
     if args.dry_run:
         logger.info("🔍 DRY RUN MODE - No data will be written")
     
     backfill_memories(
         limit=args.limit,
         batch_size=args.batch_size,
-        skip=args.skip
+        skip=args.skip,
+        commit_every=args.commit_every,
+        workers=args.workers,
+        dry_run=args.dry_run
     )
 
 if __name__ == "__main__":
@@ -24,12 +24,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def test_database_tables():
+def test_database_tables(memory_store: MemoryStore, integration: MemoryV2Integration):
     """Test that all V2 tables exist."""
     logger.info("🧪 Testing database tables...")
     
-    memory_store = MemoryStore()
-    
     tables = [
         'call_summaries',
         'caller_profiles',
@@ -58,16 +56,11 @@ def test_database_tables():
     except Exception as e:
         logger.error(f"❌ Table check failed: {e}")
         return False
-    finally:
-        memory_store.close()
 
-def test_call_processing():
+def test_call_processing(memory_store: MemoryStore, integration: MemoryV2Integration):
     """Test processing a sample call."""
     logger.info("🧪 Testing call processing...")
     
-    memory_store = MemoryStore()
-    integration = MemoryV2Integration(memory_store, llm_chat)
-    
     # Sample conversation
     conversation = [
         ("user", "Hello, I'm having trouble with my account"),
@@ -101,15 +94,11 @@ def test_call_processing():
     except Exception as e:
         logger.error(f"❌ Call processing test failed: {e}", exc_info=True)
         return False
-    finally:
-        memory_store.close()
 
-def test_caller_profile():
+def test_caller_profile(memory_store: MemoryStore, integration: MemoryV2Integration):
     """Test caller profile retrieval."""
     logger.info("🧪 Testing caller profile...")
     
-    memory_store = MemoryStore()
-    
     try:
         # Get profile for test user
         profile = memory_store.get_or_create_caller_profile("test_user_001")
@@ -126,15 +115,11 @@ def test_caller_profile():
     except Exception as e:
         logger.error(f"❌ Caller profile test failed: {e}")
         return False
-    finally:
-        memory_store.close()
 
-def test_personality_averages():
+def test_personality_averages(memory_store: MemoryStore, integration: MemoryV2Integration):
     """Test personality averages retrieval."""
     logger.info("🧪 Testing personality averages...")
     
-    memory_store = MemoryStore()
-    
     try:
         # Get averages for test user
         averages = memory_store.get_personality_averages("test_user_001")
@@ -152,16 +137,11 @@ def test_personality_averages():
     except Exception as e:
         logger.error(f"❌ Personality averages test failed: {e}")
         return False
-    finally:
-        memory_store.close()
 
-def test_enriched_context():
+def test_enriched_context(memory_store: MemoryStore, integration: MemoryV2Integration):
     """Test enriched context retrieval."""
     logger.info("🧪 Testing enriched context...")
     
-    memory_store = MemoryStore()
-    integration = MemoryV2Integration(memory_store, llm_chat)
-    
     try:
         # Get context for test user
         context = integration.get_enriched_context_for_call("test_user_001")
@@ -178,8 +158,6 @@ def test_enriched_context():
     except Exception as e:
         logger.error(f"❌ Enriched context test failed: {e}")
         return False
-    finally:
-        memory_store.close()
 
 def main():
     """Run all tests."""
@@ -197,17 +175,24 @@ def main():
     
     results = []
     
-    for test_name, test_func in tests:
-        logger.info("")
-        logger.info(f"Running: {test_name}")
-        logger.info("-" * 80)
-        
-        try:
-            passed = test_func()
-            results.append((test_name, passed))
-        except Exception as e:
-            logger.error(f"Test crashed: {e}", exc_info=True)
-            results.append((test_name, False))
+    # One store (and database connection) shared by every test
+    memory_store = MemoryStore()
+    integration = MemoryV2Integration(memory_store, llm_chat)
+    
+    try:
+        for test_name, test_func in tests:
+            logger.info("")
+            logger.info(f"Running: {test_name}")
+            logger.info("-" * 80)
+            
+            try:
+                passed = test_func(memory_store, integration)
+                results.append((test_name, passed))
+            except Exception as e:
+                logger.error(f"Test crashed: {e}", exc_info=True)
+                results.append((test_name, False))
+    finally:
+        memory_store.close()
     
     # Summary
     logger.info("")
@@ -18,12 +18,23 @@ def check_port_available(port):
     sock.close()
     return result != 0
 
-def wait_for_port(port, timeout=30):
-    """Wait for a port to become available (service started)"""
-    for _ in range(timeout):
+def wait_for_port(port, timeout=30, process=None):
+    """
+    Wait for a port to become available (service started).
+    
+    Polls every 20 ms at first, backing off to 200 ms, so startup is noticed
+    within a few milliseconds instead of up to a second late. Gives up early
+    if process (the server being waited on) has already exited.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.02
+    while time.monotonic() < deadline:
         if not check_port_available(port):
             return True
-        time.sleep(1)
+        if process is not None and process.poll() is not None:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 1.5, 0.2)
     return False
 
 def main():
@@ -48,7 +59,7 @@ def main():
     fastapi_process = subprocess.Popen(fastapi_cmd)
     
     # Wait for FastAPI to be ready
-    if wait_for_port(8001, timeout=30):
+    if wait_for_port(8001, timeout=30, process=fastapi_process):
         print("✅ FastAPI backend ready on port 8001")
     else:
         print("❌ FastAPI backend failed to start")
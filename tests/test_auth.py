@@ -0,0 +1,45 @@
+"""
+Tests for the HS256 JWT decoder
+"""
+
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.middleware import auth
+
+SECRET = "test-secret-" * 6  # 64+ bytes so PyJWT does not warn about key length
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(auth, "JWT_SECRET_KEY", SECRET)
+    monkeypatch.setattr(auth, "_JWT_KEY", SECRET.encode())
+
+def test_decode_matches_pyjwt():
+    token = jwt.encode({"customer_id": 7, "exp": int(time.time()) + 60}, SECRET, algorithm="HS256")
+    
+    assert auth._decode_hs256(token) == jwt.decode(token, SECRET, algorithms=["HS256"])
+    assert auth.decode_customer_id(token) == 7
+
+@pytest.mark.parametrize("token, error", [
+    (jwt.encode({"customer_id": 7}, "other-secret-" * 6, algorithm="HS256"), jwt.InvalidSignatureError),
+    (jwt.encode({"customer_id": 7, "exp": int(time.time()) - 1}, SECRET, algorithm="HS256"), jwt.ExpiredSignatureError),
+    (jwt.encode({"customer_id": 7, "nbf": int(time.time()) + 60}, SECRET, algorithm="HS256"), jwt.ImmatureSignatureError),
+    (jwt.encode({"customer_id": 7, "aud": "other"}, SECRET, algorithm="HS256"), jwt.InvalidAudienceError),
+    (jwt.encode({"customer_id": 7}, SECRET, algorithm="HS512"), jwt.InvalidAlgorithmError),
+    ("not.a-token", jwt.DecodeError),
+])
+def test_decode_rejects_like_pyjwt(token, error):
+    with pytest.raises(error):
+        auth._decode_hs256(token)
+    with pytest.raises(error):
+        jwt.decode(token, SECRET, algorithms=["HS256"])
+
+def test_unsigned_token_is_rejected():
+    token = jwt.encode({"customer_id": 7}, None, algorithm="none")
+    
+    with pytest.raises(HTTPException) as excinfo:
+        auth.decode_customer_id(token)
+    assert excinfo.value.status_code == 401
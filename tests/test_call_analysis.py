@@ -0,0 +1,49 @@
+"""
+Tests for the call analysis micro-batching queue
+"""
+
+import threading
+
+from app import call_analysis
+from app.call_analysis import CallAnalysisPipeline, _AnalysisBatcher
+from app.personality import PersonalityTracker
+from app.summarizer import CallSummarizer
+
+CONVERSATION = [
+    ("user", "Hi, I'm calling about the invoice you sent me last week for the roof repair."),
+    ("assistant", "Of course, I can help with that. What would you like to know?"),
+    ("user", "The total looks higher than the quote. Can you walk me through the extra charges?"),
+    ("assistant", "Sure, the difference comes from the additional flashing replacement."),
+]
+
+def _pipeline(calls):
+    def llm_chat(messages, **kwargs):
+        raise AssertionError("LLM should not be called directly")
+    pipeline = CallAnalysisPipeline(CallSummarizer(llm_chat), PersonalityTracker(llm_chat))
+    
+    def analyze_batch(items):
+        calls.append([call_id for _, call_id, _ in items])
+        return [({"call_id": call_id}, {"call_id": call_id}) for _, call_id, _ in items]
+    
+    pipeline.analyze_batch = analyze_batch
+    return pipeline
+
+def test_concurrent_analyze_calls_share_one_batch(monkeypatch):
+    monkeypatch.setattr(call_analysis, "_batcher", _AnalysisBatcher(max_batch=4, window_seconds=1.0))
+    calls = []
+    results = {}
+    pipeline = _pipeline(calls)
+    
+    def run(call_id):
+        results[call_id] = pipeline.analyze(CONVERSATION, "user-1", call_id)
+    
+    threads = [threading.Thread(target=run, args=(call_id,)) for call_id in ("call-a", "call-b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    
+    assert len(calls) == 1
+    assert sorted(calls[0]) == ["call-a", "call-b"]
+    assert results["call-a"][0]["call_id"] == "call-a"
+    assert results["call-b"][0]["call_id"] == "call-b"
@@ -0,0 +1,41 @@
+"""
+Tests for the short-term memory cold tier
+"""
+
+import os
+import stat
+
+from app.packer import STMManager
+
+def test_cold_tier_is_off_by_default():
+    stm = STMManager(max_hot=1, cold_path="")
+    stm.update_recap("a", "first")
+    stm.update_recap("b", "second")
+    
+    assert stm._cold is None
+    assert stm.get_recap("a") == "(New conversation)"
+
+def test_cold_tier_pages_recaps_back_in(tmp_path):
+    path = str(tmp_path / "stm.sqlite3")
+    stm = STMManager(max_hot=1, cold_path=path)
+    stm.update_recap("a", "first")
+    stm.update_recap("b", "second")
+    
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stm.get_recap("a") == "first"
+
+def test_cold_tier_caps_rows(tmp_path):
+    stm = STMManager(max_hot=1, cold_path=str(tmp_path / "stm.sqlite3"), cold_max_rows=2)
+    for i in range(5):
+        stm.update_recap(f"t{i}", f"recap {i}")
+    
+    assert stm._cold.execute("SELECT COUNT(*) FROM stm_recaps").fetchone()[0] == 2
+    assert stm.get_recap("t0") == "(New conversation)"
+    assert stm.get_recap("t3") == "recap 3"
+
+def test_cold_tier_expires_old_recaps(tmp_path):
+    stm = STMManager(max_hot=1, cold_path=str(tmp_path / "stm.sqlite3"), cold_ttl_seconds=-1)
+    stm.update_recap("a", "first")
+    stm.update_recap("b", "second")
+    
+    assert stm.get_recap("a") == "(New conversation)"
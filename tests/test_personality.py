@@ -0,0 +1,33 @@
+"""
+Tests for the personality tracker's LLM path
+"""
+
+import json
+
+from app import personality
+from app.personality import PersonalityTracker
+from app.response_cache import ResponseCache
+
+CONVERSATION = [
+    ("user", "Hi, I'm calling about the invoice you sent me last week for the roof repair."),
+    ("assistant", "Of course, I can help with that. What would you like to know?"),
+    ("user", "The total looks higher than the quote. Can you walk me through the extra charges?"),
+    ("assistant", "Sure, the difference comes from the additional flashing replacement."),
+]
+
+def test_analyze_personality_reads_tuple_llm_response(monkeypatch):
+    monkeypatch.setattr(personality, "response_cache", ResponseCache(similarity=0))
+    calls = []
+    
+    def llm_chat(messages, **kwargs):
+        calls.append(messages)
+        # Same shape as app.llm.chat_json: (content, usage)
+        return json.dumps({"openness": 80, "formality": 120, "patience": "n/a"}), {"total_tokens": 42}
+    
+    result = PersonalityTracker(llm_chat).analyze_personality(CONVERSATION, "user-1", "call-1")
+    
+    assert len(calls) == 1
+    assert result["openness"] == 80
+    assert result["formality"] == 100  # clamped
+    assert result["user_id"] == "user-1"
+    assert result["call_id"] == "call-1"
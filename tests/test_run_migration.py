@@ -0,0 +1,36 @@
+"""
+Tests for splitting migration 002 around the @CONCURRENT marker
+"""
+
+import importlib
+
+import pytest
+
+@pytest.fixture
+def run_migration(monkeypatch):
+    # The runner exits at import without a DATABASE_URL; nothing here connects
+    monkeypatch.setenv("DATABASE_URL", "postgresql://localhost/unused")
+    return importlib.import_module("run_migration")
+
+def test_split_migration_separates_concurrent_statements(run_migration):
+    sql = (
+        "ALTER TABLE memories ADD COLUMN customer_id INTEGER;\n"
+        f"{run_migration.CONCURRENT_MARKER}\n"
+        "-- memories: by tenant\n"
+        "CREATE INDEX CONCURRENTLY a ON memories(customer_id);\n"
+        "\n"
+        "-- trailing comment only\n"
+    )
+    transactional, statements = run_migration.split_migration(sql)
+    
+    assert transactional == "ALTER TABLE memories ADD COLUMN customer_id INTEGER;\n"
+    assert statements == ["-- memories: by tenant\nCREATE INDEX CONCURRENTLY a ON memories(customer_id)"]
+
+def test_migration_002_builds_only_indexes_concurrently(run_migration):
+    transactional, statements = run_migration.split_migration(run_migration.read_migration_file())
+    
+    assert len(statements) == 6
+    assert all("CREATE INDEX CONCURRENTLY" in statement for statement in statements)
+    assert "CONCURRENTLY" not in "\n".join(
+        line for line in transactional.splitlines() if not line.strip().startswith("--")
+    )
@@ -0,0 +1,48 @@
+"""
+Tests for transcript truncation and response cache keys
+"""
+
+import json
+
+from app import summarizer
+from app.response_cache import ResponseCache
+from app.summarizer import CallSummarizer, truncate_turns, PROMPT_HEAD_TURNS, PROMPT_TAIL_TURNS
+
+SUMMARY = {
+    "summary": "Caller asked about an invoice.",
+    "key_topics": ["billing"],
+    "key_variables": {},
+    "sentiment": "neutral",
+    "resolution_status": "resolved"
+}
+
+def _long_call(middle: str):
+    turns = [("user" if i % 2 == 0 else "assistant", f"turn {i} " + "words about the roof repair " * 40) for i in range(20)]
+    turns[6] = ("user", middle + " " + "details " * 100)
+    return turns
+
+def test_truncate_turns_keeps_head_and_tail():
+    turns = [f"turn {i} " + "x" * 1000 for i in range(20)]
+    kept = truncate_turns(turns, max_tokens=100)
+    
+    assert kept[:PROMPT_HEAD_TURNS] == turns[:PROMPT_HEAD_TURNS]
+    assert kept[-PROMPT_TAIL_TURNS:] == turns[-PROMPT_TAIL_TURNS:]
+    assert kept[PROMPT_HEAD_TURNS] == "...[7 turns elided]..."
+    assert truncate_turns(turns[:5], max_tokens=100) == turns[:5]
+
+def test_cache_key_covers_elided_turns(monkeypatch):
+    monkeypatch.setattr(summarizer, "response_cache", ResponseCache(similarity=0))
+    prompts = []
+    
+    def llm_chat(messages, **kwargs):
+        prompts.append(messages[-1]["content"])
+        return json.dumps(SUMMARY), {"total_tokens": 10}
+    
+    calls = CallSummarizer(llm_chat)
+    calls.summarize_call(_long_call("My account number is 1111"), "u1", "c1")
+    calls.summarize_call(_long_call("My account number is 2222"), "u2", "c2")
+    calls.summarize_call(_long_call("My account number is 1111"), "u1", "c3")
+    
+    # The differing turn is elided from both prompts but still keys the cache
+    assert len(prompts) == 2
+    assert "elided" in prompts[0] and "1111" not in prompts[0]
@@ -0,0 +1,23 @@
+"""
+Tests for tool call validation
+"""
+
+from app.tools import ToolDispatcher
+
+def test_validate_tool_call_accepts_valid_parameters():
+    dispatcher = ToolDispatcher()
+    
+    assert dispatcher.validate_tool_call("search_knowledge", {"query": "roof", "limit": 3}) == (True, "")
+
+def test_validate_tool_call_reports_first_problem():
+    dispatcher = ToolDispatcher()
+    
+    assert dispatcher.validate_tool_call("fly", {}) == (False, "Unknown tool: fly")
+    assert dispatcher.validate_tool_call("book_meeting", {"title": "Sync"}) == (False, "Missing required parameter: when")
+    assert dispatcher.validate_tool_call("search_knowledge", {"query": "roof", "limit": "3"}) == (
+        False, "Parameter limit must be an integer"
+    )
+    assert dispatcher.validate_tool_call("search_knowledge", {"query": 1, "page": 2}) == (
+        False, "Parameter query must be a string"
+    )
+    assert dispatcher.validate_tool_call("search_knowledge", {"page": 2, "query": 1}) == (False, "Unknown parameter: page")